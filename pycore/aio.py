@@ -0,0 +1,208 @@
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+from pycore import engines, execute
+
+# number of engine processes running at the same time unless given otherwise
+DEFAULT_CONCURRENCY = os.cpu_count() or 1
+
+
+class Compiler:
+    """
+    Compile .tex files and architectures from asyncio code without blocking the event loop
+
+    Engines run as asyncio subprocesses, at most concurrency of them at a time, further jobs wait for a free slot.
+    A job that takes longer than its timeout has its engine killed. A cancelled job kills its engine as well and
+    removes its scratch directory before the cancellation is passed on. File system work such as writing the .tex file
+    or looking up the cache runs in the default executor.
+
+    The engine is an executable such as 'latex', which writes a .dvi, a pdf engine of pycore.engines.ENGINES or
+    'auto', which picks one per file and compiles again with LuaLaTeX when TeX runs out of memory, as
+    engines.compile_file does.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, timeout=None, engine='pdflatex', cache=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.engine = engine
+        self.cache = cache
+        self._semaphore = None
+
+    def _slot(self):
+        # created on first use, so the compiler can be set up outside of a running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def compile_tex(self, file, output_dir=None, folder=None, precompiled=False, keep_log=False, timeout=None):
+        """
+        Compile a .tex file in a private scratch directory, see execute.compile_tex
+
+        Arguments:
+            file {str} -- path of the .tex file
+
+        Keyword Arguments:
+            output_dir {str} -- folder for the pdf, defaults to the folder of the .tex file (default: {None})
+            folder {str} -- folder relative paths are resolved against, defaults to the folder of the file
+                            (default: {None})
+            precompiled {bool} -- load the preamble from a format dumped once (default: {False})
+            keep_log {bool} -- return the .log file of the run as log, also on success (default: {False})
+            timeout {float} -- seconds after which the engine is killed, defaults to the timeout of the compiler
+                               (default: {None})
+
+        Raises:
+            ValueError: for an engine of pycore.engines that does not write a pdf, use execute.compile_svg
+
+        Returns:
+            result {CompileResult} -- status, pdf path, wall time and the engine output on failure or timeout
+        """
+        file = os.path.abspath(file)
+        folder = os.path.abspath(folder or os.path.dirname(file))
+        output_dir = os.path.abspath(output_dir or os.path.dirname(file))
+        timeout = self.timeout if timeout is None else timeout
+        if self.engine != 'auto':
+            return await self._run(file, self._executable(self.engine), output_dir, folder, precompiled, keep_log,
+                                   timeout)
+        source = await asyncio.get_running_loop().run_in_executor(None, _read, file)
+        name, _ = engines.choose(source)
+        tried = []
+        while True:
+            tried.append(name)
+            result = await self._run(file, engines.ENGINES[name].executable, output_dir, folder, precompiled,
+                                     keep_log, timeout)
+            if result.ok or not engines.CAPACITY_PATTERN.search(result.log):
+                return result
+            name = engines._fallback(tried)
+            if name is None:
+                return result
+
+    @staticmethod
+    def _executable(engine):
+        # names of pycore.engines map to their executable, anything else is run as it is
+        if engine not in engines.ENGINES:
+            return engine
+        if engines.ENGINES[engine].output != 'pdf':
+            raise ValueError('{} does not write a pdf, use execute.compile_svg'.format(engine))
+        return engines.ENGINES[engine].executable
+
+    async def _run(self, file, engine, output_dir, folder, precompiled, keep_log, timeout):
+        loop = asyncio.get_running_loop()
+        stem = os.path.splitext(os.path.basename(file))[0]
+        extension = execute.OUTPUT_EXTENSIONS.get(os.path.basename(engine), '.pdf')
+        target = os.path.join(output_dir, stem + extension)
+        start = time.perf_counter()
+        key = None
+        if self.cache is not None:
+            key = await loop.run_in_executor(None, self.cache.key, file, engine, folder)
+            stored = await loop.run_in_executor(None, self.cache.get, key)
+            if stored:
+                await loop.run_in_executor(None, _copy, stored, target)
+                return execute.CompileResult(file, target, True, time.perf_counter() - start, '', True)
+        async with self._slot():
+            scratch = tempfile.mkdtemp(prefix='pnn-', dir=execute.scratch_root())
+            try:
+                cmd, env = await loop.run_in_executor(
+                    None, execute.engine_command, file, engine, scratch, precompiled, folder)
+                try:
+                    # a session of its own, so helpers the engine started are killed along with it
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd, cwd=folder, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                        start_new_session=os.name != 'nt')
+                except OSError as e:
+                    return execute.CompileResult(file, None, False, time.perf_counter() - start, str(e))
+                try:
+                    output, _ = await asyncio.wait_for(proc.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    await _kill(proc)
+                    return execute.CompileResult(file, None, False, time.perf_counter() - start,
+                                                 '{} timed out after {}s'.format(engine, timeout))
+                except asyncio.CancelledError:
+                    await _kill(proc)
+                    raise
+                log = output.decode(errors='replace')
+                pdf = os.path.join(scratch, stem + extension)
+                if keep_log:
+                    try:
+                        with open(os.path.join(scratch, stem + '.log'), errors='replace') as f:
+                            log = f.read()
+                    except OSError:
+                        pass
+                if proc.returncode or not os.path.exists(pdf):
+                    return execute.CompileResult(file, None, False, time.perf_counter() - start, log)
+                if key is not None:
+                    await loop.run_in_executor(None, self.cache.put, key, pdf)
+                await loop.run_in_executor(None, _move, pdf, target)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+        return execute.CompileResult(file, target, True, time.perf_counter() - start, log if keep_log else '')
+
+    async def tex_to_pdf(self, file='file.tex', folder='output', timeout=None):
+        """
+        Counterpart of execute.tex_to_pdf, the auxiliary files never reach the folder
+
+        Raises:
+            subprocess.CalledProcessError: if the engine fails or times out, with its output
+        """
+        result = await self.compile_tex(os.path.join(folder, file), timeout=timeout)
+        if not result.ok:
+            raise subprocess.CalledProcessError(1, self.engine + ' ' + str(file), result.log)
+        return result
+
+    async def render(self, arch, file, output_dir=None, folder=None, timeout=None):
+        """
+        Generate the .tex file of an architecture and compile it
+
+        Arguments:
+            arch {iterable} -- architecture elements
+            file {str} -- path of the .tex file
+
+        Keyword Arguments:
+            output_dir {str} -- folder for the pdf, defaults to the folder of the .tex file (default: {None})
+            folder {str} -- folder relative paths are resolved against, defaults to the folder of the file
+                            (default: {None})
+            timeout {float} -- seconds after which the engine is killed (default: {None})
+
+        Returns:
+            result {CompileResult} -- outcome of compiling the architecture
+        """
+        await asyncio.get_running_loop().run_in_executor(None, execute.write_tex, arch, file)
+        return await self.compile_tex(file, output_dir=output_dir, folder=folder, timeout=timeout)
+
+
+def _read(file):
+    with open(file, errors='replace') as f:
+        return f.read()
+
+
+def _copy(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(source, target)
+
+
+def _move(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+
+
+async def _kill(proc):
+    # the engine may have exited in the meantime
+    try:
+        if os.name == 'nt':
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+async def compile_tex(file, engine='pdflatex', **kwargs):
+    """
+    Compile a single .tex file with a compiler of its own, see Compiler.compile_tex
+    """
+    return await Compiler(engine=engine).compile_tex(file, **kwargs)
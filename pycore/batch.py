@@ -0,0 +1,273 @@
+import argparse
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pycore import engines, execute
+from pycore.cache import BuildCache
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    # fall back to poppler's pdfseparate for splitting gallery pages
+    PdfReader = PdfWriter = None
+
+PICTURE_PATTERN = re.compile(r'\\begin\{tikzpicture\}(?:\[([^\]]*)\])?')
+
+
+def find_tex(paths):
+    """
+    Collect .tex files from a list of files and folders
+
+    Arguments:
+        paths {list} -- .tex files or folders that are searched recursively
+
+    Returns:
+        files {list} -- sorted paths of all found .tex files
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, '**', '*.tex'), recursive=True))
+        else:
+            files.add(path)
+    return sorted(files)
+
+
+def compile_batch(files, jobs=None, output_dir=None, engine='pdflatex', cache=None, precompiled=False):
+    """
+    Compile many .tex files in parallel on a process pool
+
+    Every job runs engines.compile_tex, i.e. in its own scratch directory and without changing the working directory.
+
+    Arguments:
+        files {list} -- paths of the .tex files
+
+    Keyword Arguments:
+        jobs {int} -- number of parallel engine processes, defaults to the number of cores (default: {None})
+        output_dir {str} -- folder for all pdfs, defaults to the folder of each .tex file (default: {None})
+        engine {str} -- engine name of pycore.engines, 'auto' or a TeX executable (default: {'pdflatex'})
+        cache {BuildCache} -- skip files whose pdf is in this pycore.cache.BuildCache (default: {None})
+        precompiled {bool} -- load preambles from precompiled formats (default: {False})
+
+    Yields:
+        result {CompileResult} -- one result per file in order of completion
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(engines.compile_tex, file, engine, output_dir, None, cache, precompiled)
+                   for file in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def export_batch(files, jobs=None, output_dir=None, method=None, thumbnails=(), engine=None):
+    """
+    Convert many .tex files to svg, and optionally png thumbnails, in parallel on a process pool
+
+    Every job runs execute.compile_svg, see there for the methods and the names of the thumbnails.
+
+    Arguments:
+        files {list} -- paths of the .tex files
+
+    Keyword Arguments:
+        jobs {int} -- number of parallel jobs, defaults to the number of cores (default: {None})
+        output_dir {str} -- folder for all outputs, defaults to the folder of each .tex file (default: {None})
+        method {str} -- 'dvisvgm' or 'pdftocairo', see execute.compile_svg (default: {None})
+        thumbnails {tuple} -- widths in px of png thumbnails (default: {()})
+        engine {str} -- TeX engine writing the pdf for pdftocairo, see execute.compile_svg (default: {None})
+
+    Yields:
+        result {CompileResult} -- one result per file in order of completion, the svg path as pdf
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(execute.compile_svg, file, output_dir, None, method, tuple(thumbnails), engine)
+                   for file in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def gallery_source(figures):
+    """
+    Put many architectures into one document, one tikzpicture per page
+
+    Every figure is built as usual and its tikzpicture is copied into a shared document with the preamble of the
+    first figure. Each picture gets its own `name prefix`, so layer names used in several figures do not clash.
+
+    Arguments:
+        figures {list} -- architectures as passed to execute.build_architecture, sharing the same preamble
+
+    Raises:
+        ValueError: if a figure has no tikzpicture or another preamble than the first figure
+
+    Yields:
+        fragment {str} -- TeX fragments of the combined document
+    """
+    for index, arch in enumerate(figures):
+        source = execute.build_architecture(arch)
+        begin = source.find('\\begin{document}')
+        picture = PICTURE_PATTERN.search(source, begin) if begin >= 0 else None
+        end = source.rfind('\\end{tikzpicture}')
+        if picture is None or end < picture.end():
+            raise ValueError('figure {} has no tikzpicture in its document'.format(index))
+        if index == 0:
+            head = source[:begin]
+            yield head
+            yield '\\begin{document}\n'
+        elif source[:begin] != head:
+            raise ValueError('figure {} does not share the preamble of the first figure'.format(index))
+        options = 'name prefix=pnn{}-'.format(index)
+        if picture.group(1):
+            options += ', ' + picture.group(1)
+        yield '\\begin{tikzpicture}[' + options + ']'
+        yield source[picture.end():end]
+        yield '\\end{tikzpicture}\n'
+    yield '\\end{document}\n'
+
+
+def split_pages(pdf, targets):
+    """
+    Write every page of a pdf to its own file
+
+    Arguments:
+        pdf {str} -- path of the multi-page pdf
+        targets {list} -- one output path per page
+
+    Raises:
+        ValueError: if the pdf does not have one page per target, e.g. because a figure spilled onto a second page
+    """
+    if PdfReader is not None:
+        reader = PdfReader(pdf)
+        _check_pages(pdf, len(reader.pages), targets)
+        for page, target in zip(reader.pages, targets):
+            writer = PdfWriter()
+            writer.add_page(page)
+            with open(target, 'wb') as f:
+                writer.write(f)
+        return
+    with tempfile.TemporaryDirectory(prefix='pnn-pages-') as scratch:
+        subprocess.run(['pdfseparate', pdf, os.path.join(scratch, '%d.pdf')], check=True,
+                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        _check_pages(pdf, len(os.listdir(scratch)), targets)
+        for number, target in enumerate(targets, 1):
+            shutil.move(os.path.join(scratch, '{}.pdf'.format(number)), target)
+
+
+def _check_pages(pdf, pages, targets):
+    if pages != len(targets):
+        raise ValueError('{} has {} pages for {} figures'.format(pdf, pages, len(targets)))
+
+
+def compile_gallery(figures, output_dir, folder='.', engine='pdflatex', cache=None, precompiled=False):
+    """
+    Compile many small architectures in a single engine run and split the result into one pdf per figure
+
+    Arguments:
+        figures {dict} -- figure name -> architecture, all sharing the same preamble
+        output_dir {str} -- folder for the pdfs, named after the figures
+
+    Keyword Arguments:
+        folder {str} -- folder relative paths in the architectures are resolved against (default: {'.'})
+        engine {str} -- pdf engine of pycore.engines, 'auto' or a TeX executable (default: {'pdflatex'})
+        cache {BuildCache} -- reuse the combined pdf from this pycore.cache.BuildCache (default: {None})
+        precompiled {bool} -- load the shared preamble from a precompiled format (default: {False})
+
+    Returns:
+        results {list} -- one CompileResult per figure, all carrying the time of the shared run
+    """
+    names = list(figures)
+    with tempfile.TemporaryDirectory(prefix='pnn-gallery-') as scratch:
+        file = os.path.join(scratch, 'gallery.tex')
+        execute.write_fragments(gallery_source(figures[name] for name in names), file)
+        result = engines.compile_tex(file, engine, output_dir=scratch, folder=folder, cache=cache,
+                                     precompiled=precompiled)
+        if not result.ok:
+            return [execute.CompileResult(name, None, False, result.seconds, result.log) for name in names]
+        os.makedirs(output_dir, exist_ok=True)
+        targets = [os.path.join(os.path.abspath(output_dir), name + '.pdf') for name in names]
+        split_pages(result.pdf, targets)
+    return [execute.CompileResult(name, target, True, result.seconds, '', result.cached)
+            for name, target in zip(names, targets)]
+
+
+def together(files, output_dir=None, engine='pdflatex', cache=None, precompiled=False):
+    # one gallery per folder, since relative paths in the files are resolved against their folder
+    folders = {}
+    for file in files:
+        folders.setdefault(os.path.dirname(os.path.abspath(file)), []).append(file)
+    for folder, group in folders.items():
+        figures = {}
+        for file in group:
+            with open(file) as f:
+                figures[os.path.splitext(os.path.basename(file))[0]] = [f.read()]
+        try:
+            results = compile_gallery(figures, output_dir or folder, folder, engine, cache, precompiled)
+        except ValueError as e:
+            results = [execute.CompileResult(name, None, False, 0.0, str(e)) for name in figures]
+        for file, result in zip(group, results):
+            yield result._replace(file=os.path.abspath(file))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile many PlotNeuralNet diagrams in parallel.')
+    parser.add_argument('paths', nargs='+', help='.tex files or folders to search for .tex files')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of parallel jobs (default: all cores)')
+    parser.add_argument('-o', '--output-dir', default=None, help='folder for the pdfs (default: next to each file)')
+    parser.add_argument('--engine', choices=(*engines.ENGINES, 'auto'), default=None,
+                        help='TeX engine, auto picks one per file (default: pdflatex, latex with --method dvisvgm)')
+    parser.add_argument('--cache', nargs='?', const='', default=None, metavar='DIR',
+                        help='reuse pdfs from the build cache (default folder: $PLOTNEURALNET_CACHE or ~/.cache)')
+    parser.add_argument('--precompiled', action='store_true', help='load preambles from precompiled formats')
+    parser.add_argument('--together', action='store_true',
+                        help='compile all files of a folder in one engine run and split the pages afterwards')
+    parser.add_argument('--svg', action='store_true', help='write svgs instead of pdfs')
+    parser.add_argument('--method', choices=('dvisvgm', 'pdftocairo'), default=None,
+                        help='svg conversion (default: dvisvgm if installed and no thumbnails are asked for)')
+    parser.add_argument('--thumbnails', type=int, nargs='+', default=(), metavar='WIDTH',
+                        help='also write png thumbnails of these widths in px, implies --svg')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the engine output of failed jobs')
+    args = parser.parse_args(argv)
+    svg = args.svg or args.thumbnails or args.engine == 'latex+dvisvgm'
+    if args.method == 'dvisvgm' and args.thumbnails:
+        parser.error('--thumbnails are rendered from a pdf, use --method pdftocairo')
+    if args.method == 'dvisvgm' and args.engine not in (None, 'auto', 'latex+dvisvgm'):
+        parser.error('--method dvisvgm compiles with latex, --engine {} needs --method pdftocairo'.format(args.engine))
+    if args.engine == 'latex+dvisvgm' and (args.method == 'pdftocairo' or args.thumbnails or args.together):
+        parser.error('--engine latex+dvisvgm writes svgs with dvisvgm only')
+    if svg and args.precompiled:
+        parser.error('--precompiled only applies to pdf output')
+
+    files = find_tex(args.paths)
+    cache = BuildCache(args.cache or None) if args.cache is not None else None
+    start = time.perf_counter()
+    failed = 0
+    if svg:
+        # compile_svg picks the method when no pdf engine is asked for, as auto mode does for svg output
+        method = 'dvisvgm' if args.engine == 'latex+dvisvgm' else args.method
+        pdf_engine = args.engine in engines.ENGINES and engines.ENGINES[args.engine].output == 'pdf'
+        engine = engines.ENGINES[args.engine].executable if pdf_engine else None
+        results = export_batch(files, args.jobs, args.output_dir, method, args.thumbnails, engine)
+    elif args.together:
+        results = together(files, args.output_dir, args.engine or 'pdflatex', cache, args.precompiled)
+    else:
+        results = compile_batch(files, args.jobs, args.output_dir, args.engine or 'pdflatex', cache, args.precompiled)
+    for result in results:
+        status = 'hit' if result.cached else ('ok' if result.ok else 'FAIL')
+        print('{:<4} {:8.2f}s  {}'.format(status, result.seconds, os.path.relpath(result.file)))
+        if not result.ok:
+            failed += 1
+            if args.verbose:
+                print(result.log)
+    print('{} of {} compiled in {:.2f}s'.format(len(files) - failed, len(files), time.perf_counter() - start))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pycore.blocks as blocks
+import pycore.tikz as tikz
+from pycore import execute, ir
+from pycore.cache import engine_version
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak RSS is reported as None there
+    resource = None
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# statistics TeX prints at the end of the log, e.g. ' 50041 words of memory out of 5000000'
+MEMORY_PATTERN = re.compile(r'^\s*(\d+)\s+([a-z][a-z -]*?)\s+out of\s+(\d+(?:\+\d+)*)', re.MULTILINE)
+CAPACITY_PATTERN = re.compile(r'TeX capacity exceeded, sorry \[([^\]]*)\]')
+# metrics compared between runs, lower is better for all of them
+METRICS = ('generate_seconds', 'peak_rss', 'tex_bytes', 'compile_seconds', 'main_memory', 'pdf_bytes')
+
+
+def _document(body):
+    yield tikz.start(ROOT + '/')
+    yield body
+    yield tikz.env_end()
+
+
+def blocks_arch(layers):
+    """
+    Synthetic architecture built from pycore.blocks
+
+    Cycles through multi_conv_relu, bottleneck, upsample, conc and sum until the requested number of layers is reached.
+
+    Arguments:
+        layers {int} -- number of layers
+
+    Yields:
+        element {Node} -- graph elements
+    """
+    def body():
+        yield ir.ConvRelu('input', to='(0,0,0)', n_filter=64, size=(32, 32))
+        prev, count, i = 'input', 1, 0
+        while count < layers:
+            left = layers - count
+            step = i % 5
+            if step == 0 and left >= 3:
+                yield blocks.multi_conv_relu(3, 'conv{}'.format(i), prev)
+                prev, count = 'conv{}_2'.format(i), count + 3
+            elif step == 1 and left >= 3:
+                yield blocks.bottleneck(3, 'neck{}'.format(i), prev)
+                prev, count = 'neck{}_2'.format(i), count + 3
+            elif step == 2:
+                yield blocks.upsample('up{}'.format(i), prev)
+                prev, count = 'up{}'.format(i), count + 1
+            elif step == 3:
+                yield blocks.conc('conc{}'.format(i), prev)
+                prev, count = 'conc{}'.format(i), count + 1
+            else:
+                yield blocks.sum('sum{}'.format(i), prev)
+                prev, count = 'sum{}'.format(i), count + 1
+            i += 1
+
+    return _document(body())
+
+
+def tikz_arch(layers):
+    """
+    Synthetic chain of conv_relu layers written with pycore.tikz directly
+
+    Arguments:
+        layers {int} -- number of layers
+
+    Yields:
+        fragment {str} -- graph elements
+    """
+    def body():
+        yield tikz.conv_relu('layer_0', to='(0,0,0)', n_filter=64, size=(32, 32))
+        for i in range(1, layers):
+            yield tikz.conv_relu('layer_{}'.format(i), offset='(1,0,0)', to='layer_{}-east'.format(i - 1),
+                                 n_filter=64, size=(32, 32))
+            yield tikz.short_connection('layer_{}'.format(i - 1), 'layer_{}'.format(i))
+
+    return _document(body())
+
+
+GENERATORS = {
+    'blocks': blocks_arch,
+    'tikz': tikz_arch,
+}
+
+
+def tex_memory(log):
+    """
+    Parse the memory statistics TeX writes to the end of its log
+
+    Arguments:
+        log {str} -- content of the .log file
+
+    Returns:
+        memory {dict} -- used and available amount per statistic, e.g. {'words of memory': (50041, 5000000)}
+    """
+    # some limits are printed as a sum, e.g. '15000+600000' control sequences
+    return {name: (int(used), sum(int(part) for part in total.split('+')))
+            for used, name, total in MEMORY_PATTERN.findall(log)}
+
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _generate(kind, layers, file):
+    # runs in a fresh process, so the peak RSS belongs to this architecture alone
+    start, cpu = time.perf_counter(), time.process_time()
+    chars = execute.write_fragments(GENERATORS[kind](layers), file)
+    return {
+        'generate_seconds': time.perf_counter() - start,
+        'generate_cpu_seconds': time.process_time() - cpu,
+        'tex_chars': chars,
+        'peak_rss': _peak_rss(),
+    }
+
+
+def measure(kind, layers, folder, engine='pdflatex', compile=True):
+    """
+    Generate and compile one synthetic architecture
+
+    Arguments:
+        kind {str} -- key of GENERATORS
+        layers {int} -- number of layers
+        folder {str} -- folder for the .tex and .pdf file
+
+    Keyword Arguments:
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+        compile {bool} -- run the engine, otherwise only generation is measured (default: {True})
+
+    Returns:
+        result {dict} -- measurements, values that could not be measured are None
+    """
+    file = os.path.join(folder, '{}_{}.tex'.format(kind, layers))
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        result = pool.submit(_generate, kind, layers, file).result()
+    result.update({
+        'kind': kind,
+        'layers': layers,
+        'tex_bytes': os.path.getsize(file),
+        'compiled': None,
+        'compile_seconds': None,
+        'main_memory': None,
+        'tex_memory': {},
+        'pdf_bytes': None,
+        'error': None,
+    })
+    if not compile:
+        return result
+    compiled = execute.compile_tex(file, output_dir=folder, engine=engine, folder=folder, keep_log=True)
+    memory = tex_memory(compiled.log)
+    capacity = CAPACITY_PATTERN.search(compiled.log)
+    result.update({
+        'compiled': compiled.ok,
+        'compile_seconds': compiled.seconds,
+        'main_memory': memory.get('words of memory', (None,))[0],
+        'tex_memory': memory,
+        'pdf_bytes': os.path.getsize(compiled.pdf) if compiled.ok else None,
+    })
+    if not compiled.ok:
+        lines = compiled.log.strip().splitlines() or ['']
+        result['error'] = 'TeX capacity exceeded: ' + capacity.group(1) if capacity else lines[-1]
+    return result
+
+
+def _commit():
+    try:
+        proc = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    return proc.stdout.decode().strip() or None
+
+
+def run(sizes=DEFAULT_SIZES, kinds=tuple(GENERATORS), engine='pdflatex', compile=True, folder=None):
+    """
+    Measure all combinations of architecture kind and size
+
+    Keyword Arguments:
+        sizes {iterable} -- numbers of layers (default: {(10, 100, 1000, 10000)})
+        kinds {iterable} -- keys of GENERATORS (default: {all})
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+        compile {bool} -- run the engine (default: {True})
+        folder {str} -- keep the generated files here instead of a temporary folder (default: {None})
+
+    Yields:
+        result {dict} -- measurements per architecture, see measure
+    """
+    with tempfile.TemporaryDirectory(prefix='pnn-bench-') as scratch:
+        folder = folder or scratch
+        os.makedirs(folder, exist_ok=True)
+        for kind in kinds:
+            for layers in sizes:
+                yield measure(kind, layers, folder, engine, compile)
+
+
+def compare(results, baseline):
+    """
+    Relative change of every metric against a previous run
+
+    Arguments:
+        results {list} -- measurements of this run
+        baseline {list} -- measurements of an earlier run
+
+    Yields:
+        change {tuple} -- (kind, layers, metric, old, new, ratio new / old)
+    """
+    old = {(r['kind'], r['layers']): r for r in baseline}
+    for result in results:
+        before = old.get((result['kind'], result['layers']))
+        if before is None:
+            continue
+        for metric in METRICS:
+            a, b = before.get(metric), result.get(metric)
+            if a and b is not None:
+                yield result['kind'], result['layers'], metric, a, b, b / a
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure generation and compilation of growing architectures.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='numbers of layers')
+    parser.add_argument('--kinds', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--engine', default='pdflatex', help='TeX engine (default: pdflatex)')
+    parser.add_argument('--no-compile', action='store_true', help='only measure generation')
+    parser.add_argument('--keep', metavar='DIR', default=None, help='keep the generated .tex and .pdf files')
+    parser.add_argument('-o', '--output', default=None, help='write the results as JSON to this file')
+    parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    results = []
+    print('{:<7} {:>6} {:>9} {:>10} {:>11} {:>9} {:>11} {:>10}'.format(
+        'kind', 'layers', 'gen [s]', 'rss [MB]', 'tex [kB]', 'tex [s]', 'tex memory', 'pdf [kB]'))
+    for result in run(args.sizes, args.kinds, args.engine, not args.no_compile, args.keep):
+        results.append(result)
+
+        def value(key, fmt, scale=1):
+            return fmt.format(result[key] / scale) if result[key] is not None else '-'
+
+        print('{:<7} {:>6} {:>9} {:>10} {:>11} {:>9} {:>11} {:>10}  {}'.format(
+            result['kind'], result['layers'], value('generate_seconds', '{:.3f}'),
+            value('peak_rss', '{:.1f}', 1 << 20), value('tex_bytes', '{:.1f}', 1 << 10),
+            value('compile_seconds', '{:.2f}'), value('main_memory', '{:d}'), value('pdf_bytes', '{:.1f}', 1 << 10),
+            result['error'] or ''))
+
+    report = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'engine': args.engine,
+        'engine_version': engine_version(args.engine),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        for kind, layers, metric, old, new, ratio in compare(results, baseline):
+            print('{:<7} {:>6} {:<17} {:>12.4g} -> {:<12.4g} {:+.1%}'.format(kind, layers, metric, old, new, ratio - 1))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,21 @@
 from math import log
 
-import pycore.tikz as tikz
+from pycore import ir, profiling
+# the original PlotNeuralNet API, pyexamples/unet.py gets it from here with `from pycore.blocks import *`
+from pycore.tikz import (to_begin, to_connection, to_Conv, to_ConvConvRelu, to_ConvRes, to_ConvSoftMax, to_cor,
+                         to_end, to_generate, to_head, to_input, to_Pool, to_skip, to_SoftMax, to_Sum, to_UnPool)
+
+__all__ = [
+    'conv', 'conv_pool', 'multi_conv', 'multi_conv_z', 'conv_relu', 'new_branch', 'multi_conv_relu', 'bottleneck',
+    'multi_conv_relu_z', 'upsample', 'block_unconv', 'block_2ConvPool', 'block_Unconv', 'res', 'shortcut', 'sum',
+    'mult', 'conc', 'yolo',
+    'to_head', 'to_cor', 'to_begin', 'to_end', 'to_input', 'to_Conv', 'to_ConvConvRelu', 'to_Pool', 'to_UnPool',
+    'to_ConvRes', 'to_ConvSoftMax', 'to_SoftMax', 'to_Sum', 'to_connection', 'to_skip', 'to_generate',
+]
 
 
 # define new block
+@profiling.block
 def conv(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32), width=0,
          caption=' ', conn=True, anchor='-east'):
     """
@@ -23,8 +35,8 @@ def conv(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32)
         conn {bool} -- draw short connection from prev layer (default: {False})
         anchor {str} -- position of anchor (default: {'-east'})
 
-    Returns:
-        layer {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
     if not isinstance(size, tuple):
         size = (size, size)
@@ -34,7 +46,7 @@ def conv(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32)
         prev = '{}_{}'.format(prev_s[0], str(int(prev_s[1]) - 1))
     if not width:
         width = log(n_filter, 4)
-    layer = tikz.conv(
+    yield ir.Conv(
         name='{}'.format(name),
         z_label=z_label,
         n_filter=(n_filter),
@@ -45,10 +57,10 @@ def conv(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32)
         size=size,
     )
     if conn:
-        layer += tikz.short_connection('{}'.format(prev), '{}'.format(name))
-    return layer
+        yield ir.ShortConnection('{}'.format(prev), '{}'.format(name))
 
 
+@profiling.block
 def conv_pool(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32), width=0, caption='',
               conn=True, opacity=0.5, anchor='-east'):
     """
@@ -68,12 +80,12 @@ def conv_pool(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
         conn {bool} -- draw short connection from prev layer (default: {False})
         anchor {str} -- position of anchor (default: {'-east'})
 
-    Returns:
-        layer {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
     if not isinstance(size, tuple):
         size = (size, size)
-    layer = tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(name),
         z_label=z_label,
         n_filter=(n_filter),
@@ -83,7 +95,7 @@ def conv_pool(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
         width=width,
         size=size,
     )
-    layer += tikz.pool(
+    yield ir.Pool(
         name='{}'.format(name),
         offset=(1, 0, 0),
         to='{}'.format(name),
@@ -92,13 +104,13 @@ def conv_pool(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
         opacity=opacity
     )
     if conn:
-        layer += tikz.short_connection(
+        yield ir.ShortConnection(
             '{}'.format(prev),
             '{}'.format(name)
         )
-    return layer
 
 
+@profiling.block
 def multi_conv(num, name, prev, layer_num=0, z_label='', n_filter=64, scale=32, name_start=0, offset=(1, 0, 0),
                width='0', size=(32, 32), opacity=0.5, conn=True, anchor='-east'):
     """
@@ -122,11 +134,10 @@ def multi_conv(num, name, prev, layer_num=0, z_label='', n_filter=64, scale=32,
         conn {bool} -- [description] (default: {False})
         anchor {str} -- [description] (default: {'-east'})
 
-    Returns:
-        [type] -- [description]
+    Yields:
+        element {Node} -- graph elements
     """
 
-    layers = []
     j = 0
     layer_names = [*['{}_{}'.format(name, i) for i in range(name_start, num + name_start)]]
     if not isinstance(n_filter, list):
@@ -134,7 +145,7 @@ def multi_conv(num, name, prev, layer_num=0, z_label='', n_filter=64, scale=32,
     if not isinstance(size, tuple):
         size = (size, size)
     # first layer
-    layer = [tikz.conv(
+    yield ir.Conv(
         name='{}'.format(layer_names[0]),
         caption=str(layer_num + j),
         offset=offset,
@@ -142,16 +153,15 @@ def multi_conv(num, name, prev, layer_num=0, z_label='', n_filter=64, scale=32,
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
+    )
     j += 1
-    layers = layer
     if conn:
-        layers += tikz.short_connection(prev, layer_names[0])
+        yield ir.ShortConnection(prev, layer_names[0])
     prev = layer_names[0]
 
     # middle layers
     for l_name in layer_names[1:-1]:
-        layer = [tikz.conv(
+        yield ir.Conv(
             name='{}'.format(l_name),
             caption=str(layer_num + j),
             offset='(0,0,0)',
@@ -159,13 +169,12 @@ def multi_conv(num, name, prev, layer_num=0, z_label='', n_filter=64, scale=32,
             n_filter=n_filter[j],
             size=size,
             width=log(n_filter[j], 4)
-        )]
+        )
         prev = l_name
-        layers += layer
         j += 1
 
     # last layer
-    layer = [tikz.conv(
+    yield ir.Conv(
         name='{}'.format(layer_names[-1]),
         caption=str(layer_num + j),
         offset='(0,0,0)',
@@ -174,11 +183,10 @@ def multi_conv(num, name, prev, layer_num=0, z_label='', n_filter=64, scale=32,
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
-    layers += layer
-    return layers
+    )
 
 
+@profiling.block
 def multi_conv_z(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start=0,
                  offset=(1, 0, 0), width='0', size=(32, 32), opacity=0.5, conn=True, anchor='-east'):
     """
@@ -201,11 +209,10 @@ def multi_conv_z(num, name, prev, layer_num=0, z_label='', n_filter=64, name_sta
         conn {bool} -- [description] (default: {False})
         anchor {str} -- [description] (default: {'-east'})
 
-    Returns:
-        layers {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
-    layers = []
     j = 0
     layer_names = [*['{}_{}'.format(name, i) for i in range(name_start, num + name_start)]]
     if not isinstance(n_filter, list):
@@ -213,7 +220,7 @@ def multi_conv_z(num, name, prev, layer_num=0, z_label='', n_filter=64, name_sta
     if not isinstance(size, tuple):
         size = (size, size)
     # first layer
-    layer = [tikz.conv(
+    yield ir.Conv(
         name='{}'.format(layer_names[0]),
         caption=str(layer_num + j),
         offset=offset,
@@ -221,16 +228,15 @@ def multi_conv_z(num, name, prev, layer_num=0, z_label='', n_filter=64, name_sta
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
+    )
     j += 1
-    layers = layer
     if conn:
-        layers += tikz.long_connection(prev, layer_names[0])
+        yield ir.LongConnection(prev, layer_names[0])
     prev = layer_names[0]
 
     # middle layers
     for l_name in layer_names[1:-1]:
-        layer = [tikz.conv(
+        yield ir.Conv(
             name='{}'.format(l_name),
             caption=str(layer_num + j),
             offset=offset,
@@ -238,12 +244,11 @@ def multi_conv_z(num, name, prev, layer_num=0, z_label='', n_filter=64, name_sta
             n_filter=n_filter[j],
             size=size,
             width=log(n_filter[j], 4)
-        )]
+        )
         prev = l_name
-        layers += layer
         j += 1
     # last layer
-    layer = [tikz.conv(
+    yield ir.Conv(
         name='{}'.format(layer_names[-1]),
         caption=str(layer_num + j),
         offset=offset,
@@ -252,11 +257,10 @@ def multi_conv_z(num, name, prev, layer_num=0, z_label='', n_filter=64, name_sta
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
-    layers += layer
-    return layers
+    )
 
 
+@profiling.block
 def conv_relu(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32), width=0,
               caption='', conn=True, anchor='-east', anchor_to='-west', rtl=False, label=True):
     """Generate convolution layer with relu activation
@@ -275,8 +279,8 @@ def conv_relu(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
         conn {bool} -- draw short connection from prev layer (default: {False})
         anchor {str} -- position of anchor (default: {'-east'})
 
-    Returns:
-        layer {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
     # if names are equal with incrementing numbers, assume name
@@ -288,7 +292,7 @@ def conv_relu(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
     if not isinstance(size, tuple):
         size = (size, size)
     if rtl:
-        layer = tikz.rtl_conv_relu(
+        yield ir.RtlConvRelu(
             name='{}'.format(name),
             z_label=z_label,
             n_filter=(n_filter),
@@ -299,7 +303,7 @@ def conv_relu(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
             size=size
         )
     else:
-        layer = tikz.conv_relu(
+        yield ir.ConvRelu(
             name='{}'.format(name),
             z_label=z_label,
             n_filter=(n_filter),
@@ -311,10 +315,10 @@ def conv_relu(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32
             label=label
         )
     if conn:
-        layer += tikz.short_connection('{}'.format(prev), '{}'.format(name), anchor_of=anchor, anchor_to=anchor_to)
-    return layer
+        yield ir.ShortConnection('{}'.format(prev), '{}'.format(name), anchor_of=anchor, anchor_to=anchor_to)
 
 
+@profiling.block
 def new_branch(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32), width=0,
                caption='', conn=True, anchor='-near'):
     """Generate convolution layer with relu activation
@@ -333,8 +337,8 @@ def new_branch(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(3
         conn {bool} -- draw short connection from prev layer (default: {False})
         anchor {str} -- position of anchor (default: {'-east'})
 
-    Returns:
-        layer {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
     # if names are equal with incrementing numbers, assume name
@@ -345,7 +349,7 @@ def new_branch(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(3
         width = log(n_filter, 4)
     if not isinstance(size, tuple):
         size = (size, size)
-    layer = tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(name),
         z_label=z_label,
         n_filter=(n_filter),
@@ -356,10 +360,10 @@ def new_branch(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(3
         size=size
     )
     if conn:
-        layer += tikz.z_connection('{}'.format(prev), '{}'.format(name), z_shift=offset[-1], anchor_of=anchor)
-    return layer
+        yield ir.ZConnection('{}'.format(prev), '{}'.format(name), z_shift=offset[-1], anchor_of=anchor)
 
 
+@profiling.block
 def multi_conv_relu(num, name, prev, layer_num=0, z_label='', n_filter=(64), name_start=0, offset=(1, 0, 0),
                     width=0, size=(32, 32), opacity=0.5, conn=True, anchor='-east'):
     """Generate multiple convolution layers with relu activation
@@ -381,11 +385,10 @@ def multi_conv_relu(num, name, prev, layer_num=0, z_label='', n_filter=(64), nam
         conn {bool} -- draw short connection from prev layer (default: {False})
         anchor {str} -- position of anchor (default: {'-east'})
 
-    Returns:
-        layers {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
-    layers = []
     j = 0
     layer_names = [*['{}_{}'.format(name, i) for i in range(name_start, num + name_start)]]
     if not isinstance(n_filter, list):
@@ -393,7 +396,7 @@ def multi_conv_relu(num, name, prev, layer_num=0, z_label='', n_filter=(64), nam
     if not isinstance(size, tuple):
         size = (size, size)
     # first layer
-    layer = [tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(layer_names[0]),
         caption=str(layer_num + j) if layer_num else '',
         offset=offset,
@@ -401,16 +404,15 @@ def multi_conv_relu(num, name, prev, layer_num=0, z_label='', n_filter=(64), nam
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
+    )
     j += 1
-    layers = layer
     if conn:
-        layers += tikz.short_connection(prev, layer_names[0])
+        yield ir.ShortConnection(prev, layer_names[0])
     prev = layer_names[0]
 
     # middle layers
     for l_name in layer_names[1:-1]:
-        layer = [tikz.conv_relu(
+        yield ir.ConvRelu(
             name='{}'.format(l_name),
             caption=str(layer_num + j) if layer_num else '',
             offset='(0,0,0)',
@@ -418,12 +420,11 @@ def multi_conv_relu(num, name, prev, layer_num=0, z_label='', n_filter=(64), nam
             n_filter=n_filter[j],
             size=size,
             width=log(n_filter[j], 4)
-        )]
+        )
         prev = l_name
-        layers += layer
         j += 1
     # last layer
-    layer = [tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(layer_names[-1]),
         caption=str(layer_num + j) if layer_num else '',
         offset='(0,0,0)',
@@ -432,11 +433,10 @@ def multi_conv_relu(num, name, prev, layer_num=0, z_label='', n_filter=(64), nam
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
-    layers += layer
-    return layers
+    )
 
 
+@profiling.block
 def bottleneck(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start=0, offset=(1, 0, 0),
                width=0, size=(32, 32), opacity=0.5, conn=True, anchor='-east', ellipsis=False, pos=1.5):
     """Generate multiple convolution layers with relu activation
@@ -460,11 +460,10 @@ def bottleneck(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start
         ellipsis {bool} -- draw an ellipsis before the first layer (default: {False})
         pos {int} -- position of the long connection (default: {1.5})
 
-    Returns:
-        layers {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
-    layers = []
     j = 0
     prev_layer = prev
     layer_names = [*['{}_{}'.format(name, i) for i in range(name_start, num + name_start)]]
@@ -473,7 +472,7 @@ def bottleneck(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start
     if not isinstance(size, tuple):
         size = (size, size)
     # first layer
-    layer = [tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(layer_names[0]),
         caption=str(layer_num + j),
         offset=offset,
@@ -481,21 +480,20 @@ def bottleneck(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
+    )
     j += 1
-    layers = layer
     if conn:
-        layers += tikz.short_connection(prev, layer_names[0], name='({}_connection)'.format(name), options='pos=0.55')
+        yield ir.ShortConnection(prev, layer_names[0], name='({}_connection)'.format(name), options='pos=0.55')
     if ellipsis:
-        layers += tikz.ellipsis(prev, layer_names[0])
-        layers += r'''
+        yield ir.EllipsisConnection(prev, layer_names[0])
+        yield r'''
         \coordinate [shift={(-0.25,0,0)}] (''' + name + '''_connection) at (''' + layer_names[0] + '''-west);
         '''
     prev = layer_names[0]
 
     # middle layers
     for l_name in layer_names[1:-1]:
-        layer = [tikz.conv_relu(
+        yield ir.ConvRelu(
             name='{}'.format(l_name),
             caption=str(layer_num + j),
             offset='(0,0,0)',
@@ -503,12 +501,11 @@ def bottleneck(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start
             n_filter=n_filter[j],
             size=size,
             width=log(n_filter[j], 4)
-        )]
+        )
         prev = l_name
-        layers += layer
         j += 1
     # last layer
-    layer = [tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(layer_names[-1]),
         caption=str(layer_num + j),
         offset='(0,0,0)',
@@ -517,20 +514,19 @@ def bottleneck(num, name, prev, layer_num=0, z_label='', n_filter=64, name_start
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
-    layers += layer
+    )
     prev = layer_names[-1]
-    # layers += tikz.relu(
+    # yield ir.Relu(
     #     name='{}_relu'.format(layer_names[-1]),
     #     to='{}{}'.format(prev, anchor),
     #     offset=(1, 0, 0),
     #     size=size)
-    # layers += tikz.short_connection('{}'.format(layer_names[-1]), '{}_relu'.format(layer_names[-1]))
-    layers += tikz.long_connection_reversed('{}'.format(layer_names[-1]), '{}_connection'.format(name), pos=pos,
-                                            anchor_to='')
-    return layers
+    # yield ir.ShortConnection('{}'.format(layer_names[-1]), '{}_relu'.format(layer_names[-1]))
+    yield ir.LongConnectionReversed('{}'.format(layer_names[-1]), '{}_connection'.format(name), pos=pos,
+                                    anchor_to='')
 
 
+@profiling.block
 def multi_conv_relu_z(num, name, prev, layer_num=0, z_label='', n_filter='', name_start=0, offset=(1, 0, 0),
                       width='0', size=(32, 32), opacity=0.5, conn=True, anchor='-east'):
     """Generate multiple convolution layers with relu activation along the z axis
@@ -552,11 +548,10 @@ def multi_conv_relu_z(num, name, prev, layer_num=0, z_label='', n_filter='', nam
         conn {bool} -- [description] (default: {False})
         anchor {str} -- [description] (default: {'-east'})
 
-    Returns:
-        layers {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
-    layers = []
     j = 0
     layer_names = [*['{}_{}'.format(name, i) for i in range(name_start, num + name_start)]]
     if not isinstance(n_filter, list):
@@ -568,35 +563,33 @@ def multi_conv_relu_z(num, name, prev, layer_num=0, z_label='', n_filter='', nam
     if not isinstance(size, tuple):
         size = (size, size)
     # first layer
-    layer = [tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(layer_names[0]),
         offset=offset_str,
         to='{}{}'.format(prev, anchor),
         size=size,
         width=log(n_filter[j], 4)
-    )]
+    )
     j += 1
-    layers = layer
     if conn:
-        layers += tikz.short_connection(of=prev, to=layer_names[0], anchor_of='-near', anchor_to='-far')
+        yield ir.ShortConnection(of=prev, to=layer_names[0], anchor_of='-near', anchor_to='-far')
     prev = layer_names[0]
 
     # middle layers
     for l_name in layer_names[1:-1]:
-        layer = [tikz.conv_relu(
+        yield ir.ConvRelu(
             name='{}'.format(l_name),
             offset=offset_str,
             to='{}{}'.format(prev, anchor),
             size=size,
             width=log(n_filter[j], 4)
-        )]
-        layers += layer
+        )
         j += 1
         if conn:
-            layers += tikz.short_connection(of=prev, to=l_name, anchor_of='-near', anchor_to='-far')
+            yield ir.ShortConnection(of=prev, to=l_name, anchor_of='-near', anchor_to='-far')
         prev = l_name
     # last layer
-    layer = [tikz.conv_relu(
+    yield ir.ConvRelu(
         name='{}'.format(layer_names[-1]),
         caption=str(layer_num + j),
         offset=offset_str,
@@ -605,13 +598,12 @@ def multi_conv_relu_z(num, name, prev, layer_num=0, z_label='', n_filter='', nam
         n_filter=n_filter[j],
         size=size,
         width=log(n_filter[j], 4)
-    )]
-    layers += layer
+    )
     if conn:
-        layers += tikz.short_connection(of=prev, to=layer_names[-1], anchor_of='-near', anchor_to='-far')
-    return layers
+        yield ir.ShortConnection(of=prev, to=layer_names[-1], anchor_of='-near', anchor_to='-far')
 
 
+@profiling.block
 def upsample(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32), width=0, opacity=0.5,
              caption='', conn=True, anchor='-west', anchor_of='-east'):
     """
@@ -633,8 +625,8 @@ def upsample(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32,
         conn {bool} -- draw short connection from prev layer (default: {False})
         anchor {str} -- position of anchor (default: {'-east'})
 
-    Returns:
-        layer {list} -- list of graph elements
+    Yields:
+        element {Node} -- graph elements
     """
 
     # if names are equal with incrementing numbers, assume name
@@ -645,7 +637,7 @@ def upsample(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32,
         width = log(n_filter, 4)
     if not isinstance(size, tuple):
         size = (size, size)
-    layer = tikz.upsample(
+    yield ir.Upsample(
         name='{}'.format(name),
         z_label=z_label,
         n_filter=(n_filter),
@@ -657,62 +649,74 @@ def upsample(name, prev='', z_label='', n_filter=64, offset=(1, 0, 0), size=(32,
         size_2=(2 * size[0], 2 * size[1]),
     )
     if conn:
-        layer += tikz.short_connection(of=prev, to='{}_0'.format(name), anchor_of=anchor_of)
-    return layer
+        yield ir.ShortConnection(of=prev, to='{}_0'.format(name), anchor_of=anchor_of)
 
 
+@profiling.block
 def block_unconv(name, bottom, top, z_label='', n_filter=64, offset=(1, 0, 0), size=(32, 32, 3.5), opacity=0.5):
-    layers = tikz.unpool(
+    yield ir.Unpool(
         name='unpool_{}'.format(name), offset=offset, to='({}-east)'.format(bottom),
         width=1, height=size[0], depth=size[1], opacity=opacity)
-    layers += tikz.conv_res(
+    yield ir.ConvRes(
         name='ccr_res_{}'.format(name), offset='(0,0,0)', to='(unpool_{}-east)'.format(name),
         z_label=z_label, n_filter=str(n_filter), width=size[2], height=size[0], depth=size[1], opacity=opacity)
-    layers += tikz.conv(
+    yield ir.Conv(
         name='ccr_{}'.format(name), offset='(0,0,0)', to='(ccr_res_{}-east)'.format(name),
-        z_label=z_label, n_filter=str(n_filter), width=size[2], height=size[0], depth=size[1])
-    layers += tikz.conv_res(
+        z_label=z_label, n_filter=str(n_filter), width=size[2], size=(size[0], size[1]))
+    yield ir.ConvRes(
         name='ccr_res_c_{}'.format(name), offset='(0,0,0)', to='(ccr_{}-east)'.format(name),
         z_label=z_label, n_filter=str(n_filter), width=size[2], height=size[0], depth=size[1], opacity=opacity)
-    layers += tikz.conv(
+    yield ir.Conv(
         name='{}'.format(top), offset='(0,0,0)', to='(ccr_res_c_{}-east)'.format(name),
-        z_label=z_label, n_filter=str(n_filter), width=size[2], height=size[0], depth=size[1])
-    layers += tikz.short_connection(
+        z_label=z_label, n_filter=str(n_filter), width=size[2], size=(size[0], size[1]))
+    yield ir.ShortConnection(
         '{}'.format(bottom),
         'unpool_{}'.format(name)
     )
-    return layers
 
 
+@profiling.block
+def block_2ConvPool(name, botton, top, s_filer=256, n_filer=64, offset='(1,0,0)', size=(32, 32, 3.5), opacity=0.5):
+    # block of the original PlotNeuralNet API: two convolutions and a pooling layer
+    yield ir.ConvRelu(
+        name='ccr_{}'.format(name), z_label=s_filer, n_filter=[n_filer, n_filer], offset=offset,
+        to='{}-east'.format(botton), width=[size[2], size[2]], size=(size[0], size[1]))
+    yield ir.Pool(
+        name='{}'.format(top), offset='(0,0,0)', to='ccr_{}'.format(name), width=1,
+        size=(size[0] - int(size[0] / 4), size[1] - int(size[0] / 4)), opacity=opacity)
+    yield ir.ShortConnection('{}'.format(botton), 'ccr_{}'.format(name))
+
+
+def block_Unconv(name, botton, top, s_filer=256, n_filer=64, offset='(1,0,0)', size=(32, 32, 3.5), opacity=0.5):
+    # block_unconv with the argument names of the original PlotNeuralNet API
+    return block_unconv(name, botton, top, z_label=s_filer, n_filter=n_filer, offset=offset, size=size,
+                        opacity=opacity)
+
+
+@profiling.block
 def res(num, name, bottom, top, start_no=0, z_label='', n_filter=64,
         offset=(0, 0, 0), size=(32, 32, 3.5), opacity=0.5):
-    layers = []
     layer_names = [*['{}_{}'.format(name, i) for i in range(num - 1)], top]
-    for name in layers:
-        layer = [tikz.conv(
-            name='{}'.format(name),
+    for layer_name in layer_names:
+        yield ir.Conv(
+            name='{}'.format(layer_name),
             offset=offset,
             to='{}-east'.format(bottom),
             z_label=z_label,
             n_filter=str(n_filter),
             width=size[2],
-            height=size[0],
-            depth=size[1]),
-            tikz.short_connection(
-                '{}'.format(bottom),
-                '{}'.format(name))
-        ]
-        bottom = name
-        layers += layer
+            size=(size[0], size[1]))
+        yield ir.ShortConnection(
+            '{}'.format(bottom),
+            '{}'.format(layer_name))
+        bottom = layer_name
 
-    layers += [
-        tikz.skip(of=layer_names[1], to=layer_names[-2], pos=1.25),
-    ]
-    return layers
+    yield ir.Skip(of=layer_names[1], to=layer_names[-2], pos=1.25)
 
 
+@profiling.block
 def shortcut(name, prev, offset=(1, 0, 0), size=[40, 40], anchor='-east', caption='', z_label='', conn=True):
-    layer = tikz.shortcut(
+    yield ir.Shortcut(
         name='{}'.format(name),
         z_label=z_label,
         to='{}{}'.format(prev, anchor),
@@ -720,53 +724,53 @@ def shortcut(name, prev, offset=(1, 0, 0), size=[40, 40], anchor='-east', captio
         caption=caption,
         size=size)
     if conn:
-        layer += tikz.short_connection(of=prev, to=name)
-    return layer
+        yield ir.ShortConnection(of=prev, to=name)
 
 
+@profiling.block
 def sum(name, prev, offset=(1, 0, 0), conn=True):
-    layer = tikz.add(
+    yield ir.Add(
         name='{}'.format(name),
         to='{}'.format(prev),
         offset='{}'.format(offset)
     )
     if conn:
-        layer += tikz.short_connection(
+        yield ir.ShortConnection(
             '{}'.format(prev),
             '{}'.format(name)
         )
-    return layer
 
 
+@profiling.block
 def mult(name, prev, offset=(1, 0, 0), conn=True):
-    layer = tikz.multiply(
+    yield ir.Multiply(
         name='{}'.format(name),
         to='{}'.format(prev),
         offset='{}'.format(offset)
     )
     if conn:
-        layer += tikz.short_connection(
+        yield ir.ShortConnection(
             '{}'.format(prev),
             '{}'.format(name)
         )
-    return layer
 
 
+@profiling.block
 def conc(name, prev, offset=(1, 0, 0), conn=True, anchor_to='-east'):
-    layer = tikz.concatenate(
+    yield ir.Concatenate(
         name='{}'.format(name),
         to='{}'.format(prev),
         offset='{}'.format(offset),
         anchor_to=anchor_to
     )
     if conn:
-        tikz.short_connection(
+        yield ir.ShortConnection(
             '{}'.format(prev),
             '{}'.format(name)
         )
-    return layer
 
 
+@profiling.block
 def yolo(name, prev='', z_label='', n_filter=64, offset='(-1,0,4)', size=[32, 32], width=1, scale=32,
          caption=' ', conn=True, anchor='-east', image=False, path='\\input_image', grid=False, steps=1):
     if not prev:
@@ -775,7 +779,7 @@ def yolo(name, prev='', z_label='', n_filter=64, offset='(-1,0,4)', size=[32, 32
         prev = '{}_{}'.format(prev_s[0], str(int(prev_s[1]) - 1))
     if not width:
         width = log(n_filter, 4)
-    layer = tikz.detect(
+    yield ir.Detect(
         name='{}'.format(name),
         z_label=z_label,
         n_filter=(n_filter),
@@ -786,10 +790,9 @@ def yolo(name, prev='', z_label='', n_filter=64, offset='(-1,0,4)', size=[32, 32
         size=size
     )
     if image:
-        layer += tikz.image('image_{}'.format(name), path, to=(name + anchor), size=[(size[0] / 5), (size[1] / 5)])
+        yield ir.Image('image_{}'.format(name), path, to=(name + anchor), size=[(size[0] / 5), (size[1] / 5)])
     if grid:
-        layer += tikz.grid('grid_{}'.format(name), 'image_{}'.format(name), size=[(size[0] / 5), (size[1] / 5)],
-                           steps=steps)
+        yield ir.Grid('grid_{}'.format(name), 'image_{}'.format(name), size=[(size[0] / 5), (size[1] / 5)],
+                      steps=steps)
     if conn:
-        layer += tikz.short_connection('{}'.format(prev), '{}'.format(name), anchor_of='-near', anchor_to='-far')
-    return layer
+        yield ir.ShortConnection('{}'.format(prev), '{}'.format(name), anchor_of='-near', anchor_to='-far')
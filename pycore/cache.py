@@ -0,0 +1,334 @@
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import string
+import struct
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, the counters are updated without a lock there
+    fcntl = None
+
+# default size cap of the store
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+IMPORT_PATTERN = re.compile(r'\\(?:sub)?import\{([^}]*)\}\{([^}]*)\}')
+INPUT_PATTERN = re.compile(r'\\input\{([^}]*)\}')
+PACKAGE_PATTERN = re.compile(r'\\usepackage(?:\[[^\]]*\])?\{([^}]*)\}')
+GRAPHICS_PATTERN = re.compile(r'\\includegraphics(?:\[[^\]]*\])?\{([^}]*)\}')
+DEF_PATTERN = re.compile(r'\\def\\(\w+)\{([^}]*)\}')
+IMAGE_EXTENSIONS = ('', '.pdf', '.png', '.jpg', '.jpeg')
+# compiled files kept in the store, the pdf or the dvi written by latex
+OUTPUT_EXTENSIONS = ('.pdf', '.dvi')
+# hit and miss counters and the estimated size of the store, kept as fixed-size integers in COUNTER_FILE
+COUNTERS = ('hits', 'misses', 'bytes')
+COUNTER_FILE = 'counters'
+COUNTER_FORMAT = struct.Struct('<' + 'Q' * len(COUNTERS))
+
+
+def default_root():
+    root = os.environ.get('PLOTNEURALNET_CACHE')
+    if root:
+        return root
+    base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'plotneuralnet')
+
+
+@lru_cache(maxsize=None)
+def engine_version(engine):
+    """
+    First line of `engine --version`, part of every cache key
+
+    Arguments:
+        engine {str} -- TeX engine executable
+
+    Returns:
+        version {str} -- version string or an empty string if the engine is not available
+    """
+    try:
+        proc = subprocess.run([engine, '--version'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return ''
+    return proc.stdout.decode(errors='replace').split('\n', 1)[0]
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def dependencies(file, folder=None):
+    """
+    Find the files a .tex file pulls in
+
+    Follows \\import, \\subimport and \\input recursively and picks up packages that live next to an imported file
+    (the layers/*.sty styles) as well as images included with \\includegraphics, also when the path is given through
+    a \\def macro as done by tikz.def_colors.
+
+    Arguments:
+        file {str} -- path of the .tex file
+
+    Keyword Arguments:
+        folder {str} -- folder the paths in the file are relative to, defaults to its own folder (default: {None})
+
+    Returns:
+        files {list} -- sorted absolute paths, images that do not exist are listed as given
+    """
+    found = set()
+    macros = {}
+    file = os.path.abspath(file)
+    folders = {file: folder or os.path.dirname(file)}
+    todo = [file]
+    while todo:
+        path = todo.pop()
+        folder = folders.get(path) or os.path.dirname(path)
+        text = _read(path).decode(errors='replace')
+        macros.update(DEF_PATTERN.findall(text))
+        children = []
+        for directory, name in IMPORT_PATTERN.findall(text):
+            children.append(os.path.join(folder, directory, name))
+        for name in INPUT_PATTERN.findall(text):
+            children.append(os.path.join(folder, name))
+        for names in PACKAGE_PATTERN.findall(text):
+            for name in names.split(','):
+                children.append(os.path.join(folder, name.strip() + '.sty'))
+        for child in children:
+            if not os.path.splitext(child)[1]:
+                child += '.tex'
+            child = os.path.abspath(child)
+            if child not in found and os.path.isfile(child):
+                found.add(child)
+                todo.append(child)
+        for name in GRAPHICS_PATTERN.findall(text):
+            name = name.strip()
+            if name.startswith('\\'):
+                name = macros.get(name[1:], name)
+            candidates = [os.path.abspath(os.path.join(folder, name + ext)) for ext in IMAGE_EXTENSIONS]
+            found.add(next((c for c in candidates if os.path.isfile(c)), name))
+    return sorted(found)
+
+
+class BuildCache:
+    """
+    Content addressed store of compiled pdfs
+
+    Entries are keyed on the hash of the TeX source, every style file and image it depends on and the engine version,
+    and stored with the extension of the engine output, e.g. the .dvi of latex.
+    The store is capped in size, the least recently used entries are evicted first.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or default_root()
+        self.max_bytes = max_bytes
+
+    def key(self, file, engine='pdflatex', folder=None):
+        digest = hashlib.sha256()
+        digest.update(engine.encode() + b'\0' + engine_version(engine).encode() + b'\0')
+        digest.update(_read(file))
+        for dep in dependencies(file, folder):
+            digest.update(b'\0' + os.path.basename(dep).encode() + b'\0')
+            digest.update(_read(dep) if os.path.isfile(dep) else b'missing')
+        return digest.hexdigest()
+
+    def _path(self, key, extension='.pdf'):
+        return os.path.join(self.root, key[:2], key + extension)
+
+    @contextmanager
+    def _counters(self):
+        # read, change and write back under an exclusive lock, so concurrent jobs never lose an update
+        os.makedirs(self.root, exist_ok=True)
+        fd = os.open(os.path.join(self.root, COUNTER_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        with open(fd, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            counts = _read_counts(f)
+            if counts is None:
+                # a new counter file, or a store written before it existed
+                counts = dict.fromkeys(COUNTERS, 0)
+                counts['bytes'] = sum(size for _, size, _ in self.entries())
+            yield counts
+            f.seek(0)
+            f.write(COUNTER_FORMAT.pack(*(counts[counter] for counter in COUNTERS)))
+
+    def _count(self, name):
+        with self._counters() as counts:
+            counts[name] += 1
+
+    def counts(self):
+        """
+        Hits, misses and the estimated size of the store
+
+        Returns:
+            counts {dict} -- counter name -> value, see COUNTERS
+        """
+        try:
+            with open(os.path.join(self.root, COUNTER_FILE), 'rb') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                counts = _read_counts(f)
+        except OSError:
+            counts = None
+        return counts or dict.fromkeys(COUNTERS, 0)
+
+    def get(self, key, extension='.pdf'):
+        """
+        Look up a pdf
+
+        Arguments:
+            key {str} -- cache key
+
+        Keyword Arguments:
+            extension {str} -- extension of the engine output, e.g. '.dvi' for latex (default: {'.pdf'})
+
+        Returns:
+            path {str} -- path of the stored pdf or None on a miss
+        """
+        path = self._path(key, extension)
+        try:
+            os.utime(path)
+        except OSError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return path
+
+    def put(self, key, pdf):
+        """
+        Store a pdf and evict old entries if the store grew beyond its cap
+
+        The store keeps an estimate of its size and is only walked to evict entries once the estimate crosses the cap.
+
+        Arguments:
+            key {str} -- cache key
+            pdf {str} -- path of the compiled pdf, or of another output in OUTPUT_EXTENSIONS, stored with its extension
+
+        Returns:
+            path {str} -- path of the stored copy
+        """
+        path = self._path(key, os.path.splitext(pdf)[1] or '.pdf')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(pdf, tmp)
+        with self._counters() as counts:
+            counts['bytes'] += os.path.getsize(tmp)
+            os.replace(tmp, path)
+            full = counts['bytes'] > self.max_bytes
+        if full:
+            self.evict()
+        return path
+
+    def _shards(self):
+        # folders named after the first two hex digits of the keys, formats/ and blocks/ next to them belong to
+        # pycore.preamble and pycore.externalize
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return [os.path.join(self.root, name) for name in sorted(names)
+                if len(name) == 2 and all(c in string.hexdigits for c in name)]
+
+    def entries(self):
+        result = []
+        for folder in self._shards():
+            for name in os.listdir(folder):
+                if name.endswith(OUTPUT_EXTENSIONS):
+                    path = os.path.join(folder, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    result.append((st.st_mtime, st.st_size, path))
+        return result
+
+    def evict(self):
+        # holds the counter lock, so concurrent jobs do not evict at the same time, and corrects the size estimate
+        with self._counters() as counts:
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+            counts['bytes'] = total
+
+    def stats(self):
+        counts = self.counts()
+        hits, misses = counts['hits'], counts['misses']
+        entries = self.entries()
+        return {
+            'root': self.root,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+    def clear(self):
+        # only the pdfs and counters, the formats and blocks kept in the same root stay
+        for folder in self._shards():
+            shutil.rmtree(folder, ignore_errors=True)
+        try:
+            os.remove(os.path.join(self.root, COUNTER_FILE))
+        except OSError:
+            pass
+
+
+def _read_counts(f):
+    # None for an empty or truncated file
+    f.seek(0)
+    data = f.read(COUNTER_FORMAT.size)
+    if len(data) != COUNTER_FORMAT.size:
+        return None
+    return dict(zip(COUNTERS, COUNTER_FORMAT.unpack(data)))
+
+
+def main(argv=None):
+    from pycore import execute
+
+    parser = argparse.ArgumentParser(description='PlotNeuralNet build cache.')
+    parser.add_argument('--dir', default=None, help='cache folder (default: $PLOTNEURALNET_CACHE or ~/.cache)')
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES, help='size cap of the store')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='compile .tex files, reusing cached pdfs')
+    build.add_argument('files', nargs='+')
+    build.add_argument('--engine', default='pdflatex')
+    commands.add_parser('stats', help='print hit rate and size of the store')
+    commands.add_parser('clear', help='delete all cached pdfs and counters')
+    args = parser.parse_args(argv)
+
+    cache = BuildCache(args.dir, args.max_bytes)
+    if args.command == 'stats':
+        for name, value in cache.stats().items():
+            print('{:<10} {}'.format(name, value))
+    elif args.command == 'clear':
+        cache.clear()
+    else:
+        failed = 0
+        for file in args.files:
+            result = execute.compile_tex(file, engine=args.engine, cache=cache)
+            status = 'hit' if result.cached else ('ok' if result.ok else 'FAIL')
+            print('{:<4} {:8.2f}s  {}'.format(status, result.seconds, file))
+            if not result.ok:
+                failed += 1
+                print(result.log)
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
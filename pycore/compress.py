@@ -0,0 +1,137 @@
+import re
+from string import ascii_letters
+
+from pycore import execute
+
+# names, numbers and anchors, but not the letters of control sequences such as \ConvColor
+TOKEN_PATTERN = re.compile(r'(?<![\\\w.+-])[\w.+-]+')
+# TeX macros take at most nine arguments
+MAX_ARGUMENTS = 9
+# macros of other modules start with pnn as well, e.g. \pnnstyles and \pnntimer
+PREFIX = 'pnnm'
+
+
+def macro_name(index):
+    # control sequence names are letters only
+    letters = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, len(ascii_letters))
+        letters = ascii_letters[rest] + letters
+    return PREFIX + letters
+
+
+def _template(text):
+    # literal parts around the tokens, and the tokens
+    parts = TOKEN_PATTERN.split(text)
+    return tuple(parts), TOKEN_PATTERN.findall(text)
+
+
+def _slots(parts, instances):
+    """
+    Spans of tokens that become macro arguments
+
+    Every token that differs between instances is an argument. Arguments separated by a short literal without braces
+    are merged until there are at most nine of them.
+
+    Returns:
+        slots {list} -- (first token, last token) per argument, None if the template needs too many arguments
+    """
+    varying = [i for i in range(len(instances[0])) if any(tokens[i] != instances[0][i] for tokens in instances)]
+    slots = [(i, i) for i in varying]
+    while len(slots) > MAX_ARGUMENTS:
+        gaps = []
+        for index in range(len(slots) - 1):
+            last, first = slots[index][1], slots[index + 1][0]
+            between = parts[last + 1] + ''.join(instances[0][t] + parts[t + 1] for t in range(last + 1, first))
+            if '{' not in between and '}' not in between and '#' not in between:
+                gaps.append((len(between), index))
+        if not gaps:
+            return None
+        _, index = min(gaps)
+        slots[index:index + 2] = [(slots[index][0], slots[index + 1][1])]
+    return slots
+
+
+def _render(parts, tokens, slots, values=None):
+    # the text with the slots replaced by #1.. or, given values, by the call arguments
+    out = [parts[0]]
+    slot = 0
+    token = 0
+    while token < len(tokens):
+        if slot < len(slots) and token == slots[slot][0]:
+            first, last = slots[slot]
+            if values is None:
+                out.append('#{}'.format(slot + 1))
+            else:
+                values.append(''.join(tokens[i] + (parts[i + 1] if i < last else '') for i in range(first, last + 1)))
+            out.append(parts[last + 1])
+            slot += 1
+            token = last + 1
+            continue
+        out.append(tokens[token])
+        out.append(parts[token + 1])
+        token += 1
+    return ''.join(out)
+
+
+def compress(arch, min_count=2):
+    """
+    Emit elements that only differ in names, numbers and positions once as a TeX macro and call it per instance
+
+    Deep networks repeat the same layers and connections hundreds of times, as macros the .tex file shrinks to a
+    fraction and TeX reads every layer definition only once. The architecture is generated in memory first, since all
+    instances have to be known before a macro can be defined.
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+
+    Keyword Arguments:
+        min_count {int} -- number of instances from which a macro is defined (default: {2})
+
+    Yields:
+        fragment {str} -- TeX fragments with the macro definitions right after the beginning of the picture
+    """
+    fragments = list(execute.iter_fragments(arch))
+    begin = next((i for i, text in enumerate(fragments) if '\\begin{tikzpicture}' in text), None)
+    end = next((i for i, text in enumerate(fragments) if '\\end{tikzpicture}' in text), len(fragments))
+    if begin is None:
+        yield from fragments
+        return
+    templates = {}
+    parsed = {}
+    for index in range(begin + 1, end):
+        text = fragments[index]
+        if '#' in text or not text.strip():
+            continue
+        parts, tokens = _template(text)
+        parsed[index] = (parts, tokens)
+        templates.setdefault(parts, []).append(index)
+
+    macros = {}
+    definitions = []
+    for parts, indices in templates.items():
+        if len(indices) < min_count:
+            continue
+        instances = [parsed[index][1] for index in indices]
+        slots = _slots(parts, instances)
+        if slots is None:
+            continue
+        name = macro_name(len(definitions))
+        body = _render(parts, instances[0], slots)
+        definitions.append('\\long\\def\\{}{}{{{}}}\n'.format(
+            name, ''.join('#{}'.format(i + 1) for i in range(len(slots))), body))
+        macros[parts] = (name, slots)
+
+    yield from fragments[:begin + 1]
+    yield ''.join(definitions)
+    for index in range(begin + 1, end):
+        if index not in parsed or parsed[index][0] not in macros:
+            yield fragments[index]
+            continue
+        parts, tokens = parsed[index]
+        name, slots = macros[parts]
+        values = []
+        _render(parts, tokens, slots, values)
+        yield '\\{}{}\n'.format(name, ''.join('{' + value + '}' for value in values))
+    yield from fragments[end:]
@@ -0,0 +1,91 @@
+import re
+
+from pycore import execute
+
+# label keys of the pic styles, values are either a brace group or run up to the next comma
+LABEL_PATTERN = re.compile(r'\b(caption|xlabel|ylabel|zlabel)=(\{(?:[^{}]|\{[^{}]*\})*\}|[^,\n{}]*)')
+# xlabel is an array indexed per box, so only its entries are emptied
+ARRAY_PATTERN = re.compile(r'[^{}(),]')
+
+
+def overrides(images=True):
+    """
+    TeX redefining the expensive parts of the styles for the rest of the picture
+
+    Transparency is dropped, so no transparency groups end up in the pdf. Faces drawn with fill opacity=0 to
+    redraw edges stay unfilled, the ball shading becomes a plain fill and the decorated fuse connection a plain arrow.
+    Labels are set in the normal size and streams are not compressed.
+
+    Keyword Arguments:
+        images {bool} -- replace included images with framed placeholders, see the draft option of graphicx
+                         (default: {True})
+
+    Returns:
+        tex {str} -- TeX to place inside the tikzpicture, after the connection styles
+    """
+    tex = r'''
+        \tikzset{
+            opacity/.code={},
+            draw opacity/.code={},
+            text opacity/.code={},
+            fill opacity/.code={\ifdim#1pt=0pt\tikzset{fill=none}\fi},
+            ball color/.style={fill=#1},
+            shade/.code={},
+        }
+        \tikzstyle{connection}=[ultra thick,every node/.style={sloped,allow upside down},draw=\edgecolor]
+        \tikzstyle{copyconnection}=[ultra thick,every node/.style={sloped,allow upside down},draw={rgb:blue,4;red,1;green,1;black,3}]
+        \tikzstyle{fuseconnection}=[ultra thick,every node/.style={sloped,allow upside down},draw=orange,-Stealth]
+        \let\Large\normalsize
+        \ifdefined\pdfcompresslevel\pdfcompresslevel=0 \fi
+'''
+    if images:
+        tex += '        \\setkeys{Gin}{draft}\n'
+    return tex
+
+
+def _empty_label(match):
+    if match.group(1) == 'xlabel':
+        return 'xlabel=' + ARRAY_PATTERN.sub('', match.group(2))
+    return match.group(1) + '={}'
+
+
+def strip_labels(text):
+    """
+    Empty the captions and dimension labels of all pics in a fragment
+
+    Arguments:
+        text {str} -- TeX fragment
+
+    Returns:
+        text {str} -- the fragment with empty labels, the number of boxes per pic is kept
+    """
+    return LABEL_PATTERN.sub(_empty_label, text)
+
+
+def simplify(arch, labels=True, images=True):
+    """
+    Draft profile of an architecture for fast previews while editing
+
+    The elements are passed through unchanged except for the labels, the cheaper styles are set up once right after
+    the picture begins. pdflatex -draftmode is of no use here since it does not write a pdf at all.
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+
+    Keyword Arguments:
+        labels {bool} -- keep captions and dimension labels (default: {True})
+        images {bool} -- replace images with placeholders (default: {True})
+
+    Yields:
+        fragment {str} -- TeX fragments of the draft
+    """
+    inside = False
+    for element in execute.flatten(arch):
+        text = element if isinstance(element, str) else str(element)
+        if not inside:
+            yield text
+            if '\\begin{tikzpicture}' in text:
+                inside = True
+                yield overrides(images)
+            continue
+        yield text if labels else strip_labels(text)
@@ -0,0 +1,196 @@
+import argparse
+import os
+import re
+import shutil
+import sys
+from collections import namedtuple
+
+from pycore import execute, profiling
+from pycore.cache import BuildCache
+
+DEFAULT_ENGINE = 'pdflatex'
+# engine name or 'auto', read by execute.tex_to_pdf and tikzmake.sh
+ENGINE_VARIABLE = 'PLOTNEURALNET_ENGINE'
+# drawn elements from which pdflatex's fixed main memory is likely to run out, see python -m pycore.benchmark
+LARGE_DIAGRAM = 1500
+ELEMENT_PATTERN = re.compile(r'\\(?:pic|draw|path|node|fill|shade|coordinate)\b')
+CAPACITY_PATTERN = re.compile(r'TeX capacity exceeded')
+
+# a TeX engine, output is the extension of the file it produces, dynamic if its memory grows as needed
+Engine = namedtuple('Engine', ['name', 'executable', 'output', 'dynamic'])
+ENGINES = {engine.name: engine for engine in (
+    Engine('pdflatex', 'pdflatex', 'pdf', False),
+    Engine('lualatex', 'lualatex', 'pdf', True),
+    Engine('xelatex', 'xelatex', 'pdf', False),
+    Engine('tectonic', 'tectonic', 'pdf', False),
+    Engine('latex+dvisvgm', 'latex', 'svg', False),
+)}
+# order in which auto mode considers the pdf engines, fast startup first
+PREFERENCE = ('pdflatex', 'lualatex', 'tectonic', 'xelatex')
+
+# one run of an engine and why it was chosen
+Attempt = namedtuple('Attempt', ['engine', 'ok', 'seconds', 'reason'])
+
+
+def available(name):
+    """
+    Whether the executables of an engine are installed
+    """
+    engine = ENGINES[name]
+    if shutil.which(engine.executable) is None:
+        return False
+    return engine.output != 'svg' or shutil.which('dvisvgm') is not None
+
+
+def estimate(source):
+    """
+    Number of elements TeX has to draw, a measure of the memory a picture needs
+
+    Arguments:
+        source {str} -- TeX of the document
+
+    Returns:
+        elements {int} -- number of pics, paths, nodes and coordinates
+    """
+    return len(ELEMENT_PATTERN.findall(source))
+
+
+def choose(source, output='pdf'):
+    """
+    Engine for a document in auto mode
+
+    pdflatex starts fastest and is used for small pictures, large ones go to LuaLaTeX, whose memory grows as needed.
+    Engines that are not installed are skipped, e.g. in containers that only have tectonic.
+
+    Arguments:
+        source {str} -- TeX of the document
+
+    Keyword Arguments:
+        output {str} -- 'pdf' or 'svg' (default: {'pdf'})
+
+    Returns:
+        name {str} -- engine name, see ENGINES
+        reason {str} -- why it was chosen
+    """
+    if output == 'svg':
+        return 'latex+dvisvgm', 'svg output'
+    elements = estimate(source)
+    preferred = 'lualatex' if elements >= LARGE_DIAGRAM else 'pdflatex'
+    reason = '{} elements'.format(elements)
+    for name in (preferred,) + PREFERENCE:
+        if available(name):
+            return name, reason if name == preferred else '{}, {} is not installed'.format(reason, preferred)
+    return preferred, reason + ', no engine found'
+
+
+def _fallback(tried):
+    # an installed engine with dynamic memory that has not been tried yet
+    return next((name for name in PREFERENCE if ENGINES[name].dynamic and name not in tried and available(name)), None)
+
+
+def run(name, file, output_dir=None, folder=None, cache=None, keep_log=False, precompiled=False):
+    """
+    Compile a .tex file with one engine, see execute.compile_tex
+
+    latex+dvisvgm compiles to svg with execute.compile_svg, the path of the svg is the pdf of the result.
+
+    Returns:
+        result {CompileResult} -- outcome of the run
+    """
+    engine = ENGINES[name]
+    if engine.output != 'svg':
+        return execute.compile_tex(file, output_dir=output_dir, engine=engine.executable, cache=cache,
+                                   precompiled=precompiled, folder=folder, keep_log=keep_log)
+    return execute.compile_svg(file, output_dir=output_dir, folder=folder, method='dvisvgm', keep_log=keep_log)
+
+
+def compile_file(file, engine='auto', output_dir=None, folder=None, cache=None, keep_log=False, precompiled=False):
+    """
+    Compile a .tex file, choosing the engine automatically or falling back when TeX runs out of memory
+
+    In auto mode the engine is picked by choose. If a run fails with "TeX capacity exceeded", the file is compiled
+    again with an installed engine with dynamic memory, i.e. LuaLaTeX. Every run is recorded with its reason and time,
+    and is an 'engine' stage of the active profilers.
+
+    Arguments:
+        file {str} -- path of the .tex file
+
+    Keyword Arguments:
+        engine {str} -- engine name, see ENGINES, or 'auto' (default: {'auto'})
+        output_dir {str} -- folder for the output, defaults to the folder of the .tex file (default: {None})
+        folder {str} -- folder relative paths are resolved against, defaults to the folder of the file (default: {None})
+        cache {BuildCache} -- reuse and store pdfs in this pycore.cache.BuildCache (default: {None})
+        keep_log {bool} -- return the .log file of the run as log, also on success (default: {False})
+        precompiled {bool} -- load the preamble from a format dumped once, see tikz.start (default: {False})
+
+    Raises:
+        ValueError: if the engine is unknown
+
+    Returns:
+        result {CompileResult} -- outcome of the last run
+        attempts {list} -- Attempt per run, in order
+    """
+    if engine == 'auto':
+        with open(file, errors='replace') as f:
+            name, reason = choose(f.read())
+    elif engine in ENGINES:
+        name, reason = engine, 'requested'
+    else:
+        raise ValueError('Unknown engine: {}, use one of {} or auto'.format(engine, ', '.join(ENGINES)))
+    attempts = []
+    while True:
+        with profiling.stage(name, 'engine', file=file, reason=reason):
+            result = run(name, file, output_dir, folder, cache if ENGINES[name].output == 'pdf' else None, keep_log,
+                         precompiled)
+        attempts.append(Attempt(name, result.ok, result.seconds, reason))
+        if result.ok or not CAPACITY_PATTERN.search(result.log) or ENGINES[name].output != 'pdf':
+            return result, attempts
+        fallback = _fallback([attempt.engine for attempt in attempts])
+        if fallback is None:
+            return result, attempts
+        name, reason = fallback, 'TeX capacity exceeded with {}'.format(name)
+
+
+def compile_tex(file, engine=DEFAULT_ENGINE, output_dir=None, folder=None, cache=None, precompiled=False,
+                keep_log=False):
+    """
+    Compile a .tex file with an engine of ENGINES, 'auto' or any other executable such as latex
+
+    Names of ENGINES and 'auto' go through compile_file, other engines straight to execute.compile_tex.
+
+    Returns:
+        result {CompileResult} -- outcome of the last run
+    """
+    if engine == 'auto' or engine in ENGINES:
+        return compile_file(file, engine, output_dir, folder, cache, keep_log, precompiled)[0]
+    return execute.compile_tex(file, output_dir, engine, cache, precompiled, folder, keep_log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile PlotNeuralNet diagrams with the best fitting TeX engine.')
+    parser.add_argument('files', nargs='+', help='.tex files')
+    parser.add_argument('--engine', default=os.environ.get(ENGINE_VARIABLE) or 'auto',
+                        help='{} or auto (default: ${} or auto)'.format(', '.join(ENGINES), ENGINE_VARIABLE))
+    parser.add_argument('-o', '--output-dir', default=None, help='folder for the output (default: next to each file)')
+    parser.add_argument('--cache', nargs='?', const='', default=None, metavar='DIR',
+                        help='reuse pdfs from the build cache (default folder: $PLOTNEURALNET_CACHE or ~/.cache)')
+    args = parser.parse_args(argv)
+    if args.engine != 'auto' and args.engine not in ENGINES:
+        parser.error('unknown engine {}'.format(args.engine))
+
+    cache = BuildCache(args.cache or None) if args.cache is not None else None
+    failed = 0
+    for file in args.files:
+        result, attempts = compile_file(file, args.engine, args.output_dir, cache=cache)
+        for attempt in attempts:
+            status = 'hit' if attempt.ok and result.cached else ('ok' if attempt.ok else 'FAIL')
+            print('{:<4} {:<13} {:8.2f}s  {}  ({})'.format(status, attempt.engine, attempt.seconds, file,
+                                                           attempt.reason))
+        if not result.ok:
+            failed += 1
+            print(result.log)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,50 @@
+import glob
 import os
+import shutil
 import subprocess
+import tempfile
+import time
+from collections import namedtuple
 
+from pycore import preamble, profiling
 
-def call_process(cmd):
-    subprocess.run(cmd, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+# number of characters collected before a chunk is handed to the file object
+BUFFER_SIZE = 1 << 16
 
+# memory backed file system of Linux
+SHM_ROOT = '/dev/shm'
 
-def delete_files(pattern):
-    cmd = "rm"
-    if os.name == 'nt':
-        cmd = "del"
-    cmd += " " + pattern
-    call_process(cmd)
+# engines that do not write a pdf
+OUTPUT_EXTENSIONS = {'latex': '.dvi'}
+
+# outcome of compiling a single .tex file
+CompileResult = namedtuple('CompileResult', ['file', 'pdf', 'ok', 'seconds', 'log', 'cached'], defaults=(False,))
+
+
+def call_process(cmd, cwd=None):
+    """
+    Run a shell command and return its output
+
+    Raises:
+        subprocess.CalledProcessError: if the command fails, with the combined stdout and stderr as output
+    """
+    with profiling.stage(cmd.split(' ', 1)[0], 'process', cmd=cmd):
+        proc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=cwd)
+    output = proc.stdout.decode(errors='replace')
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output)
+    return output
+
+
+@profiling.timed()
+def delete_files(pattern, cwd=None):
+    """
+    Delete the files matching whitespace separated glob patterns, relative to cwd
+    """
+    for part in pattern.split():
+        for path in glob.glob(os.path.join(cwd or '', part)):
+            if os.path.isfile(path):
+                os.remove(path)
 
 
 def open_pdf(tool, pdf="file.pdf"):
@@ -21,21 +54,355 @@ def open_pdf(tool, pdf="file.pdf"):
         print('Error while trying to open pdf viewer')
 
 
-def tex_to_pdf(file="file.tex", folder='output', delete_tmp=True):
-    os.chdir(folder)
-    call_process('pdflatex ' + str(file))
-    if delete_tmp:
-        delete_files("*.aux *.log")
-    os.chdir('..')
+@profiling.timed()
+def tex_to_pdf(file="file.tex", folder='output', delete_tmp=True, cache=None, engine=None):
+    """
+    Compile a .tex file of a folder into a pdf next to it
+
+    The auxiliary files are written to a scratch directory and never reach the folder, so delete_tmp is only kept for
+    existing callers.
+
+    Keyword Arguments:
+        engine {str} -- engine name or 'auto', see pycore.engines, defaults to $PLOTNEURALNET_ENGINE or pdflatex
+                        (default: {None})
+
+    Raises:
+        subprocess.CalledProcessError: if the engine fails, with its output
+
+    Returns:
+        attempts {list} -- engines.Attempt per run, more than one if TeX ran out of memory and LuaLaTeX took over
+    """
+    from pycore import engines
+
+    engine = engine or os.environ.get(engines.ENGINE_VARIABLE) or engines.DEFAULT_ENGINE
+    result, attempts = engines.compile_file(os.path.join(folder, file), engine, cache=cache)
+    if not result.ok:
+        raise subprocess.CalledProcessError(1, attempts[-1].engine + ' ' + str(file), result.log)
+    return attempts
+
+
+def scratch_root():
+    """
+    Folder for scratch directories of the engine, tmpfs if available
+
+    $PLOTNEURALNET_SCRATCH takes precedence, otherwise /dev/shm is used where it is a writable folder, so auxiliary
+    files never touch a network file system. None is the default temporary folder.
+    """
+    root = os.environ.get('PLOTNEURALNET_SCRATCH')
+    if root:
+        return root
+    if os.path.isdir(SHM_ROOT) and os.access(SHM_ROOT, os.W_OK | os.X_OK):
+        return SHM_ROOT
+    return None
+
+
+def engine_command(file, engine, scratch, precompiled=False, folder=None):
+    """
+    Command line and environment compiling a .tex file into a scratch directory
+
+    Returns:
+        cmd {list} -- arguments of the engine process
+        env {dict} -- environment of the process, None to inherit it
+    """
+    if os.path.basename(engine) == 'tectonic':
+        # tectonic has neither formats of its own nor the TeX Live options
+        return [engine, '--keep-logs', '--outdir', scratch, file], None
+    options, env = preamble.format_options(file, engine, folder) if precompiled else ([], None)
+    return [engine, '-interaction=nonstopmode', '-halt-on-error', *options, '-output-directory=' + scratch, file], env
+
+
+@profiling.timed()
+def compile_tex(file, output_dir=None, engine='pdflatex', cache=None, precompiled=False, folder=None, keep_log=False):
+    """
+    Compile a .tex file in a private scratch directory
+
+    The engine runs in the folder of the file, so relative paths such as the layers import resolve as usual, while
+    all auxiliary output goes to a temporary directory. Only the pdf is moved to the output directory. The process
+    working directory is never changed, so this is safe to call from threads and worker processes.
+
+    Arguments:
+        file {str} -- path of the .tex file
+
+    Keyword Arguments:
+        output_dir {str} -- folder for the pdf, defaults to the folder of the .tex file (default: {None})
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+        cache {BuildCache} -- reuse and store pdfs in this pycore.cache.BuildCache (default: {None})
+        precompiled {bool} -- load the preamble from a format dumped once, see tikz.start (default: {False})
+        folder {str} -- folder relative paths are resolved against, defaults to the folder of the file (default: {None})
+        keep_log {bool} -- return the .log file of the run as log, also on success (default: {False})
+
+    Returns:
+        result {CompileResult} -- status, pdf path, wall time and the engine output on failure
+    """
+    file = os.path.abspath(file)
+    name = os.path.basename(file)
+    stem = os.path.splitext(name)[0]
+    folder = os.path.abspath(folder or os.path.dirname(file))
+    output_dir = os.path.abspath(output_dir or os.path.dirname(file))
+    extension = OUTPUT_EXTENSIONS.get(os.path.basename(engine), '.pdf')
+    target = os.path.join(output_dir, stem + extension)
+    start = time.perf_counter()
+    key = None
+    if cache is not None:
+        key = cache.key(file, engine, folder)
+        stored = cache.get(key, extension)
+        if stored:
+            os.makedirs(output_dir, exist_ok=True)
+            shutil.copyfile(stored, target)
+            return CompileResult(file, target, True, time.perf_counter() - start, '', True)
+    with tempfile.TemporaryDirectory(prefix='pnn-', dir=scratch_root()) as scratch:
+        cmd, env = engine_command(file, engine, scratch, precompiled, folder)
+        try:
+            with profiling.stage(engine, 'process', file=file):
+                proc = subprocess.run(cmd, cwd=folder, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+        except OSError as e:
+            return CompileResult(file, None, False, time.perf_counter() - start, str(e))
+        pdf = os.path.join(scratch, stem + extension)
+        log = proc.stdout.decode(errors='replace')
+        if keep_log:
+            try:
+                with open(os.path.join(scratch, stem + '.log'), errors='replace') as f:
+                    log = f.read()
+            except OSError:
+                pass
+        if proc.returncode or not os.path.exists(pdf):
+            return CompileResult(file, None, False, time.perf_counter() - start, log)
+        if key is not None:
+            cache.put(key, pdf)
+        os.makedirs(output_dir, exist_ok=True)
+        shutil.move(pdf, target)
+    return CompileResult(file, target, True, time.perf_counter() - start, log if keep_log else '')
+
+
+@profiling.timed()
+def compile_string(source, folder='.', engine=None, cache=None, precompiled=False, name='file'):
+    """
+    Compile TeX held in memory and return the pdf
+
+    The source is written into a scratch directory on tmpfs where available, see scratch_root, and compiled there
+    with the engine started directly in folder, so relative paths such as the layers import resolve as for a file in
+    that folder. Nothing is written to folder or the working directory and the scratch directory is removed afterwards.
+
+    Arguments:
+        source {str} -- TeX document, also a binary or text stream, or architecture elements as for write_fragments
+
+    Keyword Arguments:
+        folder {str} -- folder relative paths are resolved against (default: {'.'})
+        engine {str} -- engine name or 'auto', see pycore.engines, or another executable such as latex, defaults to
+            $PLOTNEURALNET_ENGINE or pdflatex (default: {None})
+        cache {BuildCache} -- reuse and store pdfs in this pycore.cache.BuildCache (default: {None})
+        precompiled {bool} -- load the preamble from a format dumped once, see tikz.start (default: {False})
+        name {str} -- job name, e.g. for \\jobname (default: {'file'})
+
+    Raises:
+        subprocess.CalledProcessError: if the engine fails, with its output
+
+    Returns:
+        pdf {bytes} -- content of the pdf
+    """
+    from pycore import engines
+
+    engine = engine or os.environ.get(engines.ENGINE_VARIABLE) or engines.DEFAULT_ENGINE
+    with tempfile.TemporaryDirectory(prefix='pnn-', dir=scratch_root()) as scratch:
+        file = os.path.join(scratch, name + '.tex')
+        if hasattr(source, 'read'):
+            with open(file, 'wb') as f:
+                for chunk in iter(lambda: source.read(BUFFER_SIZE), type(source.read(0))()):
+                    f.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+        else:
+            write_fragments([source] if isinstance(source, str) else source, file)
+        result = engines.compile_tex(file, engine=engine, cache=cache, precompiled=precompiled, folder=folder)
+        if not result.ok:
+            raise subprocess.CalledProcessError(1, '{} {}'.format(engine, name), result.log)
+        with open(result.pdf, 'rb') as f:
+            return f.read()
+
+
+def _convert(cmd):
+    # run a converter without a shell, its output is the message of the error
+    with profiling.stage(cmd[0], 'process', cmd=' '.join(cmd)):
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, proc.stdout.decode(errors='replace'))
+
+
+def thumbnail_path(file, width):
+    """
+    Path of the png thumbnail of a figure, e.g. unet-320.png next to unet.svg
+    """
+    return '{}-{}.png'.format(os.path.splitext(file)[0], width)
+
+
+def convert_pdf(pdf, target, width=None):
+    """
+    Convert the first page of a pdf to svg or png with poppler's pdftocairo, by the extension of target
+
+    Keyword Arguments:
+        width {int} -- width of a png in px, the height follows the aspect ratio (default: {None})
+
+    Raises:
+        OSError: if pdftocairo is not installed
+        subprocess.CalledProcessError: if the conversion fails
+    """
+    if target.endswith('.svg'):
+        _convert(['pdftocairo', '-svg', pdf, target])
+        return
+    scale = ['-scale-to-x', str(width), '-scale-to-y', '-1'] if width else []
+    # pdftocairo appends the extension itself
+    _convert(['pdftocairo', '-png', '-singlefile', *scale, pdf, os.path.splitext(target)[0]])
+
+
+@profiling.timed()
+def compile_svg(file, output_dir=None, folder=None, method=None, thumbnails=(), engine=None, keep_log=False):
+    """
+    Compile a .tex file into an svg, and optionally png thumbnails, without going through Inkscape
+
+    With method 'dvisvgm' the file is compiled to dvi with latex and converted by dvisvgm, glyphs become paths so the
+    svg needs no fonts. With 'pdftocairo' it is compiled to pdf with engine and converted by pdftocairo, which also
+    renders the thumbnails from the same pdf, so thumbnails need this method. Intermediate files stay in a scratch
+    directory.
+
+    Arguments:
+        file {str} -- path of the .tex file
+
+    Keyword Arguments:
+        output_dir {str} -- folder for the svg and thumbnails, defaults to the folder of the .tex file (default: {None})
+        folder {str} -- folder relative paths are resolved against, defaults to the folder of the file (default: {None})
+        method {str} -- 'dvisvgm' or 'pdftocairo', defaults to dvisvgm if it is installed and neither thumbnails nor
+                        a pdf engine are asked for (default: {None})
+        thumbnails {tuple} -- widths in px of png thumbnails, see thumbnail_path (default: {()})
+        engine {str} -- TeX engine writing the pdf for pdftocairo, defaults to pdflatex; dvisvgm always runs latex
+                        (default: {None})
+        keep_log {bool} -- return the .log file of the run as log, also on success (default: {False})
+
+    Raises:
+        ValueError: for an unknown method, or thumbnails or a pdf engine with method 'dvisvgm'
+
+    Returns:
+        result {CompileResult} -- status, svg path as pdf, wall time and the engine or converter output on failure
+    """
+    start = time.perf_counter()
+    file = os.path.abspath(file)
+    output_dir = os.path.abspath(output_dir or os.path.dirname(file))
+    target = os.path.join(output_dir, os.path.splitext(os.path.basename(file))[0] + '.svg')
+    if method is None:
+        method = 'dvisvgm' if not thumbnails and engine in (None, 'latex') and shutil.which('dvisvgm') else 'pdftocairo'
+    if method not in ('dvisvgm', 'pdftocairo'):
+        raise ValueError('Unknown svg method: {}'.format(method))
+    if method == 'dvisvgm' and thumbnails:
+        raise ValueError('Thumbnails are rendered from a pdf, use method pdftocairo')
+    if method == 'dvisvgm' and engine not in (None, 'latex'):
+        raise ValueError('Method dvisvgm compiles with latex, {} can only be used with pdftocairo'.format(engine))
+    with tempfile.TemporaryDirectory(prefix='pnn-', dir=scratch_root()) as scratch:
+        if method == 'dvisvgm':
+            result = compile_tex(file, output_dir=scratch, engine='latex', folder=folder, keep_log=keep_log)
+        else:
+            result = compile_tex(file, output_dir=scratch, engine=engine or 'pdflatex', folder=folder,
+                                 keep_log=keep_log)
+        if not result.ok:
+            return result
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            if method == 'dvisvgm':
+                _convert(['dvisvgm', '--no-fonts', '--output=' + target, result.pdf])
+            else:
+                convert_pdf(result.pdf, target)
+            for width in thumbnails:
+                convert_pdf(result.pdf, thumbnail_path(target, width), width)
+        except OSError as e:
+            return CompileResult(file, None, False, time.perf_counter() - start, str(e))
+        except subprocess.CalledProcessError as e:
+            return CompileResult(file, None, False, time.perf_counter() - start, e.output)
+    return CompileResult(file, target, True, time.perf_counter() - start, result.log)
+
+
+def flatten(arch):
+    """
+    Flatten nested iterables of architecture elements
+
+    Elements may be strings, IR nodes or other objects convertible with str, or (nested) iterables of those, e.g. the
+    generators returned by the builders in pycore.blocks.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+
+    Yields:
+        element {str|object} -- leaf elements in order
+    """
+    stack = [iter(arch)]
+    while stack:
+        for element in stack[-1]:
+            if isinstance(element, str) or not hasattr(element, '__iter__'):
+                yield element
+            else:
+                stack.append(iter(element))
+                break
+        else:
+            stack.pop()
+
+
+def iter_fragments(arch):
+    """
+    Flatten an architecture into its TeX fragments
+
+    Arguments:
+        arch {iterable} -- architecture elements, see flatten
+
+    Yields:
+        fragment {str} -- TeX fragment
+    """
+    for element in flatten(arch):
+        yield element if isinstance(element, str) else str(element)
+
+
+def write_fragments(fragments, out, buffer_size=BUFFER_SIZE):
+    """
+    Stream TeX fragments to a file in buffered chunks
+
+    Arguments:
+        fragments {iterable} -- architecture elements making up the document, flattened with iter_fragments
+        out {str|file} -- path of the output file or a writable text file object / pipe
+
+    Keyword Arguments:
+        buffer_size {int} -- number of characters collected before a chunk is written (default: {65536})
+
+    Returns:
+        size {int} -- number of characters written
+    """
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "w") as f:
+            return write_fragments(fragments, f, buffer_size)
+    chunk = []
+    pending = 0
+    written = 0
+    with profiling.stage('write_fragments'):
+        for fragment in iter_fragments(fragments):
+            chunk.append(fragment)
+            pending += len(fragment)
+            if pending >= buffer_size:
+                out.write(''.join(chunk))
+                written += pending
+                chunk = []
+                pending = 0
+        if chunk:
+            out.write(''.join(chunk))
+            written += pending
+    return written
 
 
-def write_tex(content, file="file.tex"):
-    with open(file, "w") as f:
-        f.write(str(content))
+@profiling.timed()
+def write_tex(content, file="file.tex", draft=None):
+    if isinstance(content, str):
+        content = [content]
+    # the draft profile can also be chosen for unchanged scripts, e.g. PLOTNEURALNET_DRAFT=1 ./tikzmake.sh unet
+    if draft is None:
+        draft = os.environ.get('PLOTNEURALNET_DRAFT', '') not in ('', '0')
+    if draft:
+        from pycore import draft as profile
+        content = profile.simplify(content)
+    write_fragments(content, file)
 
 
+@profiling.timed()
 def build_architecture(arch):
-    content = ""
-    for c in arch:
-        content += str(c)
-    return content
+    return ''.join(iter_fragments(arch))
@@ -0,0 +1,332 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from pycore import execute, validate
+from pycore.cache import BuildCache, default_root
+
+# number of consecutive plain elements put into one block
+DEFAULT_CHUNK = 25
+BORDER_PATTERN = re.compile(r'border=[^,\]]*')
+POINT_PATTERN = re.compile(r'pnn-point:(\d+):(-?[\d.]+)pt,(-?[\d.]+)pt')
+BBOX_PATTERN = re.compile(r'pnn-bbox:(-?[\d.]+)pt,(-?[\d.]+)pt')
+
+# outcome of a single block, cached if its pdf was reused
+Block = namedtuple('Block', ['index', 'key', 'cached', 'seconds'])
+
+
+def _tree(element):
+    # architecture as nested lists of TeX, generators are consumed once
+    if isinstance(element, str) or not hasattr(element, '__iter__'):
+        return element if isinstance(element, str) else str(element)
+    return [_tree(child) for child in element]
+
+
+def _texts(tree):
+    if isinstance(tree, str):
+        yield tree
+        return
+    for child in tree:
+        yield from _texts(child)
+
+
+def _structure(text):
+    return '\\begin{tikzpicture}' in text or '\\end{tikzpicture}' in text
+
+
+def _pieces(tree, chunk):
+    # (text, is document structure), groups of a builder become one piece, plain elements are chunked
+    leaves = []
+    for child in tree:
+        if isinstance(child, str):
+            if _structure(child):
+                if leaves:
+                    yield ''.join(leaves), False
+                    leaves = []
+                yield child, True
+                continue
+            leaves.append(child)
+            if len(leaves) >= chunk:
+                yield ''.join(leaves), False
+                leaves = []
+            continue
+        if leaves:
+            yield ''.join(leaves), False
+            leaves = []
+        # containers of the document or of several groups are split further, e.g. the body of an architecture
+        if any(not isinstance(part, str) for part in child) or any(_structure(text) for text in _texts(child)):
+            yield from _pieces(child, chunk)
+        else:
+            yield ''.join(_texts(child)), False
+    if leaves:
+        yield ''.join(leaves), False
+
+
+def split(arch, chunk=DEFAULT_CHUNK):
+    """
+    Split an architecture into the document around the picture and blocks drawn inside it
+
+    Every group yielded by a builder, e.g. blocks.multi_conv_relu, becomes a block of its own, runs of single elements
+    are put into blocks of chunk elements.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+
+    Keyword Arguments:
+        chunk {int} -- maximum number of consecutive single elements per block (default: {25})
+
+    Returns:
+        head {str} -- document up to and including the beginning of the picture
+        blocks {list} -- TeX of each block
+        tail {str} -- end of the picture and the document
+    """
+    head, blocks, tail = [], [], []
+    for text, structure in _pieces(_tree(arch), chunk):
+        if tail or (structure and '\\end{tikzpicture}' in text):
+            tail.append(text)
+        elif not head or not any('\\begin{tikzpicture}' in part for part in head):
+            head.append(text)
+        elif text.strip():
+            blocks.append(text)
+    return ''.join(head), blocks, ''.join(tail)
+
+
+def _owner(reference, defined):
+    # block defining a position and whether it can be passed on as a point, node anchors such as 'a.north' can not
+    if reference in defined:
+        return defined[reference], True
+    if '.' in reference:
+        owner = defined.get(reference.split('.', 1)[0].strip())
+        return owner, False
+    if '-' in reference:
+        return defined.get(reference.rsplit('-', 1)[0]), True
+    return None, True
+
+
+def _dependencies(blocks):
+    # per block the references to earlier blocks, None if two blocks have to be merged first
+    defined = {}
+    imports = []
+    for index, text in enumerate(blocks):
+        local = set()
+        needed = {}
+        for statement in validate._split(text):
+            for name, kind, style in validate._statement(statement):
+                if kind:
+                    local.add(name)
+                    if kind == 'pic':
+                        local.update(validate.PIC_LOCALS.get(style, ()))
+                    continue
+                if name in local or (name.rsplit('-', 1)[0] in local if '-' in name else False):
+                    continue
+                owner, point = _owner(name, defined)
+                if owner is None:
+                    continue
+                if not point:
+                    return None, (owner, index)
+                needed[name] = owner
+        for name in local:
+            defined[name] = index
+        imports.append(needed)
+    return imports, None
+
+
+def group(blocks):
+    """
+    Blocks and the positions each one takes from earlier blocks
+
+    Blocks referring to anchors of nodes of earlier blocks, e.g. 'image.north', are merged with them, since only
+    points can be handed from one block to the next.
+
+    Arguments:
+        blocks {list} -- TeX of each block, see split
+
+    Returns:
+        blocks {list} -- TeX of each block after merging
+        imports {list} -- per block a dict of position -> index of the block defining it
+    """
+    blocks = list(blocks)
+    while True:
+        imports, merge = _dependencies(blocks)
+        if merge is None:
+            return blocks, imports
+        first, last = merge
+        blocks[first:last + 1] = [''.join(blocks[first:last + 1])]
+
+
+def _point(value):
+    return '({}pt,{}pt)'.format(*value)
+
+
+def block_source(head, text, points, exports, tail):
+    """
+    Standalone document of a single block
+
+    Positions taken from earlier blocks are defined as coordinates and the positions later blocks need are written to
+    the log, as is the lower left corner of the picture. Neither changes the bounding box.
+
+    Arguments:
+        head {str} -- document up to the beginning of the picture
+        text {str} -- TeX of the block
+        points {dict} -- position -> (x, y) in pt of the positions taken from earlier blocks
+        exports {list} -- positions later blocks need
+        tail {str} -- end of the picture and the document
+
+    Returns:
+        source {str} -- TeX of the document
+    """
+    lines = [BORDER_PATTERN.sub('border=0pt', head, count=1), '\\begin{pgfinterruptboundingbox}\n']
+    for name in sorted(points):
+        lines.append('\\coordinate ({}) at {};\n'.format(name, _point(points[name])))
+    lines.append('\\end{pgfinterruptboundingbox}\n')
+    lines.append(text)
+    lines.append('\n\\begin{pgfinterruptboundingbox}\n')
+    for index, name in enumerate(exports):
+        lines.append('\\path ({}); \\pgfgetlastxy{{\\pnnx}}{{\\pnny}}\\typeout{{pnn-point:{}:\\pnnx,\\pnny}}\n'.format(
+            name, index))
+    lines.append('\\end{pgfinterruptboundingbox}\n')
+    lines.append('\\typeout{pnn-bbox:\\the\\csname pgf@picminx\\endcsname,\\the\\csname pgf@picminy\\endcsname}\n')
+    lines.append(tail)
+    return ''.join(lines)
+
+
+class BlockStore:
+    """
+    Compiled blocks by content hash, the pdf together with the corner and exported points read from its log
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(default_root(), 'blocks')
+
+    def _path(self, key, extension):
+        return os.path.join(self.root, key[:2], key + extension)
+
+    def get(self, key):
+        try:
+            with open(self._path(key, '.json')) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(key, '.pdf')):
+            return None
+        record['pdf'] = self._path(key, '.pdf')
+        return record
+
+    def put(self, key, pdf, record):
+        os.makedirs(os.path.dirname(self._path(key, '')), exist_ok=True)
+        for extension, write in (('.pdf', lambda tmp: shutil.copyfile(pdf, tmp)),
+                                 ('.json', lambda tmp: _write_json(tmp, record))):
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self._path(key, '')), suffix='.tmp')
+            os.close(fd)
+            write(tmp)
+            os.replace(tmp, self._path(key, extension))
+        return self.get(key)
+
+
+def _write_json(file, data):
+    with open(file, 'w') as f:
+        json.dump(data, f)
+
+
+def _compile_block(index, source, exports, store, engine, folder, scratch):
+    start = time.perf_counter()
+    file = os.path.join(scratch, 'block{}.tex'.format(index))
+    with open(file, 'w') as f:
+        f.write(source)
+    key = BuildCache(store.root).key(file, engine, folder)
+    record = store.get(key)
+    if record is not None:
+        return Block(index, key, True, time.perf_counter() - start), record, None
+    result = execute.compile_tex(file, output_dir=scratch, engine=engine, folder=folder, keep_log=True)
+    corner = BBOX_PATTERN.search(result.log) if result.ok else None
+    if corner is None:
+        return Block(index, key, False, time.perf_counter() - start), None, result
+    points = {exports[int(i)]: (float(x), float(y)) for i, x, y in POINT_PATTERN.findall(result.log)}
+    record = store.put(key, result.pdf, {'corner': [float(corner.group(1)), float(corner.group(2))],
+                                         'points': points})
+    return Block(index, key, False, time.perf_counter() - start), record, None
+
+
+def assemble(head, records, tail):
+    """
+    Document placing the pdfs of all blocks at their original positions
+
+    Returns:
+        source {str} -- TeX of the assembled figure
+    """
+    lines = [head]
+    for record in records:
+        lines.append('\\node[anchor=south west, inner sep=0pt, outer sep=0pt] at {} {{\\includegraphics{{{}}}}};\n'
+                     .format(_point(record['corner']), record['pdf'].replace('\\', '/')))
+    lines.append(tail)
+    return ''.join(lines)
+
+
+def build(arch, file, output_dir=None, engine='pdflatex', folder=None, store=None, chunk=DEFAULT_CHUNK, jobs=None):
+    """
+    Compile an architecture block by block, only recompiling blocks that changed
+
+    Each block is compiled once into its own pdf, cached by the hash of its source, and the figure is assembled from
+    the pdfs. Connections to layers of earlier blocks are drawn with the points those blocks wrote to their log, so a
+    block is also recompiled when a layer it connects to moves.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+        file {str} -- path of the assembled .tex file
+
+    Keyword Arguments:
+        output_dir {str} -- folder for the pdf, defaults to the folder of the .tex file (default: {None})
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+        folder {str} -- folder relative paths are resolved against, defaults to the folder of the file (default: {None})
+        store {BlockStore} -- compiled blocks, defaults to the blocks folder of the cache (default: {None})
+        chunk {int} -- maximum number of consecutive single elements per block (default: {25})
+        jobs {int} -- number of blocks compiled in parallel, defaults to the number of cores (default: {None})
+
+    Returns:
+        result {CompileResult} -- outcome of compiling the assembled figure, or of the first block that failed
+        blocks {list} -- Block per block that was handled, in order
+    """
+    store = store or BlockStore()
+    folder = os.path.abspath(folder or os.path.dirname(os.path.abspath(file)))
+    head, blocks, tail = split(arch, chunk)
+    blocks, imports = group(blocks)
+    exports = [[] for _ in blocks]
+    for needed in imports:
+        for name, owner in needed.items():
+            if name not in exports[owner]:
+                exports[owner].append(name)
+    with tempfile.TemporaryDirectory(prefix='pnn-blocks-') as scratch, \
+            ThreadPoolExecutor(jobs or os.cpu_count() or 1) as pool:
+        futures = []
+
+        def job(index):
+            # earlier blocks were submitted first, so waiting for them can not block the pool
+            points = {}
+            for name, owner in imports[index].items():
+                _, record, failed = futures[owner].result()
+                if failed is not None or name not in record['points']:
+                    return Block(index, None, False, 0.0), None, failed or execute.CompileResult(
+                        file, None, False, 0.0, 'position {} of block {} is unknown'.format(name, owner))
+                points[name] = record['points'][name]
+            source = block_source(head, blocks[index], points, exports[index], tail)
+            return _compile_block(index, source, exports[index], store, engine, folder, scratch)
+
+        for index in range(len(blocks)):
+            futures.append(pool.submit(job, index))
+        handled, records = [], []
+        for future in futures:
+            block, record, failed = future.result()
+            handled.append(block)
+            if failed is not None:
+                for pending in futures:
+                    pending.cancel()
+                return failed, handled
+            records.append(record)
+    with open(file, 'w') as f:
+        f.write(assemble(head, records, tail))
+    return execute.compile_tex(file, output_dir=output_dir, engine=engine, folder=folder), handled
@@ -0,0 +1,123 @@
+import re
+
+from pycore import draft, execute, validate
+from pycore.compress import macro_name
+
+# a pic of one of the styles in layers/, with its options, position and body
+PIC_PATTERN = re.compile(r'\\pic(?P<options>\[(?:[^\[\]{}]|\{[^{}]*\})*\])?\s*at\s*\((?P<at>[^()]*)\)\s*'
+                         r'\{\s*(?P<style>\w+)=(?P<keys>\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\})\s*\}\s*;')
+NAME_PATTERN = re.compile(r'\bname=[^,}]*,?\s*')
+LOGO_PATTERN = re.compile(r'logo=[^,}]*')
+
+
+def setup():
+    """
+    TeX saving a box as reusable form and placing it
+
+    pdfTeX and LuaTeX write every form once into the pdf and refer to it from each instance, with other engines or
+    dvi output the box is copied, which still saves typesetting the shape again.
+
+    Returns:
+        tex {str} -- TeX to place inside the tikzpicture
+    """
+    return r'''
+        \newbox\pnnformbox
+        \def\pnnsaveform#1{\expandafter\newbox\csname pnnbox#1\endcsname
+            \global\expandafter\setbox\csname pnnbox#1\endcsname\copy\pnnformbox
+            \expandafter\xdef\csname pnnform#1\endcsname{\noexpand\copy\expandafter\noexpand\csname pnnbox#1\endcsname}}
+        \ifdefined\pdfxform\ifnum\pdfoutput>0
+            \def\pnnsaveform#1{\immediate\pdfxform\pnnformbox
+                \expandafter\xdef\csname pnnform#1\endcsname{\noexpand\pdfrefxform\the\pdflastxform}}
+        \fi\fi
+        \ifdefined\saveboxresource\ifnum\outputmode>0
+            \def\pnnsaveform#1{\saveboxresource\pnnformbox
+                \expandafter\xdef\csname pnnform#1\endcsname{\noexpand\useboxresource\the\lastsavedboxresourceindex}}
+        \fi\fi
+        \def\pnnplaceform#1{\edef\pnnformx{\csname pnnformx#1\endcsname}\edef\pnnformy{\csname pnnformy#1\endcsname}%
+            \node[anchor=south west, inner sep=0pt, outer sep=0pt] at (\pnnformx,\pnnformy) {\csname pnnform#1\endcsname};}
+        \tikzset{pnnform/.pic={\pnnplaceform{#1}}}
+        % draws nothing but the text of nodes, e.g. the labels of a pic, its coordinates are still defined
+        \let\pnnusepath\pgfusepath
+        \def\pnnlabelsonly{\def\pgfusepath##1{\pnnusepath{discard}}\def\pgfshadepath##1##2{}}
+'''
+
+
+def form(name, style, keys):
+    """
+    TeX drawing the shape of a pic once into a form
+
+    The lower left corner of the shape relative to the origin of the pic is kept in \\pnnformx<name>, \\pnnformy<name>.
+
+    Arguments:
+        name {str} -- letters identifying the form
+        style {str} -- pic style, e.g. 'Box'
+        keys {str} -- keys of the pic without name and labels, in braces
+
+    Returns:
+        tex {str} -- TeX defining the form
+    """
+    return ('\\setbox\\pnnformbox=\\hbox{{\\begin{{tikzpicture}}\\pic at (0,0,0) {{{style}={keys}}};'
+            '\\xdef\\pnnformx{name}{{\\the\\csname pgf@picminx\\endcsname}}'
+            '\\xdef\\pnnformy{name}{{\\the\\csname pgf@picminy\\endcsname}}\\end{{tikzpicture}}}}\n'
+            '\\pnnsaveform{{{name}}}\n').format(name=name, style=style, keys='{name=pnnform,' + keys[1:])
+
+
+def _shape(match):
+    # what the form of a pic depends on, everything but its position, name and labels
+    if match.group('style') not in validate.PIC_ANCHORS:
+        return None
+    return match.group('style'), NAME_PATTERN.sub('', draft.strip_labels(match.group('keys')), count=1)
+
+
+def forms(arch, min_count=2):
+    """
+    Draw every distinct box and ball once and refer to it from all layers with the same shape
+
+    The shape of a pic, i.e. its style, size, fill, opacity and logo, is put into a form XObject once, every layer
+    places the form and then draws its labels and defines its anchors as before. Deep networks with many equal layers
+    give much smaller pdfs that viewers draw faster. The architecture is generated in memory first.
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+
+    Keyword Arguments:
+        min_count {int} -- number of layers with the same shape from which a form is used (default: {2})
+
+    Yields:
+        fragment {str} -- TeX fragments, the forms are defined right after the beginning of the picture
+    """
+    fragments = list(execute.iter_fragments(arch))
+    begin = next((i for i, text in enumerate(fragments) if '\\begin{tikzpicture}' in text), None)
+    end = next((i for i, text in enumerate(fragments) if '\\end{tikzpicture}' in text), len(fragments))
+    if begin is None:
+        yield from fragments
+        return
+    counts = {}
+    for text in fragments[begin + 1:end]:
+        for match in PIC_PATTERN.finditer(text):
+            shape = _shape(match)
+            if shape is not None:
+                counts[shape] = counts.get(shape, 0) + 1
+    names = {}
+    definitions = [setup()]
+    for shape, count in counts.items():
+        if count >= min_count:
+            names[shape] = macro_name(len(names))
+            definitions.append(form(names[shape], *shape))
+
+    def instance(match):
+        shape = _shape(match)
+        if shape not in names:
+            return match.group(0)
+        options = match.group('options') or ''
+        keys = LOGO_PATTERN.sub('logo=', match.group('keys'))
+        return ('\\pic{options} at ({at}) {{pnnform={name}}};\n'
+                '{{\\pnnlabelsonly\\pic{options} at ({at}) {{{style}={keys}}};}}').format(
+            options=options, at=match.group('at'), name=names[shape], style=match.group('style'), keys=keys)
+
+    yield from fragments[:begin + 1]
+    if names:
+        yield ''.join(definitions)
+    for text in fragments[begin + 1:end]:
+        yield PIC_PATTERN.sub(instance, text) if names else text
+    yield from fragments[end:]
@@ -0,0 +1,181 @@
+import inspect
+import os
+import sys
+
+import pycore.tikz as tikz
+
+# whether new nodes remember the line of Python that created them, see pycore.sourcemap.sites
+record_sites = os.environ.get('PLOTNEURALNET_SITES', '') not in ('', '0')
+
+
+class Node:
+    """
+    Intermediate representation of a single tikz primitive
+
+    Every subclass stores the arguments of one function in pycore.tikz in slots, nothing is rendered until the node is
+    converted with str(), so architectures can be inspected, transformed and re-targeted before any TeX is written.
+    Nodes can be put into arch lists in place of the strings returned by pycore.tikz. While record_sites is set, each
+    node remembers the file and line it was created at as site, so TeX errors can be traced back to the Python code,
+    see pycore.sourcemap. Otherwise site is None and creating a node does not inspect the stack.
+    """
+    __slots__ = ('site',)
+    primitive = None
+    defaults = {}
+
+    def __init__(self, *args, **kwargs):
+        bound = self.signature.bind(*args, **kwargs)
+        values = dict(self.defaults)
+        values.update(bound.arguments)
+        for field in self.__slots__:
+            object.__setattr__(self, field, values[field])
+        object.__setattr__(self, 'site', _call_site() if record_sites else None)
+
+    @property
+    def kind(self):
+        return self.primitive.__name__
+
+    def fields(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def replace(self, **changes):
+        """
+        Copy of the node with some fields changed
+
+        Returns:
+            node {Node} -- new node of the same type
+        """
+        fields = self.fields()
+        fields.update(changes)
+        return type(self)(**fields)
+
+    def key(self):
+        # hashable identity of the node, lists are frozen to tuples
+        return (self.kind,) + tuple(_freeze(getattr(self, field)) for field in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def render(self):
+        return self.primitive(**self.fields())
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(field, getattr(self, field)) for field in self.__slots__))
+
+    def to_dict(self):
+        data = {'type': self.kind}
+        data.update(self.fields())
+        return data
+
+
+def _call_site():
+    # first frame outside of this module, e.g. the line of the architecture script that created the node
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    return (frame.f_code.co_filename, frame.f_lineno) if frame is not None else None
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _node_type(class_name, primitive):
+    signature = inspect.signature(primitive)
+    defaults = {name: p.default for name, p in signature.parameters.items() if p.default is not p.empty}
+    return type(class_name, (Node,), {
+        '__slots__': tuple(signature.parameters),
+        '__doc__': 'IR node of tikz.{}'.format(primitive.__name__),
+        '__module__': __name__,
+        'primitive': staticmethod(primitive),
+        'signature': signature,
+        'defaults': defaults,
+    })
+
+
+# document structure
+Start = _node_type('Start', tikz.start)
+Head = _node_type('Head', tikz.head)
+Colors = _node_type('Colors', tikz.def_colors)
+Begin = _node_type('Begin', tikz.env_begin)
+End = _node_type('End', tikz.env_end)
+
+# layers
+Conv = _node_type('Conv', tikz.conv)
+FullCon = _node_type('FullCon', tikz.full_con)
+ConvRelu = _node_type('ConvRelu', tikz.conv_relu)
+RtlConvRelu = _node_type('RtlConvRelu', tikz.rtl_conv_relu)
+ZConvRelu = _node_type('ZConvRelu', tikz.z_conv_relu)
+Upsample = _node_type('Upsample', tikz.upsample)
+Pool = _node_type('Pool', tikz.pool)
+Detect = _node_type('Detect', tikz.detect)
+Unpool = _node_type('Unpool', tikz.unpool)
+ConvRes = _node_type('ConvRes', tikz.conv_res)
+ConvSoftMax = _node_type('ConvSoftMax', tikz.conv_soft_max)
+Relu = _node_type('Relu', tikz.relu)
+SoftMax = _node_type('SoftMax', tikz.soft_max)
+Shortcut = _node_type('Shortcut', tikz.shortcut)
+Add = _node_type('Add', tikz.add)
+Multiply = _node_type('Multiply', tikz.multiply)
+Concatenate = _node_type('Concatenate', tikz.concatenate)
+
+# connections
+ShortConnection = _node_type('ShortConnection', tikz.short_connection)
+LongConnection = _node_type('LongConnection', tikz.long_connection)
+LongConnectionReversed = _node_type('LongConnectionReversed', tikz.long_connection_reversed)
+ZConnection = _node_type('ZConnection', tikz.z_connection)
+DoubleConnection = _node_type('DoubleConnection', tikz.double_connection)
+FuseConnection = _node_type('FuseConnection', tikz.fuseconnection)
+Skip = _node_type('Skip', tikz.skip)
+Resample = _node_type('Resample', tikz.resample)
+FullConnection = _node_type('FullConnection', tikz.full_connection)
+EllipsisConnection = _node_type('EllipsisConnection', tikz.ellipsis)
+
+# annotations
+Image = _node_type('Image', tikz.image)
+Grid = _node_type('Grid', tikz.grid)
+Coordinate = _node_type('Coordinate', tikz.coordinate)
+Text = _node_type('Text', tikz.text)
+Path = _node_type('Path', tikz.path)
+
+# node type by name of its tikz function
+NODE_TYPES = {cls.primitive.__name__: cls for cls in Node.__subclasses__()}
+
+
+def from_dict(data):
+    """
+    Build a node from its dict form as returned by Node.to_dict
+
+    Arguments:
+        data {dict} -- 'type' is the name of the tikz function, all other keys are its arguments
+
+    Returns:
+        node {Node} -- IR node
+    """
+    data = dict(data)
+    kind = data.pop('type')
+    if kind not in NODE_TYPES:
+        raise ValueError('Unknown primitive: {}'.format(kind))
+    return NODE_TYPES[kind](**data)
+
+
+def render(nodes):
+    """
+    Lower IR nodes to TikZ lazily
+
+    Arguments:
+        nodes {iterable} -- IR nodes, strings are passed through
+
+    Yields:
+        fragment {str} -- TikZ fragment per node
+    """
+    for node in nodes:
+        yield str(node)
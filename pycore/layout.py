@@ -0,0 +1,338 @@
+import re
+from math import cos, log, radians
+
+from pycore import execute, ir
+
+# default scale of all pic styles in layers/*.sty
+SCALE = 0.2
+
+# canvas vectors of the TikZ x, y and z unit in cm
+X_VECTOR = (1.0, 0.0)
+Y_VECTOR = (0.0, 1.0)
+Z_VECTOR = (-0.385, -0.385)
+
+NUMBER_PATTERN = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+
+# anchors of the box styles, as fractions of (length, height, depth) relative to the west anchor
+BOX_ANCHORS = {
+    'west': (0, 0, 0),
+    'east': (1, 0, 0),
+    'north': (0.5, 0.5, 0),
+    'south': (0.5, -0.5, 0),
+    'anchor': (0.5, 0, 0),
+    'near': (0.5, 0, 0.5),
+    'far': (0.5, 0, -0.5),
+    'center': (0.5, 0, 0),
+    'nearwest': (0, 0, 0.5),
+    'neareast': (1, 0, 0.5),
+    'farwest': (0, 0, -0.5),
+    'fareast': (1, 0, -0.5),
+    'northeast': (1, 0.5, 0),
+    'northwest': (0, 0.5, 0),
+    'southeast': (1, -0.5, 0),
+    'southwest': (0, -0.5, 0),
+    'nearnortheast': (1, 0.5, 0.5),
+    'farnortheast': (1, 0.5, -0.5),
+    'nearsoutheast': (1, -0.5, 0.5),
+    'farsoutheast': (1, -0.5, -0.5),
+    'nearnorthwest': (0, 0.5, 0.5),
+    'farnorthwest': (0, 0.5, -0.5),
+    'nearsouthwest': (0, -0.5, 0.5),
+    'farsouthwest': (0, -0.5, -0.5),
+}
+BANDED_ANCHORS = dict(BOX_ANCHORS, center=(0.5, 0, 1))
+STYLE_ANCHORS = {
+    'Box': dict(BOX_ANCHORS, nearsouth=(0.5, -0.5, 0.5)),
+    'RightBandedBox': dict(BANDED_ANCHORS, nearsouth=(0.5, -0.5, 0.5)),
+    'LeftBandedBox': BANDED_ANCHORS,
+    'BandedBox': BANDED_ANCHORS,
+    'SolidBox': dict(BOX_ANCHORS, nearsouth=(0.5, -0.5, 0.5), farnorth=(0.5, 0.5, -0.5)),
+}
+# anchors of the Ball style as multiples of the radius
+BALL_ANCHORS = {
+    'anchor': (0, 0),
+    'east': (1, 0),
+    'west': (-1, 0),
+    'north': (0, 1),
+    'south': (0, -1),
+    'northeast': (cos(radians(45)), cos(radians(45))),
+    'northwest': (-cos(radians(45)), cos(radians(45))),
+    'northnorthwest': (-cos(radians(65)), cos(radians(30))),
+    'southeast': (cos(radians(45)), -cos(radians(45))),
+    'southwest': (-cos(radians(45)), -cos(radians(45))),
+    'southsouthwest': (-cos(radians(65)), -cos(radians(30))),
+}
+
+
+class Shape:
+    """
+    Absolute geometry of a pic
+
+    The origin is the point the pic is drawn at (its west anchor for boxes, its center for balls). Boxes store their
+    length, height and depth in cm, balls store their radius in all three.
+    """
+    __slots__ = ('name', 'style', 'origin', 'size', 'node')
+
+    def __init__(self, name, style, origin, size, node=None):
+        self.name = name
+        self.style = style
+        self.origin = origin
+        self.size = size
+        self.node = node
+
+    def anchors(self):
+        x, y, z = self.origin
+        if self.style == 'Ball':
+            r = self.size[0]
+            return {a: (x + r * u, y + r * v, z) for a, (u, v) in BALL_ANCHORS.items()}
+        lx, ly, lz = self.size
+        return {a: (x + lx * u, y + ly * v, z + lz * w) for a, (u, v, w) in STYLE_ANCHORS[self.style].items()}
+
+    def corners(self):
+        # the eight corners of a box, west face first
+        x, y, z = self.origin
+        lx, ly, lz = self.size
+        return [(x + dx, y + dy, z + dz) for dx in (0, lx) for dy in (-ly / 2, ly / 2) for dz in (-lz / 2, lz / 2)]
+
+    def __repr__(self):
+        return 'Shape({!r}, {!r}, origin={}, size={})'.format(self.name, self.style, self.origin, self.size)
+
+
+class Layout:
+    """
+    Absolute positions of all pics and coordinates of an architecture
+    """
+
+    def __init__(self):
+        self.shapes = {}
+        self.points = {}
+
+    def add(self, shape):
+        self.shapes[shape.name] = shape
+        for anchor, point in shape.anchors().items():
+            self.points['{}-{}'.format(shape.name, anchor)] = point
+
+    def resolve(self, position):
+        """
+        Absolute point of a TikZ position such as '(conv1-east)', 'conv1-east' or '(1,0,0)'
+
+        Returns:
+            point {tuple} -- (x, y, z) in cm or None if the position can not be resolved
+        """
+        position = str(position).strip()
+        if position.startswith('(') and position.endswith(')'):
+            position = position[1:-1].strip()
+        point = vector(position)
+        if point is not None:
+            return point
+        return self.points.get(position)
+
+
+def number(value):
+    text = str(value).strip().strip('{}').strip()
+    if NUMBER_PATTERN.match(text):
+        return float(text)
+    return None
+
+
+def numbers(value):
+    # a number or a comma separated list of numbers as accepted by the width key of the box styles
+    if isinstance(value, (list, tuple)):
+        values = [number(v) for v in value]
+    else:
+        values = [number(v) for v in str(value).strip().strip('{}()').split(',') if v.strip()]
+    if not values or None in values:
+        return None
+    return values
+
+
+def vector(value):
+    """
+    Parse an offset or coordinate given as tuple or string like '(1,0,0)'
+
+    Returns:
+        point {tuple} -- (x, y, z), z is 0 for 2d coordinates, None if the value is not numeric
+    """
+    if isinstance(value, (list, tuple)):
+        values = [number(v) for v in value]
+    else:
+        values = [number(v) for v in str(value).strip().strip('{}').strip().strip('()').split(',')]
+    if len(values) not in (2, 3) or None in values:
+        return None
+    return tuple(values) + (0.0,) * (3 - len(values))
+
+
+def project(point):
+    """
+    Canvas position of a 3d point with the default TikZ unit vectors
+
+    Returns:
+        point {tuple} -- (x, y) in cm
+    """
+    x, y, z = point
+    return x * X_VECTOR[0] + y * Y_VECTOR[0] + z * Z_VECTOR[0], x * X_VECTOR[1] + y * Y_VECTOR[1] + z * Z_VECTOR[1]
+
+
+def _add(a, b):
+    return a[0] + b[0], a[1] + b[1], a[2] + b[2]
+
+
+def _sub(a, b):
+    return a[0] - b[0], a[1] - b[1], a[2] - b[2]
+
+
+def _box(height, depth, width):
+    widths = numbers(width)
+    height, depth = number(height), number(depth)
+    if widths is None or height is None or depth is None:
+        return None
+    return sum(widths) * SCALE, height * SCALE, depth * SCALE
+
+
+def _full_con_size(node):
+    width = node.width if isinstance(node.width, list) else log(node.n_filter)
+    return _box(node.size[0], node.size[1], width)
+
+
+def _z_conv_relu_size(node):
+    # the depth key of BandedBox takes a single length, the widths of a list are stacked into it, see tikz.z_conv_relu
+    depths = numbers(node.width) if isinstance(node.width, list) else [log(node.n_filter, 4)]
+    if depths is None:
+        return None
+    return _box(node.size[0], sum(depths), node.size[1])
+
+
+def _size(node):
+    return _box(node.size[0], node.size[1], node.width)
+
+
+def _height_depth(node):
+    return _box(node.height, node.depth, node.width)
+
+
+def _ball(node):
+    radius = number(getattr(node, 'radius', 2.5))
+    return (radius * SCALE,) * 3 if radius is not None else None
+
+
+# kind -> (style, size function, position field, suffix field appended to the position, position is wrapped in ())
+PICS = {
+    'conv': ('Box', _size, 'to', None, True),
+    'full_con': ('Box', _full_con_size, 'to', None, True),
+    'conv_relu': ('RightBandedBox', _size, 'to', None, True),
+    'rtl_conv_relu': ('LeftBandedBox', _size, 'to', None, True),
+    'z_conv_relu': ('BandedBox', _z_conv_relu_size, 'to', None, True),
+    'pool': ('Box', _size, 'to', 'anchor', True),
+    'detect': ('Box', _size, 'to', None, True),
+    'unpool': ('Box', _height_depth, 'to', None, False),
+    'conv_res': ('RightBandedBox', _height_depth, 'to', None, False),
+    'conv_soft_max': ('Box', _height_depth, 'to', None, False),
+    'relu': ('Box', _size, 'to', None, True),
+    'soft_max': ('Box', _size, 'to', 'anchor_to', True),
+    'shortcut': ('Box', _size, 'to', None, True),
+    'add': ('Ball', _ball, 'to', 'anchor_to', True),
+    'multiply': ('Ball', _ball, 'to', 'anchor_to', True),
+    'concatenate': ('Ball', _ball, 'to', 'anchor_to', True),
+}
+
+
+def place(node, layout):
+    """
+    Add the shapes of a node to a layout
+
+    Arguments:
+        node {Node} -- IR node
+        layout {Layout} -- layout of all preceding nodes
+
+    Returns:
+        origin {tuple} -- absolute point the node is drawn at or None if it has no fixed position
+    """
+    kind = node.kind
+    if kind == 'coordinate':
+        at, offset = layout.resolve(node.of), vector(node.offset)
+        if at is None or offset is None:
+            return None
+        layout.points[node.name] = _add(at, offset)
+        return layout.points[node.name]
+    if kind == 'upsample':
+        at, offset = layout.resolve(node.to), vector(node.offset)
+        if at is None or offset is None:
+            return None
+        first = _box(node.size_1[0], node.size_1[1], 1)
+        second = _box(node.size_2[0], node.size_2[1], 1)
+        origin = _add(at, offset)
+        layout.add(Shape(node.name + '_0', 'Box', origin, first, node))
+        east = layout.points[node.name + '_0-east']
+        layout.add(Shape(node.name, 'Box', _add(east, offset), second, node))
+        return origin
+    if kind not in PICS:
+        return None
+    style, size, field, suffix, _ = PICS[kind]
+    at = layout.resolve(getattr(node, field) + (getattr(node, suffix) if suffix else ''))
+    offset, size = vector(node.offset), size(node)
+    if at is None or offset is None or size is None:
+        return None
+    origin = _add(at, offset)
+    layout.add(Shape(node.name, style, origin, size, node))
+    return origin
+
+
+def layout(arch):
+    """
+    Compute absolute 3d positions of all pics in one pass over an architecture
+
+    Only IR nodes are placed, strings are skipped, as are nodes whose reference can not be resolved.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+
+    Returns:
+        layout {Layout} -- shapes by name and all anchor points
+    """
+    result = Layout()
+    for element in execute.flatten(arch):
+        if isinstance(element, ir.Node):
+            place(element, result)
+    return result
+
+
+def _format(point):
+    return ','.join('{:.5f}'.format(v).rstrip('0').rstrip('.') for v in point)
+
+
+def absolute(arch, result=None):
+    """
+    Rewrite IR nodes to be drawn at fixed coordinates instead of relative to other layers
+
+    The offsets stay as they are, the reference point becomes the absolute point minus the offset, so TeX does not
+    have to resolve chains of named coordinates any more.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+
+    Keyword Arguments:
+        result {Layout} -- layout to fill, a new one by default (default: {None})
+
+    Yields:
+        element {str|Node} -- architecture elements with fixed positions where they could be computed
+    """
+    result = result if result is not None else Layout()
+    for element in execute.flatten(arch):
+        if not isinstance(element, ir.Node):
+            yield element
+            continue
+        origin = place(element, result)
+        if origin is None:
+            yield element
+            continue
+        at = _format(_sub(origin, vector(element.offset)))
+        if element.kind == 'coordinate':
+            yield element.replace(of=at)
+        elif element.kind == 'upsample':
+            yield element.replace(to=at)
+        else:
+            _, _, field, suffix, wrapped = PICS[element.kind]
+            changes = {field: at if wrapped else '(' + at + ')'}
+            if suffix:
+                changes[suffix] = ''
+            yield element.replace(**changes)
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from pycore.cache import default_root, engine_version
+
+# marks the end of the part of the preamble that goes into the format, expands to \relax without a format
+MARKER = r'\csname endofdump\endcsname'
+
+
+def split(source):
+    """
+    Split a document at the format marker
+
+    Arguments:
+        source {str} -- TeX source
+
+    Returns:
+        preamble {str} -- everything before the marker or None if the source has no marker
+    """
+    index = source.find(MARKER)
+    if index < 0:
+        return None
+    return source[:index]
+
+
+def format_name(preamble, folder, engine='pdflatex'):
+    # relative imports in the preamble are resolved against the folder, so it is part of the key
+    digest = hashlib.sha256()
+    for part in (engine, engine_version(engine), os.path.abspath(folder), preamble):
+        digest.update(part.encode() + b'\0')
+    return 'pnn-' + digest.hexdigest()[:16]
+
+
+def format_dir():
+    return os.path.join(default_root(), 'formats')
+
+
+def dump_format(preamble, folder, engine='pdflatex'):
+    """
+    Dump a preamble into a format file once, using mylatexformat
+
+    Arguments:
+        preamble {str} -- preamble up to the format marker
+        folder {str} -- folder relative imports of the preamble are resolved against
+
+    Keyword Arguments:
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+
+    Returns:
+        name {str} -- format name to pass with -fmt or None if the format could not be built
+    """
+    name = format_name(preamble, folder, engine)
+    target_dir = format_dir()
+    if os.path.exists(os.path.join(target_dir, name + '.fmt')):
+        return name
+    os.makedirs(target_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='pnn-fmt-') as scratch:
+        source = os.path.join(scratch, name + '.tex')
+        with open(source, 'w') as f:
+            f.write(preamble + '\n' + MARKER + '\n')
+        cmd = [engine, '-ini', '-interaction=nonstopmode', '-jobname=' + name, '-output-directory=' + scratch,
+               '&' + engine, 'mylatexformat.ltx', source]
+        try:
+            proc = subprocess.run(cmd, cwd=folder, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError:
+            return None
+        fmt = os.path.join(scratch, name + '.fmt')
+        if proc.returncode or not os.path.exists(fmt):
+            return None
+        # concurrent jobs may dump the same format, the rename keeps the file consistent
+        tmp = os.path.join(target_dir, '{}.fmt.{}'.format(name, os.getpid()))
+        shutil.move(fmt, tmp)
+        os.replace(tmp, os.path.join(target_dir, name + '.fmt'))
+    return name
+
+
+def format_options(file, engine='pdflatex', folder=None):
+    """
+    Engine options and environment to compile a file with its precompiled preamble
+
+    Arguments:
+        file {str} -- path of the .tex file
+
+    Keyword Arguments:
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+        folder {str} -- folder relative paths are resolved against, defaults to the folder of the file (default: {None})
+
+    Returns:
+        options {list} -- extra command line options, empty if the file has no marker or dumping failed
+        env {dict} -- environment for the engine process or None
+    """
+    with open(file) as f:
+        preamble = split(f.read())
+    if preamble is None:
+        return [], None
+    name = dump_format(preamble, folder or os.path.dirname(os.path.abspath(file)), engine)
+    if name is None:
+        return [], None
+    env = dict(os.environ)
+    env['TEXFORMATS'] = format_dir() + os.pathsep + env.get('TEXFORMATS', '')
+    return ['-fmt=' + name], env
@@ -0,0 +1,352 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, child CPU time and peak RSS are reported as None there
+    resource = None
+
+# profilers that currently record, innermost last
+_active = []
+# callables notified with every finished Event, also when no profiler is active
+hooks = []
+# Python allocation peaks of the stages open while tracemalloc traces, see stage
+_open_peaks = []
+_peaks_lock = threading.Lock()
+
+
+class Event:
+    """
+    A finished stage: wall and CPU time, memory, and the CPU time of child processes such as the TeX engine
+    """
+    __slots__ = ('name', 'category', 'start', 'seconds', 'cpu_seconds', 'child_cpu_seconds', 'rss', 'rss_delta',
+                 'py_peak', 'thread', 'args')
+
+    def __init__(self, name, category, start, seconds, cpu_seconds, child_cpu_seconds, rss, rss_delta, py_peak,
+                 thread, args):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.seconds = seconds
+        self.cpu_seconds = cpu_seconds
+        self.child_cpu_seconds = child_cpu_seconds
+        self.rss = rss
+        self.rss_delta = rss_delta
+        self.py_peak = py_peak
+        self.thread = thread
+        self.args = args
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return 'Event({!r}, {:.6f}s)'.format(self.name, self.seconds)
+
+
+def _rss():
+    # current resident set size in bytes
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    # peak instead of current size where /proc is not available, kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Peak:
+    # the highest traced size a stage saw before an inner stage reset the tracemalloc peak
+    __slots__ = ('bytes',)
+
+    def __init__(self):
+        self.bytes = 0
+
+
+def _enter_peak():
+    # tracemalloc keeps a single peak, so it is folded into every open stage before it is reset for a new one
+    current = tracemalloc.get_traced_memory()[1]
+    peak = _Peak()
+    with _peaks_lock:
+        for other in _open_peaks:
+            other.bytes = max(other.bytes, current)
+        tracemalloc.reset_peak()
+        _open_peaks.append(peak)
+    return peak
+
+
+def _exit_peak(peak):
+    with _peaks_lock:
+        _open_peaks[:] = [other for other in _open_peaks if other is not peak]
+        if tracemalloc.is_tracing():
+            return max(peak.bytes, tracemalloc.get_traced_memory()[1])
+        return peak.bytes
+
+
+def _child_cpu():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def enabled():
+    return bool(_active or hooks)
+
+
+def _emit(event):
+    for profiler in _active:
+        profiler.add(event)
+    for hook in hooks:
+        hook(event)
+
+
+@contextmanager
+def stage(name, category='stage', **args):
+    """
+    Record the enclosed code as one stage of the active profilers
+
+    Costs a single check when nothing records.
+
+    Arguments:
+        name {str} -- stage name, e.g. 'write_tex'
+
+    Keyword Arguments:
+        category {str} -- group of the stage, e.g. 'stage', 'block' or 'process' (default: {'stage'})
+        args -- extra values stored with the event, e.g. the file name
+    """
+    if not enabled():
+        yield
+        return
+    rss, child = _rss(), _child_cpu()
+    peak = _enter_peak() if tracemalloc.is_tracing() else None
+    start, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        seconds, cpu = time.perf_counter() - start, time.thread_time() - cpu
+        after, child_after = _rss(), _child_cpu()
+        _emit(Event(
+            name, category, start, seconds, cpu,
+            child_after - child if child is not None else None,
+            after, after - rss if rss is not None and after is not None else None,
+            _exit_peak(peak) if peak is not None else None,
+            threading.get_ident(), args))
+
+
+def timed(name=None, category='stage'):
+    """
+    Decorator recording every call of a function as a stage
+
+    Keyword Arguments:
+        name {str} -- stage name, defaults to the function name (default: {None})
+        category {str} -- group of the stage (default: {'stage'})
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return function(*args, **kwargs)
+            with stage(name or function.__name__, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def block(builder):
+    """
+    Decorator for the generator functions in pycore.blocks
+
+    Builders do their work lazily while the caller iterates, so only the time spent inside the generator is counted,
+    not the time the consumer needs for each fragment, e.g. to write it. Arch lists are usually built before the
+    profiler is started, so whether a block is timed is decided when it is iterated, not when it is called.
+
+    The decorated builder returns a Block, which runs the generator again on every iteration.
+    """
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        return Block(builder, args, kwargs)
+
+    return wrapper
+
+
+class Block:
+    """
+    Re-iterable result of a builder in pycore.blocks
+
+    Every iteration calls the builder again, so an architecture can be validated and then written, or built twice.
+    Like the lists returned by the original builders, blocks can be concatenated with lists and other blocks.
+    """
+    __slots__ = ('builder', 'args', 'kwargs')
+
+    def __init__(self, builder, args, kwargs):
+        self.builder = builder
+        self.args = args
+        self.kwargs = kwargs
+
+    def __iter__(self):
+        return _timed_generator(self.builder.__name__, self.builder(*self.args, **self.kwargs), self.args[:2])
+
+    def __add__(self, other):
+        return [self] + _as_list(other)
+
+    def __radd__(self, other):
+        return _as_list(other) + [self]
+
+    def __repr__(self):
+        return 'Block({}{!r})'.format(self.builder.__name__, self.args)
+
+
+def _as_list(other):
+    # blocks stay lazy when they are concatenated, other iterables are copied like list + list would do
+    return [other] if isinstance(other, Block) else list(other)
+
+
+def _timed_generator(name, generator, args):
+    # runs on the first next()
+    if not enabled():
+        yield from generator
+        return
+    seconds = cpu = 0.0
+    first = None
+    count = 0
+    rss = _rss()
+    try:
+        while True:
+            start, start_cpu = time.perf_counter(), time.thread_time()
+            first = start if first is None else first
+            try:
+                fragment = next(generator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+                cpu += time.thread_time() - start_cpu
+            count += 1
+            yield fragment
+    finally:
+        after = _rss()
+        _emit(Event(
+            name, 'block', first, seconds, cpu, None, after,
+            after - rss if rss is not None and after is not None else None, None, threading.get_ident(),
+            {'args': [str(a) for a in args], 'fragments': count}))
+
+
+class Profiler:
+    """
+    Collects the stages of the generate, write, compile and cleanup pipeline
+
+    Stages are recorded by pycore.execute and the builders in pycore.blocks while the profiler is active:
+
+        with profiling.Profiler() as profiler:
+            execute.write_tex(arch, 'file.tex')
+            execute.tex_to_pdf('file.tex')
+        profiler.write_chrome_trace('trace.json')
+
+    Keyword Arguments:
+        memory {bool} -- trace Python allocations to record the peak per stage, slows down the run (default: {False})
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.events = []
+        self.origin = None
+        self._lock = threading.Lock()
+        self._tracing = False
+
+    def __enter__(self):
+        self.origin = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        _active.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _active.remove(self)
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        return False
+
+    def add(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """
+        Totals per stage name
+
+        Returns:
+            summary {dict} -- name -> {'calls', 'seconds', 'cpu_seconds', 'child_cpu_seconds'}
+        """
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event.name, {'category': event.category, 'calls': 0, 'seconds': 0.0,
+                                                   'cpu_seconds': 0.0, 'child_cpu_seconds': 0.0})
+            total['calls'] += 1
+            total['seconds'] += event.seconds
+            total['cpu_seconds'] += event.cpu_seconds
+            total['child_cpu_seconds'] += event.child_cpu_seconds or 0.0
+        return totals
+
+    def to_dict(self):
+        events = []
+        for event in self.events:
+            data = event.to_dict()
+            data['start'] -= self.origin or 0
+            events.append(data)
+        return {'events': events, 'summary': self.summary()}
+
+    def write_json(self, file):
+        with open(file, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def chrome_trace(self):
+        """
+        Events in the Trace Event Format read by chrome://tracing and Perfetto
+
+        Returns:
+            trace {dict} -- complete ('X') events in microseconds
+        """
+        pid = os.getpid()
+        events = []
+        for event in self.events:
+            args = dict(event.args)
+            args.update({key: getattr(event, key) for key in ('cpu_seconds', 'child_cpu_seconds', 'rss', 'rss_delta',
+                                                              'py_peak') if getattr(event, key) is not None})
+            events.append({
+                'name': event.name,
+                'cat': event.category,
+                'ph': 'X',
+                'ts': (event.start - (self.origin or 0)) * 1e6,
+                'dur': event.seconds * 1e6,
+                'pid': pid,
+                'tid': event.thread,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, file):
+        with open(file, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def report(self):
+        lines = ['{:<24} {:<8} {:>6} {:>10} {:>10} {:>10}'.format('stage', 'category', 'calls', 'wall [s]', 'cpu [s]',
+                                                                  'child [s]')]
+        for name, total in sorted(self.summary().items(), key=lambda item: -item[1]['seconds']):
+            lines.append('{:<24} {:<8} {:>6} {:>10.4f} {:>10.4f} {:>10.4f}'.format(
+                name, total['category'], total['calls'], total['seconds'], total['cpu_seconds'],
+                total['child_cpu_seconds']))
+        return '\n'.join(lines)
@@ -0,0 +1,431 @@
+import struct
+import zlib
+from functools import lru_cache
+
+from pycore import execute, ir, layout, svg
+
+try:
+    import numpy as np
+except ImportError:
+    # the raster preview is optional, everything else works without numpy
+    np = None
+
+# px per cm of the preview, lowered automatically to respect max_size
+DEFAULT_SCALE = 10
+DEFAULT_MAX_SIZE = 2048
+# labels are left out below this font size in px
+MIN_FONT_SIZE = 5
+# pixels of polygon bounding boxes rasterized per vectorized chunk
+FRAGMENT_BUDGET = 1 << 22
+
+# corners of a box as fractions of (length, height, depth), relative to (west, center, center)
+CORNERS = (
+    (0, 0.5, 0.5),  # a
+    (0, -0.5, 0.5),  # b
+    (1, -0.5, 0.5),  # c
+    (1, 0.5, 0.5),  # d
+    (1, 0.5, -0.5),  # e
+    (1, -0.5, -0.5),  # f
+    (0, -0.5, -0.5),  # g
+    (0, 0.5, -0.5),  # h
+)
+# faces as corner indices, in the order the styles draw them
+FACES = {
+    'front': (3, 0, 1, 2),
+    'top': (3, 0, 7, 4),
+    'east': (3, 4, 5, 2),
+    'west': (0, 1, 6, 7),
+}
+FACE_BITS = {name: 1 << i for i, name in enumerate(FACES)}
+
+# 3x5 bitmap font for rough labels, missing characters are left blank
+GLYPHS = {
+    '0': '111101101101111', '1': '010110010010111', '2': '111001111100111', '3': '111001111001111',
+    '4': '101101111001001', '5': '111100111001111', '6': '111100111101111', '7': '111001010010010',
+    '8': '111101111101111', '9': '111101111001111', 'A': '010101111101101', 'B': '110101110101110',
+    'C': '011100100100011', 'D': '110101101101110', 'E': '111100110100111', 'F': '111100110100100',
+    'G': '011100101101011', 'H': '101101111101101', 'I': '111010010010111', 'J': '001001001101010',
+    'K': '101101110101101', 'L': '100100100100111', 'M': '101111111101101', 'N': '110101101101101',
+    'O': '010101101101010', 'P': '110101110100100', 'Q': '010101101110011', 'R': '110101110101101',
+    'S': '011100010001110', 'T': '111010010010010', 'U': '101101101101111', 'V': '101101101101010',
+    'W': '101101111111101', 'X': '101101010101101', 'Y': '101101010010010', 'Z': '111001010100111',
+    '×': '000101010101000', '+': '000010111010000', '-': '000000111000000', '.': '000000000000010',
+    ',': '000000000010100', '_': '000000000000111', '(': '010100100100010', ')': '010001001001010',
+    '/': '001001010100100', ':': '000010000010000', '=': '000111000111000', '⊕': '010111111111010',
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('The raster preview needs numpy, install it with `pip install numpy`')
+
+
+class Recorder(svg.Canvas):
+    """
+    Canvas that keeps the primitives of connections and labels instead of writing SVG, so the connection logic of
+    the SVG backend is shared
+    """
+
+    def __init__(self):
+        super().__init__(scale=1)
+        self.polygons = []
+        self.lines = []
+        self.texts = []
+
+    def _xy(self, p):
+        x, y = layout.project(p) if len(p) == 3 else p
+        self.bounds = [min(self.bounds[0], x), min(self.bounds[1], y), max(self.bounds[2], x), max(self.bounds[3], y)]
+        return x, y
+
+    def polygon(self, points, fill, opacity=1.0, stroke='black', stroke_opacity=1.0, width=0.4):
+        self.polygons.append(([self._xy(p) for p in points], fill, max(opacity, 0.7)))
+
+    def polyline(self, points, stroke='black', opacity=1.0, width=0.4, dashed=False):
+        points = [self._xy(p) for p in points]
+        for p, q in zip(points, points[1:]):
+            self.lines.append((p, q, stroke, opacity, width))
+
+    def text(self, p, text, size=14.4, anchor='middle', baseline='middle'):
+        text = svg.plain_text(text)
+        if text:
+            self.texts.append((self._xy(p), text, size, anchor, baseline))
+
+
+# thousands of layers share a handful of colors
+_parse_color = lru_cache(maxsize=None)(svg.parse_color)
+
+
+def _rgb(color):
+    return tuple(int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+
+
+def _boxes(result):
+    """
+    Split the shapes of a layout into drawable boxes and balls
+
+    Every width segment and every band becomes its own box with a mask of the faces that are drawn, in drawing order.
+
+    Returns:
+        boxes {tuple} -- origins (N, 3), sizes (N, 3), face masks (N,), colors (N, 3), opacities (N,)
+        balls {tuple} -- centers (M, 3), radii (M,), colors (M, 3), opacities (M,)
+    """
+    origins, sizes, masks, colors, opacities = [], [], [], [], []
+    centers, radii, ball_colors, ball_opacities = [], [], [], []
+    front_top = FACE_BITS['front'] | FACE_BITS['top']
+    for shape in result.shapes.values():
+        kind = shape.node.kind if shape.node is not None else 'conv'
+        fill, band, opacity_field, opacity = svg.STYLES.get(kind, svg.STYLES['conv'])
+        if opacity_field and shape.node is not None:
+            opacity = float(layout.number(getattr(shape.node, opacity_field)) or opacity)
+        fill = _parse_color(fill)
+        if shape.style == 'Ball':
+            centers.append(shape.origin)
+            radii.append(shape.size[0])
+            ball_colors.append(fill)
+            ball_opacities.append(opacity)
+            continue
+        band = band and _parse_color(band)
+        x, y, z = shape.origin
+        _, ly, lz = shape.size
+        segments = svg._segments(shape)
+        for i, (start, end) in enumerate(segments):
+            last = i == len(segments) - 1
+            length = end - start
+            origins.append((x + start, y, z))
+            sizes.append((length, ly, lz))
+            masks.append(front_top | (FACE_BITS['east'] if last else 0))
+            colors.append(fill)
+            opacities.append(opacity)
+            if not band:
+                continue
+            if shape.style == 'RightBandedBox':
+                origins.append((x + end - length / 4, y, z))
+                sizes.append((length / 4, ly, lz))
+                masks.append(front_top | (FACE_BITS['east'] if last else 0))
+            elif shape.style == 'LeftBandedBox':
+                origins.append((x + start, y, z))
+                sizes.append((length / 5, ly, lz))
+                masks.append(front_top | (FACE_BITS['west'] if last else 0))
+            else:
+                origins.append((x + start, y, z + 3 * lz / 8))
+                sizes.append((length, ly, lz / 4))
+                masks.append(FACE_BITS['east'] | FACE_BITS['top'])
+            colors.append(band)
+            opacities.append(svg.BAND_OPACITY)
+    return ((np.array(origins, dtype=float).reshape(-1, 3), np.array(sizes, dtype=float).reshape(-1, 3),
+             np.array(masks, dtype=int), np.array(colors, dtype=float).reshape(-1, 3), np.array(opacities)),
+            (np.array(centers, dtype=float).reshape(-1, 3), np.array(radii, dtype=float),
+             np.array(ball_colors, dtype=float).reshape(-1, 3), np.array(ball_opacities)))
+
+
+def project(points):
+    """
+    Canvas position of many 3d points at once
+
+    Arguments:
+        points {ndarray} -- (..., 3) points in cm
+
+    Returns:
+        points {ndarray} -- (..., 2) canvas positions in cm
+    """
+    matrix = np.array([layout.X_VECTOR, layout.Y_VECTOR, layout.Z_VECTOR])
+    return points @ matrix
+
+
+def corners(origins, sizes):
+    """
+    The eight corners of many boxes at once
+
+    Returns:
+        corners {ndarray} -- (N, 8, 3) corners in the order a..h of the box styles
+    """
+    return origins[:, None, :] + np.array(CORNERS)[None, :, :] * sizes[:, None, :]
+
+
+def _fill_all(image, polygons, colors, alphas, budget=FRAGMENT_BUDGET):
+    """
+    Fill many convex polygons at once, blending them in order as if they were drawn one after the other
+
+    Every pixel of every polygon's bounding box becomes a fragment, fragments are tested against all edges of their
+    polygon in one go and composited per pixel with the product of the transparencies drawn above them. Polygons are
+    processed in chunks of about `budget` fragments to bound memory.
+
+    Arguments:
+        image {ndarray} -- (height, width, 3) float image, changed in place
+        polygons {ndarray} -- (N, K, 2) convex polygons in pixel coordinates
+        colors {ndarray} -- (N, 3) rgb in [0, 1]
+        alphas {ndarray} -- (N,) opacities
+    """
+    height, width = image.shape[:2]
+    if not len(polygons):
+        return
+    low = np.clip(np.floor(polygons.min(axis=1)).astype(int), 0, (width, height))
+    high = np.clip(np.ceil(polygons.max(axis=1)).astype(int) + 1, 0, (width, height))
+    extent = np.maximum(high - low, 0)
+    areas = extent[:, 0] * extent[:, 1]
+    cuts = np.searchsorted(np.cumsum(areas), np.arange(budget, areas.sum(), budget), side='right')
+    bounds = np.unique(np.r_[0, cuts, len(polygons)])
+    for start, end in zip(bounds, bounds[1:]):
+        _fill_chunk(image, polygons[start:end], colors[start:end], alphas[start:end], low[start:end],
+                    extent[start:end], areas[start:end])
+
+
+def _fill_chunk(image, polygons, colors, alphas, low, extent, areas):
+    width = image.shape[1]
+    if not areas.sum():
+        return
+    owner = np.repeat(np.arange(len(polygons)), areas)
+    local = np.arange(areas.sum()) - np.repeat(np.cumsum(areas) - areas, areas)
+    row_width = np.maximum(extent[owner, 0], 1)
+    xs = low[owner, 0] + local % row_width
+    ys = low[owner, 1] + local // row_width
+    px, py = xs + 0.5, ys + 0.5
+    # edge k of every polygon as a line a x + b y + c, the sign tells the side of a point
+    edge = np.roll(polygons, -1, axis=1) - polygons
+    a, b = -edge[..., 1], edge[..., 0]
+    c = -(a * polygons[..., 0] + b * polygons[..., 1])
+    positive = negative = True
+    for k in range(polygons.shape[1]):
+        cross = a[owner, k] * px + b[owner, k] * py + c[owner, k]
+        positive, negative = positive & (cross >= 0), negative & (cross <= 0)
+    inside = positive | negative
+    owner, pixel = owner[inside], (ys * width + xs)[inside]
+    if not len(pixel):
+        return
+    # group fragments by pixel, fragments are generated in drawing order and the stable sort keeps it
+    order = np.argsort(pixel, kind='stable')
+    owner, pixel = owner[order], pixel[order]
+    first = np.flatnonzero(np.r_[True, pixel[1:] != pixel[:-1]])
+    alpha = np.clip(alphas[owner], 0, 1 - 1e-6)
+    clear = np.log1p(-alpha)
+    total = np.add.reduceat(clear, first)
+    counts = np.diff(np.r_[first, len(pixel)])
+    above = np.repeat(total, counts) - (np.cumsum(clear) - np.repeat(np.cumsum(clear)[first] - clear[first], counts))
+    color = np.add.reduceat(colors[owner] * (alpha * np.exp(above))[:, None], first)
+    flat = image.reshape(-1, 3)
+    target = pixel[first]
+    flat[target] = flat[target] * np.exp(total)[:, None] + color
+
+
+def _lines(image, starts, ends, colors, alphas, width=1):
+    # draw all segments at once by sampling one point per pixel along each of them
+    if not len(starts):
+        return
+    height, widthpx = image.shape[:2]
+    steps = np.maximum(np.ceil(np.abs(ends - starts).max(axis=1)).astype(int), 1) + 1
+    index = np.repeat(np.arange(len(starts)), steps)
+    t = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = t / np.repeat(steps - 1, steps)
+    points = starts[index] + (ends - starts)[index] * t[:, None]
+    for dx in range(-(width // 2), width - width // 2):
+        for dy in range(-(width // 2), width - width // 2):
+            xs, ys = np.round(points[:, 0]).astype(int) + dx, np.round(points[:, 1]).astype(int) + dy
+            keep = (xs >= 0) & (xs < widthpx) & (ys >= 0) & (ys < height)
+            alpha = alphas[index][keep, None]
+            image[ys[keep], xs[keep]] = image[ys[keep], xs[keep]] * (1 - alpha) + colors[index][keep] * alpha
+
+
+@lru_cache(maxsize=None)
+def _glyph(char, pixel):
+    # pixel coordinates of a glyph scaled to pixel x pixel blocks
+    glyph = GLYPHS.get(char)
+    if glyph is None:
+        return None
+    bits = np.array([b == '1' for b in glyph]).reshape(5, 3)
+    return np.nonzero(np.kron(bits, np.ones((pixel, pixel), dtype=bool)))
+
+
+def _text(image, at, text, size):
+    # stamp text with the bitmap font, centered on a pixel position
+    pixel = max(int(round(size / 5)), 1)
+    text = text.upper()
+    x, y = int(round(at[0] - len(text) * 2 * pixel)), int(round(at[1] - 2.5 * pixel))
+    for i, char in enumerate(text):
+        glyph = _glyph(char, pixel)
+        if glyph is None:
+            continue
+        ys, xs = glyph[0] + y, glyph[1] + x + i * 4 * pixel
+        keep = (xs >= 0) & (xs < image.shape[1]) & (ys >= 0) & (ys < image.shape[0])
+        image[ys[keep], xs[keep]] = 0
+
+
+def draw(arch, scale=DEFAULT_SCALE, max_size=DEFAULT_MAX_SIZE, labels=True):
+    """
+    Rasterize an architecture to an RGB array without LaTeX
+
+    All boxes and balls are projected at once, faces are filled in the order TikZ draws them.
+
+    Arguments:
+        arch {iterable} -- architecture elements, only IR nodes are drawn, see svg.draw
+
+    Keyword Arguments:
+        scale {float} -- px per cm (default: {10})
+        max_size {int} -- upper bound of width and height in px, the scale is reduced to fit (default: {2048})
+        labels {bool} -- draw rough filter count and caption labels (default: {True})
+
+    Returns:
+        image {ndarray} -- (height, width, 3) uint8 array
+    """
+    _require_numpy()
+    result, recorder = layout.Layout(), Recorder()
+    skipped = 0
+    for element in execute.flatten(arch):
+        if not isinstance(element, ir.Node):
+            skipped += svg.undrawable(element)
+            continue
+        if element.kind == 'text':
+            at, shift = result.resolve(element.of), layout.vector(element.shift)
+            if at is not None and shift is not None:
+                recorder.text(layout._add(at, shift), element.text)
+        elif layout.place(element, result) is None:
+            svg.draw_connection(recorder, element, result)
+    svg.warn_undrawable(skipped)
+
+    (origins, sizes, masks, colors, opacities), (centers, radii, ball_colors, ball_opacities) = _boxes(result)
+    box_corners = project(corners(origins, sizes))
+    ball_centers = project(centers)
+    extent = [box_corners.reshape(-1, 2), ball_centers - radii[:, None], ball_centers + radii[:, None]]
+    if recorder.lines or recorder.polygons:
+        extent.append(np.array([recorder.bounds[:2], recorder.bounds[2:]]))
+    extent = np.concatenate(extent)
+    if not len(extent):
+        extent = np.zeros((1, 2))
+    low, high = extent.min(axis=0) - 0.5, extent.max(axis=0) + 0.5
+    scale = min(scale, max_size / max((high - low).max(), 1e-9))
+    size = np.maximum(np.ceil((high - low) * scale).astype(int), 1)
+
+    def pixels(points):
+        points = np.asarray(points, dtype=float)
+        return np.stack([(points[..., 0] - low[0]) * scale, (high[1] - points[..., 1]) * scale], axis=-1)
+
+    image = np.ones((size[1], size[0], 3))
+    box_corners = pixels(box_corners)
+    starts, ends = [], []
+    for name, face in FACES.items():
+        drawn = (masks & FACE_BITS[name]) != 0
+        quads = box_corners[drawn][:, face]
+        starts.append(quads.reshape(-1, 2))
+        ends.append(np.roll(quads, -1, axis=1).reshape(-1, 2))
+    faces = box_corners[:, [list(face) for face in FACES.values()]]
+    drawn = (masks[:, None] & np.array(list(FACE_BITS.values()))[None, :]) != 0
+    boxes, _ = np.nonzero(drawn)
+    _fill_all(image, faces[drawn], colors[boxes], opacities[boxes])
+
+    # balls, shaded from white at the upper left to their color at the rim
+    ball_centers, ball_radii = pixels(ball_centers), radii * scale
+    for center, radius, color, alpha in zip(ball_centers, ball_radii, ball_colors, ball_opacities):
+        x0, y0 = np.maximum(np.floor(center - radius).astype(int), 0)
+        x1, y1 = np.minimum(np.ceil(center + radius).astype(int) + 1, (size[0], size[1]))
+        if x0 >= x1 or y0 >= y1:
+            continue
+        ys, xs = np.mgrid[y0:y1, x0:x1] + 0.5
+        inside = (xs - center[0]) ** 2 + (ys - center[1]) ** 2 <= radius ** 2
+        light = np.hypot(xs - center[0] + radius * 0.3, ys - center[1] + radius * 0.3) / (radius * 1.3)
+        shade = 1 - (1 - color[None, None, :]) * np.clip(light, 0, 1)[..., None]
+        region = image[y0:y1, x0:x1]
+        blend = min(1.0, alpha * 2)
+        region[inside] = region[inside] * (1 - blend) + shade[inside] * blend
+
+    # box edges, then connections and arrows on top
+    edges = np.concatenate(starts) if starts else np.zeros((0, 2))
+    _lines(image, edges, np.concatenate(ends), np.zeros((len(edges), 3)), np.full(len(edges), 0.8))
+    if recorder.lines:
+        line_starts = pixels([line[0] for line in recorder.lines])
+        line_ends = pixels([line[1] for line in recorder.lines])
+        line_colors = np.array([_rgb(line[2]) if line[2].startswith('#') else (0, 0, 0)
+                                for line in recorder.lines])
+        line_alphas = np.array([line[3] for line in recorder.lines])
+        _lines(image, line_starts, line_ends, line_colors, line_alphas, width=2 if scale >= 8 else 1)
+    if recorder.polygons:
+        _fill_all(image, pixels([points for points, _, _ in recorder.polygons]),
+                  np.array([_rgb(color) for _, color, _ in recorder.polygons]),
+                  np.array([alpha for _, _, alpha in recorder.polygons]))
+
+    font = scale * 0.5
+    if labels and font >= MIN_FONT_SIZE:
+        for shape in result.shapes.values():
+            if shape.style == 'Ball' or shape.node is None:
+                continue
+            xlabels, _, caption = svg._labels(shape, shape.node.kind)
+            x, y, z = shape.origin
+            _, ly, lz = shape.size
+            for (start, end), label in zip(svg._segments(shape), xlabels):
+                bottom = project(np.array([x + (start + end) / 2, y - ly / 2, z + lz / 2]))
+                _text(image, pixels(bottom) + (0, font), label, font)
+            if caption.strip():
+                bottom = project(np.array([x + shape.size[0] / 2, y - ly / 2, z + lz / 2]))
+                _text(image, pixels(bottom) + (0, 3 * font), svg.plain_text(caption), font)
+        for at, text, _, _, _ in recorder.texts:
+            _text(image, pixels(at), text, font)
+    return (np.clip(image, 0, 1) * 255).round().astype(np.uint8)
+
+
+def png_bytes(image):
+    """
+    Encode an RGB array as PNG
+
+    Arguments:
+        image {ndarray} -- (height, width, 3) uint8 array
+
+    Returns:
+        png {bytes} -- PNG file content
+    """
+    height, width = image.shape[:2]
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)], axis=1)
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+def to_png(arch, scale=DEFAULT_SCALE, max_size=DEFAULT_MAX_SIZE, labels=True):
+    return png_bytes(draw(arch, scale, max_size, labels))
+
+
+def write_png(arch, file, scale=DEFAULT_SCALE, max_size=DEFAULT_MAX_SIZE, labels=True):
+    with open(file, 'wb') as f:
+        f.write(to_png(arch, scale, max_size, labels))
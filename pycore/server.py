@@ -0,0 +1,302 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pycore import engines, execute, ir
+from pycore.cache import BuildCache
+
+# relative paths in sources are resolved against this folder, where ../layers/ is the style folder of the repository
+DEFAULT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pyexamples')
+# number of jobs waiting for a worker before new ones are rejected
+DEFAULT_QUEUE = 64
+# number of recent jobs the latency percentiles are computed over
+LATENCY_WINDOW = 1000
+CONTENT_TYPES = {'pdf': 'application/pdf', 'svg': 'image/svg+xml', 'png': 'image/png'}
+# svg and png are converted from the pdf, so only engines writing one can be used
+PDF_ENGINES = tuple(name for name, engine in engines.ENGINES.items() if engine.output == 'pdf') + ('auto',)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class RenderError(Exception):
+    """
+    A job that did not produce a figure, with the engine output
+    """
+
+    def __init__(self, message, log=''):
+        super().__init__(message)
+        self.log = log
+
+
+def arch_source(spec):
+    """
+    TeX of an architecture given as JSON
+
+    Arguments:
+        spec {list} -- node dicts as returned by Node.to_dict and plain TeX strings, see ir.from_dict
+
+    Returns:
+        source {str} -- TeX of the document
+    """
+    return ''.join(execute.iter_fragments(item if isinstance(item, str) else ir.from_dict(item) for item in spec))
+
+
+def convert(pdf, fmt, scratch):
+    """
+    Convert the first page of a pdf, see execute.convert_pdf
+
+    Returns:
+        file {str} -- path of the svg or png file
+    """
+    target = os.path.join(scratch, 'figure.' + fmt)
+    try:
+        execute.convert_pdf(pdf, target)
+    except OSError as e:
+        raise RenderError('pdftocairo is needed for {} output'.format(fmt), str(e))
+    except subprocess.CalledProcessError as e:
+        raise RenderError('conversion to {} failed'.format(fmt), e.output)
+    return target
+
+
+class Metrics:
+    """
+    Counters and recent latencies of the render jobs, safe to update from several threads
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'queued': 0, 'running': 0, 'done': 0, 'failed': 0, 'rejected': 0,
+                       'deduplicated': 0}
+        self.latencies = deque(maxlen=window)
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    def finish(self, seconds, ok):
+        with self.lock:
+            self.counts['running'] -= 1
+            self.counts['done' if ok else 'failed'] += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            data = dict(self.counts)
+            latencies = sorted(self.latencies)
+        data['queue_depth'] = data.pop('queued')
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+        data['latency_seconds'] = {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                                   'max': latencies[-1] if latencies else None}
+        return data
+
+
+class Renderer:
+    """
+    Bounded worker pool compiling figures, identical requests in flight share one compile
+
+    A request is identified by the hash of its source, the output format and the engine. While a job for a key is
+    queued or running, further requests for it wait for the same result instead of starting another engine. Jobs run
+    in folders below execute.scratch_root that are removed as soon as the output is read, results are only kept by
+    cache.
+
+    Arguments:
+        folder {str} -- folder relative paths in sources are resolved against
+
+    Keyword Arguments:
+        jobs {int} -- number of engines running at the same time, defaults to the number of cores (default: {None})
+        queue {int} -- number of jobs waiting for a worker before new ones are rejected (default: {64})
+        engine {str} -- pdf engine of pycore.engines, 'auto' or a TeX executable (default: {'pdflatex'})
+        cache {BuildCache} -- reuse pdfs of earlier runs, also across restarts (default: {None})
+
+    Raises:
+        ValueError: for an engine of pycore.engines that does not write a pdf
+    """
+
+    def __init__(self, folder=DEFAULT_FOLDER, jobs=None, queue=DEFAULT_QUEUE, engine='pdflatex', cache=None):
+        if engine in engines.ENGINES and engine not in PDF_ENGINES:
+            raise ValueError('{} does not write a pdf, use one of {}'.format(engine, ', '.join(PDF_ENGINES)))
+        self.folder = os.path.abspath(folder)
+        self.engine = engine
+        self.cache = cache
+        self.queue = queue
+        self.metrics = Metrics()
+        self.pool = ThreadPoolExecutor(jobs or os.cpu_count() or 1, thread_name_prefix='pnn-render')
+        self.scratch = tempfile.mkdtemp(prefix='pnn-server-', dir=execute.scratch_root())
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def key(self, source, fmt):
+        return hashlib.sha256('\0'.join((self.engine, fmt, source)).encode()).hexdigest()
+
+    def submit(self, source, fmt):
+        """
+        Start or join the job rendering a source
+
+        Raises:
+            QueueFull: if the queue is full
+
+        Returns:
+            future {Future} -- resolves to the content of the output file or raises RenderError
+        """
+        key = self.key(source, fmt)
+        self.metrics.add('requests')
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                self.metrics.add('deduplicated')
+                return flight
+            if self.metrics.counts['queued'] >= self.queue:
+                self.metrics.add('rejected')
+                raise QueueFull()
+            flight = Future()
+            self.flights[key] = flight
+            self.metrics.add('queued')
+        self.pool.submit(self._run, key, source, fmt, flight)
+        return flight
+
+    def _run(self, key, source, fmt, flight):
+        self.metrics.add('queued', -1)
+        self.metrics.add('running')
+        start = time.perf_counter()
+        try:
+            output = self._render(key, source, fmt)
+        except Exception as e:
+            flight.set_exception(e)
+        else:
+            flight.set_result(output)
+        finally:
+            # later requests start a new job
+            with self.lock:
+                del self.flights[key]
+            self.metrics.finish(time.perf_counter() - start, flight.exception() is None)
+
+    def _render(self, key, source, fmt):
+        job = tempfile.mkdtemp(prefix=key[:16] + '-', dir=self.scratch)
+        try:
+            file = os.path.join(job, 'figure.tex')
+            with open(file, 'w') as f:
+                f.write(source)
+            result = engines.compile_tex(file, self.engine, folder=self.folder, cache=self.cache)
+            if not result.ok:
+                raise RenderError('{} failed'.format(self.engine), result.log)
+            output = result.pdf if fmt == 'pdf' else convert(result.pdf, fmt, job)
+            with open(output, 'rb') as f:
+                return f.read()
+        finally:
+            shutil.rmtree(job, ignore_errors=True)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    POST /render?format=pdf|svg|png with a .tex document or a JSON arch spec as body, GET /metrics and GET /health
+    """
+    renderer = None
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = (json.dumps(body, indent=2) + '\n').encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self._send(200, self.renderer.metrics.snapshot())
+        elif path == '/health':
+            self._send(200, {'ok': True})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/render':
+            self._send(404, {'error': 'not found'})
+            return
+        fmt = parse_qs(url.query).get('format', ['pdf'])[0]
+        if fmt not in CONTENT_TYPES:
+            self._send(400, {'error': 'unknown format {}, use one of {}'.format(fmt, ', '.join(CONTENT_TYPES))})
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode(errors='replace')
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                spec = json.loads(body)
+                body = arch_source(spec['arch'] if isinstance(spec, dict) else spec)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {'error': 'invalid arch spec: {}'.format(e)})
+            return
+        try:
+            output = self.renderer.submit(body, fmt).result()
+        except QueueFull:
+            self._send(503, {'error': 'queue is full'})
+            return
+        except RenderError as e:
+            self._send(422, {'error': str(e), 'log': e.log})
+            return
+        self._send(200, output, CONTENT_TYPES[fmt])
+
+
+def serve(renderer, host='127.0.0.1', port=8000):
+    """
+    Serve render requests until interrupted
+
+    Returns:
+        server {ThreadingHTTPServer} -- the server, already closed
+    """
+    handler = type('BoundHandler', (Handler,), {'renderer': renderer})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        renderer.close()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render PlotNeuralNet diagrams over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on (default: 8000)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of parallel engines (default: all cores)')
+    parser.add_argument('--queue', type=int, default=DEFAULT_QUEUE, help='maximum number of waiting jobs')
+    parser.add_argument('--folder', default=DEFAULT_FOLDER, help='folder relative paths are resolved against')
+    parser.add_argument('--engine', choices=PDF_ENGINES, default='pdflatex',
+                        help='TeX engine, auto picks one per request (default: pdflatex)')
+    parser.add_argument('--cache', nargs='?', const='', default=None, metavar='DIR',
+                        help='reuse pdfs from the build cache (default folder: $PLOTNEURALNET_CACHE or ~/.cache)')
+    args = parser.parse_args(argv)
+
+    cache = BuildCache(args.cache or None) if args.cache is not None else None
+    renderer = Renderer(args.folder, args.jobs, args.queue, args.engine, cache)
+    print('serving on http://{}:{}'.format(args.host, args.port))
+    serve(renderer, args.host, args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
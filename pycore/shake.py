@@ -0,0 +1,99 @@
+import re
+
+import pycore.tikz as tikz
+from pycore import execute
+
+# pic styles in layers/, loaded by init.tex
+STYLES = ('Ball', 'Box', 'BandedBox', 'RightBandedBox', 'LeftBandedBox', 'SolidBox')
+STYLE_PATTERN = re.compile(r'\{\s*(\w+)=\{')
+# macros defined by tikz.def_colors, colors and image paths
+COLOR_PATTERN = re.compile(r'^[ \t]*\\def\\(\w+)\{.*\n?', re.MULTILINE)
+COLORS = frozenset(COLOR_PATTERN.findall(tikz.def_colors()))
+LIBRARY_PATTERN = re.compile(r'^([ \t]*)\\usetikzlibrary\{([^}]*)\}(.*\n?)', re.MULTILINE)
+IMPORT_PATTERN = re.compile(r'^[ \t]*\\subimport\{[^}]*\}\{init\}', re.MULTILINE)
+# node shapes of the shapes library
+SHAPES_PATTERN = re.compile(r'\b(?:ellipse|diamond|trapezium|regular polygon|star|cylinder|signal|cloud|circle split|'
+                            r'rectangle split|chamfered rectangle|kite|dart|isosceles triangle|semicircle|'
+                            r'circular sector|tape|magnifying glass)\b')
+# style definitions of tikz.env_begin, they only need a library once they are used
+STANDARD_STYLES = tikz.env_begin()[tikz.env_begin().index('\\begin{document}'):]
+# tikz libraries the standard preamble loads and when the body needs them, others are always kept
+LIBRARIES = {
+    '3d': lambda body: 'canvas is' in body,
+    'decorations': lambda body: 'decorat' in body or 'fuseconnection' in body,
+    'decorations.markings': lambda body: 'decorat' in body or 'fuseconnection' in body,
+    'decorations.shapes': lambda body: 'decorat' in body,
+    'shapes': lambda body: SHAPES_PATTERN.search(body) is not None,
+}
+
+
+def usage(body):
+    """
+    Pic styles, color macros and tikz libraries a picture uses
+
+    Arguments:
+        body {str} -- TeX of the picture, without the preamble
+
+    Returns:
+        used {dict} -- 'styles', 'colors' and 'libraries', sets of names
+    """
+    return {
+        'styles': {style for style in STYLE_PATTERN.findall(body) if style in STYLES},
+        'colors': {name for name in COLORS if re.search(r'\\' + name + r'(?![A-Za-z])', body)},
+        'libraries': {library for library, used in LIBRARIES.items() if used(body)},
+    }
+
+
+def _libraries(match, used):
+    libraries = [library.strip() for library in match.group(2).split(',')]
+    kept = [library for library in libraries if library not in LIBRARIES or library in used['libraries']]
+    if not kept:
+        return ''
+    return '{}\\usetikzlibrary{{{}}}{}'.format(match.group(1), ','.join(kept), match.group(3))
+
+
+def shake_preamble(preamble, used):
+    """
+    Remove what a picture does not need from the standard preamble
+
+    Unused tikz libraries and color macros are dropped and only the used pic styles are loaded by init.tex. Anything
+    not written by tikz.head and tikz.def_colors is kept as it is.
+
+    Arguments:
+        preamble {str} -- TeX up to \\begin{document}
+        used {dict} -- result of usage
+
+    Returns:
+        preamble {str} -- the minimal preamble
+    """
+    preamble = LIBRARY_PATTERN.sub(lambda match: _libraries(match, used), preamble)
+    preamble = COLOR_PATTERN.sub(lambda match: match.group(0) if match.group(1) not in COLORS or
+                                 match.group(1) in used['colors'] else '', preamble)
+    styles = '\\def\\pnnstyles{' + ','.join(style for style in STYLES if style in used['styles']) + '}\n'
+    return IMPORT_PATTERN.sub(lambda match: styles + match.group(0), preamble, count=1)
+
+
+def shake(arch):
+    """
+    Architecture with a preamble that only loads the styles, colors and libraries the picture uses
+
+    Small diagrams then skip parsing unused style files and libraries. The body has to be known before the preamble
+    can be written, so the architecture is generated in memory first.
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+
+    Yields:
+        fragment {str} -- TeX fragments with the minimal preamble
+    """
+    fragments = list(execute.iter_fragments(arch))
+    begin = next((i for i, text in enumerate(fragments) if '\\begin{document}' in text), None)
+    if begin is None:
+        yield from fragments
+        return
+    head = ''.join(fragments[:begin + 1])
+    split = head.index('\\begin{document}')
+    preamble, rest = head[:split], head[split:]
+    used = usage(rest.replace(STANDARD_STYLES, '') + ''.join(fragments[begin + 1:]))
+    yield shake_preamble(preamble, used) + rest
+    yield from fragments[begin + 1:]
@@ -0,0 +1,241 @@
+import bisect
+import json
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+
+from pycore import execute, ir, timing
+
+# '! Undefined control sequence.' starts an error in the log, 'l.42 \foo' tells the line it was found in
+ERROR_PATTERN = re.compile(r'^! (.*)$')
+LINE_PATTERN = re.compile(r'^l\.(\d+) ?(.*)$')
+# the same with -file-line-error: './file.tex:42: Undefined control sequence.'
+FILE_LINE_PATTERN = re.compile(r'^(.*?\.\w+):(\d+): (.*)$')
+# follow-up messages of an error that has already been reported
+SECONDARY = ('Emergency stop.', '==> Fatal error occurred, no output PDF file produced!')
+
+# the lines of the generated .tex file an architecture element was written to
+Entry = namedtuple('Entry', ['first', 'last', 'index', 'label', 'kind', 'site'])
+# an error TeX reported, line is None if the log does not tell
+TexError = namedtuple('TexError', ['message', 'file', 'line', 'context'])
+
+
+class SourceMap:
+    """
+    Line ranges of a generated .tex file mapped to the architecture elements they were written from
+    """
+
+    def __init__(self, entries=()):
+        self.entries = []
+        self._firsts = []
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        self.entries.append(entry)
+        self._firsts.append(entry.first)
+
+    def locate(self, line):
+        """
+        Element a line of the .tex file belongs to
+
+        Arguments:
+            line {int} -- line number, starting at 1
+
+        Returns:
+            entry {Entry} -- the element, None for lines outside of any element
+        """
+        position = bisect.bisect_right(self._firsts, line) - 1
+        if position >= 0 and self.entries[position].first <= line <= self.entries[position].last:
+            return self.entries[position]
+        return None
+
+    def to_dict(self):
+        return {'entries': [entry._asdict() for entry in self.entries]}
+
+    def write_json(self, file):
+        with open(file, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def read_json(cls, file):
+        with open(file) as f:
+            data = json.load(f)
+        return cls(Entry(**dict(entry, site=tuple(entry['site']) if entry['site'] else None))
+                   for entry in data['entries'])
+
+
+@contextmanager
+def sites():
+    """
+    Let the IR nodes created inside remember the file and line of Python that created them
+
+    Finding the caller costs a walk up the stack per node, so it is off unless enabled here or with
+    PLOTNEURALNET_SITES=1 for scripts run by tikzmake.sh:
+
+        with sourcemap.sites():
+            arch = [...]
+        sourcemap.build(arch, 'file.tex')
+    """
+    previous = ir.record_sites
+    ir.record_sites = True
+    try:
+        yield
+    finally:
+        ir.record_sites = previous
+
+
+def record(arch, source_map):
+    """
+    Pass the fragments of an architecture through while recording the lines each element ends up on
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+        source_map {SourceMap} -- receives an Entry per element with TeX in it
+
+    Yields:
+        fragment {str} -- TeX fragments, unchanged
+    """
+    line = 1
+    for index, element in enumerate(execute.flatten(arch)):
+        text = element if isinstance(element, str) else str(element)
+        content = text.strip()
+        if content:
+            first = line + text.count('\n', 0, text.index(content[0]))
+            label, kind = timing.describe(element)
+            site = element.site if isinstance(element, ir.Node) else None
+            source_map.add(Entry(first, first + content.count('\n'), index, label, kind, site))
+        line += text.count('\n')
+        yield text
+
+
+def write(arch, file):
+    """
+    Write an architecture to a .tex file and return its source map
+
+    Arguments:
+        arch {iterable} -- architecture elements
+        file {str} -- path of the .tex file
+
+    Returns:
+        source_map {SourceMap} -- line ranges of all elements
+    """
+    source_map = SourceMap()
+    execute.write_fragments(record(arch, source_map), file)
+    return source_map
+
+
+def parse_log(log):
+    """
+    Errors in a TeX log or in the terminal output of the engine
+
+    Arguments:
+        log {str} -- content of the .log file
+
+    Returns:
+        errors {list} -- TexError per error in the order TeX reported them
+    """
+    errors = []
+    current = None
+    for text in log.splitlines():
+        match = FILE_LINE_PATTERN.match(text)
+        if match:
+            current = None
+            errors.append(TexError(match.group(3).strip(), match.group(1), int(match.group(2)), ''))
+            continue
+        match = ERROR_PATTERN.match(text)
+        if match:
+            message = match.group(1).strip()
+            if message in SECONDARY and errors:
+                current = None
+                continue
+            current = len(errors)
+            errors.append(TexError(message, None, None, ''))
+            continue
+        match = LINE_PATTERN.match(text)
+        if match and current is not None:
+            errors[current] = errors[current]._replace(line=int(match.group(1)), context=match.group(2).strip())
+            current = None
+    return errors
+
+
+class LatexError(RuntimeError):
+    """
+    Raised by build when TeX fails, with the architecture elements the errors were found in
+    """
+
+    def __init__(self, result, errors):
+        self.result = result
+        # (TexError, Entry or None)
+        self.errors = errors
+        super().__init__('\n'.join(format_error(error, entry) for error, entry in errors) or
+                         'TeX failed without an error message, see the log')
+
+
+def locate(errors, source_map, file=None):
+    """
+    Attach the architecture element to each error
+
+    Arguments:
+        errors {list} -- result of parse_log
+        source_map {SourceMap} -- map of the compiled file
+
+    Keyword Arguments:
+        file {str} -- the compiled file, errors reported for other files are not mapped (default: {None})
+
+    Returns:
+        errors {list} -- (TexError, Entry or None)
+    """
+    located = []
+    for error in errors:
+        entry = None
+        # with file-line-error the file is known, otherwise the line is assumed to be in the main file
+        if error.line is not None and (error.file is None or file is None or _same_file(error.file, file)):
+            entry = source_map.locate(error.line)
+        located.append((error, entry))
+    return located
+
+
+def _same_file(reported, file):
+    return reported.replace('\\', '/').rsplit('/', 1)[-1] == file.replace('\\', '/').rsplit('/', 1)[-1]
+
+
+def format_error(error, entry=None):
+    where = 'line {}'.format(error.line) if error.line is not None else 'unknown line'
+    text = '{}: {}'.format(where, error.message)
+    if error.context:
+        text += ' (at {})'.format(error.context)
+    if entry is not None:
+        text += '\n    in element {} {} {!r}'.format(entry.index, entry.kind, entry.label)
+        if entry.site:
+            text += ', created at {}:{}'.format(*entry.site)
+    return text
+
+
+def build(arch, file, output_dir=None, engine='pdflatex', folder=None):
+    """
+    Write and compile an architecture, tracing TeX errors back to the elements that caused them
+
+    The line ranges of all elements are recorded while writing, so a failing run points to the layer, its label and,
+    for IR nodes, the line of Python code that created it, without bisecting the architecture.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+        file {str} -- path of the .tex file
+
+    Keyword Arguments:
+        output_dir {str} -- folder for the pdf, defaults to the folder of the .tex file (default: {None})
+        engine {str} -- TeX engine executable (default: {'pdflatex'})
+        folder {str} -- folder relative paths are resolved against (default: {None})
+
+    Returns:
+        result {CompileResult} -- outcome of the compile
+
+    Raises:
+        LatexError: if the engine fails, with the errors and their elements
+    """
+    source_map = write(arch, file)
+    result = execute.compile_tex(file, output_dir=output_dir, engine=engine, folder=folder, keep_log=True)
+    if not result.ok:
+        raise LatexError(result, locate(parse_log(result.log), source_map, file))
+    return result
@@ -0,0 +1,515 @@
+import re
+import warnings
+from html import escape
+
+import pycore.tikz as tikz
+from pycore import execute, ir, layout
+
+# 1cm in px at 96 dpi
+PX_PER_CM = 96 / 2.54
+PT = 1 / 28.45  # 1pt in cm
+
+NAMED_COLORS = {
+    'red': (1, 0, 0),
+    'green': (0, 1, 0),
+    'blue': (0, 0, 1),
+    'yellow': (1, 1, 0),
+    'magenta': (1, 0, 1),
+    'cyan': (0, 1, 1),
+    'orange': (1, 0.5, 0),
+    'white': (1, 1, 1),
+    'black': (0, 0, 0),
+    'gray': (0.5, 0.5, 0.5),
+    'darkgray': (0.25, 0.25, 0.25),
+    'lightgray': (0.75, 0.75, 0.75),
+}
+
+# color macros of tikz.def_colors and layers/init.tex
+MACROS = dict(re.findall(r'\\def\\(\w+)\{([^}]*)\}', tikz.def_colors()))
+MACROS['edgecolor'] = 'rgb:blue,4;red,1;green,4;black,3'
+COPY_COLOR = 'rgb:blue,4;red,1;green,1;black,3'
+
+# kind -> (fill, band fill, opacity field, default opacity) following the arguments pycore.tikz passes to the pics
+STYLES = {
+    'conv': ('\\ConvColor', None, None, 0.4),
+    'full_con': ('\\UpsampleColor', None, None, 0.4),
+    'conv_relu': ('\\ConvColor', '\\ConvReluColor', None, 0.4),
+    'rtl_conv_relu': ('\\ConvColor', '\\ConvReluColor', None, 0.4),
+    'z_conv_relu': ('\\ConvColor', '\\ConvReluColor', None, 0.4),
+    'upsample': ('\\UpsampleColor', None, None, 0.4),
+    'pool': ('\\PoolColor', None, 'opacity', 0.4),
+    'detect': ('\\DetectColor', None, None, 0.4),
+    'unpool': ('\\UnpoolColor', None, 'opacity', 0.4),
+    'conv_res': ('rgb:white,1;black,3', 'rgb:white,1;black,2', 'opacity', 0.4),
+    'conv_soft_max': ('\\SoftmaxColor', None, None, 0.4),
+    'relu': ('\\ConvReluColor', None, None, 0.4),
+    'soft_max': ('\\SoftmaxColor', None, 'opacity', 0.4),
+    'shortcut': ('\\ShortcutColor', None, None, 0.4),
+    'add': ('\\SumColor', None, 'opacity', 0.4),
+    'multiply': ('\\MultColor', None, 'opacity', 0.6),
+    'concatenate': ('\\ConcColor', None, 'opacity', 0.6),
+}
+LOGOS = {'add': '+', 'multiply': '×', 'concatenate': '⊕'}
+BAND_OPACITY = 0.6
+EDGE_OPACITY = 0.7
+
+# plain TeX fragments that draw something, unless they are a whole document or its preamble
+DRAWING_PATTERN = re.compile(r'\\(pic|draw|node|path|fill|shade|coordinate)\b')
+STRUCTURE_PATTERN = re.compile(r'\\documentclass|\\begin\{document\}|\\(begin|end)\{tikzpicture\}')
+
+
+def parse_color(spec):
+    """
+    Convert an xcolor expression as used by the styles to rgb
+
+    Supports named colors, the macros of tikz.def_colors, `rgb:red,5;white,2` mixtures and `white!30` tints.
+
+    Arguments:
+        spec {str} -- color expression
+
+    Returns:
+        color {tuple} -- (r, g, b) in [0, 1]
+    """
+    spec = spec.strip().strip('{}').strip()
+    if spec.startswith('\\'):
+        return parse_color(MACROS.get(spec[1:], 'black'))
+    if spec.startswith('rgb:'):
+        total, mix = 0.0, [0.0, 0.0, 0.0]
+        for part in spec[4:].split(';'):
+            name, weight = part.split(',')
+            weight = float(weight)
+            color = parse_color(name)
+            total += weight
+            mix = [m + weight * c for m, c in zip(mix, color)]
+        return tuple(m / total for m in mix) if total else (0, 0, 0)
+    if '!' in spec:
+        parts = spec.split('!')
+        color, percent = parse_color(parts[0]), float(parts[1]) / 100
+        other = parse_color(parts[2]) if len(parts) > 2 else (1, 1, 1)
+        return tuple(percent * c + (1 - percent) * o for c, o in zip(color, other))
+    return NAMED_COLORS.get(spec, (0, 0, 0))
+
+
+def hex_color(color):
+    return '#{:02x}{:02x}{:02x}'.format(*(int(round(255 * c)) for c in color))
+
+
+def plain_text(text):
+    # rough conversion of TeX labels to text
+    text = str(text)
+    for tex, char in (('\\times', '×'), ('\\oplus', '⊕'), ('\\Sigma', 'Σ'), ('\\mu', 'μ'),
+                      ('\\ldots', '…')):
+        text = text.replace(tex, char)
+    text = re.sub(r'\\[a-zA-Z]+', '', text)
+    return re.sub(r'[{}$]', '', text).strip()
+
+
+class Canvas:
+    """
+    Collects SVG elements in canvas coordinates (cm, y up) and tracks the bounding box
+    """
+
+    def __init__(self, scale=PX_PER_CM):
+        self.scale = scale
+        self.elements = []
+        self.bounds = [float('inf'), float('inf'), float('-inf'), float('-inf')]
+        self.balls = set()
+
+    def point(self, p):
+        x, y = layout.project(p) if len(p) == 3 else p
+        self.bounds = [min(self.bounds[0], x), min(self.bounds[1], y), max(self.bounds[2], x), max(self.bounds[3], y)]
+        return '{:.2f},{:.2f}'.format(x * self.scale, -y * self.scale)
+
+    def polygon(self, points, fill, opacity=1.0, stroke='black', stroke_opacity=1.0, width=0.4):
+        self.elements.append(
+            '<polygon points="{}" fill="{}" fill-opacity="{:.2f}" stroke="{}" stroke-opacity="{:.2f}" '
+            'stroke-width="{:.2f}" stroke-linejoin="round"/>'.format(
+                ' '.join(self.point(p) for p in points), fill, opacity, stroke, stroke_opacity,
+                width * PT * self.scale))
+
+    def polyline(self, points, stroke='black', opacity=1.0, width=0.4, dashed=False):
+        self.elements.append(
+            '<polyline points="{}" fill="none" stroke="{}" stroke-opacity="{:.2f}" stroke-width="{:.2f}"{}/>'.format(
+                ' '.join(self.point(p) for p in points), stroke, opacity, width * PT * self.scale,
+                ' stroke-dasharray="3,2"' if dashed else ''))
+
+    def circle(self, center, radius, fill, opacity):
+        x, y = layout.project(center)
+        self.point((x - radius, y - radius))
+        self.point((x + radius, y + radius))
+        self.elements.append(
+            '<circle cx="{:.2f}" cy="{:.2f}" r="{:.2f}" fill="url(#ball-{})" fill-opacity="{:.2f}" stroke="black" '
+            'stroke-width="{:.2f}"/>'.format(x * self.scale, -y * self.scale, radius * self.scale, fill[1:], opacity,
+                                             0.4 * PT * self.scale))
+        self.balls.add(fill)
+
+    def text(self, p, text, size=14.4, anchor='middle', baseline='middle'):
+        text = plain_text(text)
+        if not text:
+            return
+        self.elements.append(
+            '<text x="{}" y="{}" font-family="serif" font-size="{:.2f}" text-anchor="{}" '
+            'dominant-baseline="{}">{}</text>'.format(*self.point(p).split(','), size * PT * self.scale, anchor,
+                                                      baseline, escape(text)))
+
+    def arrow(self, p, q, color, size=0.3):
+        # the \midarrow of layers/init.tex, drawn halfway between two points
+        (px, py), (qx, qy) = (layout.project(p) if len(p) == 3 else p), (layout.project(q) if len(q) == 3 else q)
+        dx, dy = qx - px, qy - py
+        length = (dx * dx + dy * dy) ** 0.5
+        if not length:
+            return
+        dx, dy = dx / length, dy / length
+        mx, my = (px + qx) / 2 + dx * size / 2, (py + qy) / 2 + dy * size / 2
+        tip, back = (mx, my), (mx - dx * size, my - dy * size)
+        left = (back[0] - dy * size / 2, back[1] + dx * size / 2)
+        right = (back[0] + dy * size / 2, back[1] - dx * size / 2)
+        self.polygon([tip, left, right], color, stroke=color)
+
+    def to_svg(self, margin=0.3):
+        x0, y0, x1, y1 = self.bounds
+        if x0 > x1:
+            x0 = y0 = x1 = y1 = 0
+        x0, y0, x1, y1 = x0 - margin, y0 - margin, x1 + margin, y1 + margin
+        s = self.scale
+        gradients = ''.join(
+            '<radialGradient id="ball-{}" cx="35%" cy="35%" r="65%"><stop offset="0" stop-color="white"/>'
+            '<stop offset="1" stop-color="{}"/></radialGradient>'.format(color[1:], color)
+            for color in sorted(self.balls))
+        return ('<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                'width="{:.0f}" height="{:.0f}" viewBox="{:.2f} {:.2f} {:.2f} {:.2f}">\n<defs>{}</defs>\n{}\n</svg>\n'
+                .format((x1 - x0) * s, (y1 - y0) * s, x0 * s, -y1 * s, (x1 - x0) * s, (y1 - y0) * s, gradients,
+                        '\n'.join(self.elements)))
+
+
+def _segments(shape):
+    # x extents of the concatenated boxes of a box pic
+    node = shape.node
+    widths = None
+    if node is not None and node.kind not in ('upsample', 'z_conv_relu', 'full_con'):
+        widths = layout.numbers(node.width)
+    if not widths:
+        return [(0, shape.size[0])]
+    total, result = sum(widths), []
+    start = 0.0
+    for width in widths:
+        length = shape.size[0] * width / total if total else 0
+        result.append((start, start + length))
+        start += length
+    return result
+
+
+def _labels(shape, kind):
+    node = shape.node
+    if node is None or kind == 'upsample':
+        return [], '', ''
+    xlabels = []
+    if hasattr(node, 'n_filter') and getattr(node, 'label', True):
+        n_filter = node.n_filter
+        if isinstance(node.width, list):
+            xlabels = [str(n) for n in n_filter]
+        elif isinstance(n_filter, (list, tuple)):
+            # pgfmath reads a tuple given for a single box as a nested array and prints its first element
+            xlabels = [str(n_filter[0])] if n_filter else []
+        else:
+            xlabels = [str(n_filter)]
+    zlabel = getattr(node, 'z_label', '')
+    caption = getattr(node, 'caption', '')
+    return xlabels, zlabel, caption
+
+
+def draw_box(canvas, shape, kind, labels=True):
+    fill, band, opacity_field, opacity = STYLES.get(kind, STYLES['conv'])
+    if opacity_field and shape.node is not None:
+        opacity = float(layout.number(getattr(shape.node, opacity_field)) or opacity)
+    fill, band = hex_color(parse_color(fill)), band and hex_color(parse_color(band))
+    x, y, z = shape.origin
+    _, ly, lz = shape.size
+    style = shape.style
+
+    def at(px, py, pz):
+        return x + px, y + py, z + pz
+
+    segments = _segments(shape)
+    for start, end in segments:
+        length = end - start
+        a, b = at(start, ly / 2, lz / 2), at(start, -ly / 2, lz / 2)
+        c, d = at(end, -ly / 2, lz / 2), at(end, ly / 2, lz / 2)
+        e, f = at(end, ly / 2, -lz / 2), at(end, -ly / 2, -lz / 2)
+        g, h = at(start, -ly / 2, -lz / 2), at(start, ly / 2, -lz / 2)
+        canvas.polygon([d, a, b, c], fill, opacity)
+        canvas.polygon([d, a, h, e], fill, opacity)
+        for p, q in ((f, g), (b, g), (h, g)):
+            canvas.polyline([p, q], opacity=EDGE_OPACITY, dashed=True)
+        if band and style == 'RightBandedBox':
+            art, brt, hrt = at(end - length / 4, ly / 2, lz / 2), at(end - length / 4, -ly / 2, lz / 2), at(
+                end - length / 4, ly / 2, -lz / 2)
+            canvas.polygon([d, art, brt, c], band, BAND_OPACITY, band)
+            canvas.polygon([d, art, hrt, e], band, BAND_OPACITY, band)
+        elif band and style == 'LeftBandedBox':
+            art, brt, hrt = at(end - length / 1.25, ly / 2, lz / 2), at(end - length / 1.25, -ly / 2, lz / 2), at(
+                end - length / 1.25, ly / 2, -lz / 2)
+            canvas.polygon([a, art, brt, b], band, BAND_OPACITY, band)
+            canvas.polygon([a, art, hrt, h], band, BAND_OPACITY, band)
+        elif band and style == 'BandedBox':
+            art, drt, crt = at(start, ly / 2, lz / 4), at(end, ly / 2, lz / 4), at(end, -ly / 2, lz / 4)
+            canvas.polygon([d, drt, crt, c], band, BAND_OPACITY, band)
+            canvas.polygon([a, art, drt, d], band, BAND_OPACITY, band)
+        if band:
+            canvas.polygon([d, a, b, c], fill, 0)
+            canvas.polygon([d, a, h, e], fill, 0)
+    canvas.polygon([d, e, f, c], fill, opacity)
+    if band and style == 'RightBandedBox':
+        canvas.polygon([d, e, f, c], band, BAND_OPACITY, band)
+    elif band and style == 'LeftBandedBox':
+        canvas.polygon([a, b, g, h], band, BAND_OPACITY, band)
+    elif band and style == 'BandedBox':
+        canvas.polygon([a, b, c, d], band, BAND_OPACITY, band)
+    if not labels:
+        return
+    xlabels, zlabel, caption = _labels(shape, kind)
+    for (start, end), label in zip(segments, xlabels):
+        canvas.text(at((start + end) / 2, -ly / 2, lz / 2), label, baseline='hanging')
+    if zlabel:
+        canvas.text(at(end, -ly / 2, lz / 2), zlabel, anchor='start', baseline='hanging')
+    if caption.strip():
+        bottom = layout.project(at(shape.size[0] / 2, -ly / 2, lz / 2))
+        canvas.text((bottom[0], bottom[1] - 15 * PT), caption, baseline='hanging')
+
+
+def draw_ball(canvas, shape, kind, labels=True):
+    fill, _, opacity_field, opacity = STYLES[kind]
+    if shape.node is not None:
+        opacity = float(layout.number(getattr(shape.node, opacity_field)) or opacity)
+    r = shape.size[0]
+    canvas.circle(shape.origin, r, hex_color(parse_color(fill)), opacity)
+    logo = plain_text(shape.node.logo) if hasattr(shape.node, 'logo') else LOGOS.get(kind, '')
+    canvas.text(shape.origin, logo, size=4 * r / PT * 0.5)
+    caption = getattr(shape.node, 'caption', '')
+    if labels and caption:
+        x, y = layout.project(shape.origin)
+        canvas.text((x, y - r - 20 * PT), caption, baseline='hanging')
+
+
+def _point(result, position):
+    return result.resolve(position)
+
+
+def _canvas(p):
+    return layout.project(p) if len(p) == 3 else p
+
+
+def _lerp(p, q, t):
+    return tuple(a + (b - a) * t for a, b in zip(p, q))
+
+
+def draw_connection(canvas, node, result):
+    """
+    Draw a connection node, positions that can not be resolved are skipped
+
+    Returns:
+        drawn {bool} -- whether the connection was drawn
+    """
+    kind = node.kind
+    edge = hex_color(parse_color(MACROS['edgecolor']))
+    thick = 1.6
+    if kind == 'short_connection':
+        p, q = _point(result, node.of + node.anchor_of), _point(result, node.to + node.anchor_to)
+        if p is None or q is None:
+            return False
+        canvas.polyline([p, q], edge, EDGE_OPACITY, thick)
+        canvas.arrow(p, q, edge)
+        if node.name:
+            result.points[node.name.strip('()')] = _lerp(p, q, 0.5)
+        return True
+    if kind == 'double_connection':
+        p, m, q = (_point(result, node.of + node.anchor_of), _point(result, node.over),
+                   _point(result, node.to + node.anchor_to))
+        if None in (p, m, q):
+            return False
+        canvas.polyline([p, m, q], edge, EDGE_OPACITY, thick)
+        canvas.arrow(m, q, edge)
+        return True
+    if kind == 'z_connection':
+        shift = (0, 0, node.z_shift) if node.z_shift else layout.vector(node.shift)
+        p, q = _point(result, node.of + node.anchor_of), _point(result, node.to + node.anchor_to)
+        if p is None or q is None or shift is None:
+            return False
+        m = tuple(a + b for a, b in zip(p, shift))
+        canvas.polyline([p, m, q], edge, EDGE_OPACITY, thick)
+        canvas.arrow(m, q, edge)
+        return True
+    if kind in ('long_connection', 'long_connection_reversed'):
+        south, north = _point(result, node.of + node.anchor_of_1), _point(result, node.of + node.anchor_of_2)
+        target = _point(result, node.to + node.anchor_to)
+        if None in (south, north, target):
+            return False
+        dummy = _canvas(_lerp(south, north, node.pos))
+        north, target = _canvas(north), _canvas(target)
+        if kind == 'long_connection':
+            points = [north, (north[0], dummy[1]), (target[0], dummy[1]), target]
+        else:
+            start = _canvas(south)
+            points = [target, (target[0], dummy[1]), (start[0], dummy[1]), north]
+        canvas.polyline(points, edge, EDGE_OPACITY, thick)
+        canvas.arrow(points[1], points[2], edge)
+        return True
+    if kind == 'skip':
+        points = [_point(result, node.of + a) for a in ('-southeast', '-northeast')]
+        points += [_point(result, node.to + a) for a in ('-south', '-north')]
+        if None in points:
+            return False
+        of_top, to_top = _lerp(points[0], points[1], node.pos), _lerp(points[2], points[3], node.pos)
+        color = hex_color(parse_color(COPY_COLOR))
+        path = [points[1], of_top, to_top, points[3]]
+        canvas.polyline(path, color, EDGE_OPACITY, thick)
+        for p, q in zip(path, path[1:]):
+            canvas.arrow(p, q, color)
+        return True
+    if kind == 'fuseconnection':
+        p, q = _point(result, node.of + node.anchor_of), _point(result, node.to + node.anchor_to)
+        if p is None or q is None:
+            return False
+        y_shift = -1 if 'north' in node.anchor_to else node.y_shift
+        start = _canvas(p)
+        start = (start[0] + node.x_shift, start[1])
+        q = _canvas(q)
+        canvas.polyline([start, (q[0], start[1]), (q[0], start[1] + y_shift), q], '#ff8000', EDGE_OPACITY, thick)
+        return True
+    if kind == 'ellipsis':
+        p, q = _point(result, node.of + '-east'), _point(result, node.to + '-west')
+        if p is None or q is None:
+            return False
+        canvas.polyline([p, q], edge, EDGE_OPACITY, thick)
+        canvas.text(_lerp(_canvas(p), _canvas(q), 0.5), '…')
+        return True
+    if kind in ('resample', 'full_connection'):
+        pairs = {
+            'resample': [('nearnortheast', 'nearnorthwest'), ('nearsoutheast', 'nearsouthwest'),
+                         ('farsoutheast', 'farsouthwest'), ('farnortheast', 'farnorthwest')],
+            'full_connection': [('nearnortheast', 'farnorthwest'), ('nearnortheast', 'nearnorthwest'),
+                                ('farnortheast', 'nearnorthwest'), ('farnortheast', 'farnorthwest'),
+                                ('farnortheast', 'nearsouthwest'), ('nearsoutheast', 'farsouthwest'),
+                                ('nearsoutheast', 'nearsouthwest'), ('nearsoutheast', 'farnorthwest'),
+                                ('farsoutheast', 'nearsouthwest'), ('farsoutheast', 'farsouthwest')],
+        }[kind]
+        for a, b in pairs:
+            p, q = _point(result, node.of + '-' + a), _point(result, node.to + '-' + b)
+            if p is not None and q is not None:
+                canvas.polyline([p, q], dashed=True)
+        return True
+    return False
+
+
+def draw_upsample(canvas, node, result, labels=True):
+    first, second = result.shapes.get(node.name + '_0'), result.shapes.get(node.name)
+    draw_box(canvas, first, 'upsample', labels)
+    draw_box(canvas, second, 'upsample', labels)
+    pairs = [('nearnortheast', 'nearnorthwest'), ('nearsoutheast', 'nearsouthwest'),
+             ('farsoutheast', 'farsouthwest'), ('farnortheast', 'farnorthwest')]
+    corners = first.anchors()
+    target = second.anchors()
+    for a, b in pairs:
+        canvas.polyline([corners[a], target[b]], dashed=True)
+    canvas.polyline([corners[a] for a, _ in pairs] + [corners[pairs[0][0]]], dashed=True)
+
+
+def draw_image(canvas, node, result):
+    file = str(node.file)
+    at = _point(result, node.to)
+    if at is None or file.startswith('\\'):
+        return
+    # canvas is zy plane: the image width runs along z, its height along y
+    width, height = float(node.size[0]), float(node.size[1])
+    x, y = layout.project((at[0] + float(node.x_shift), at[1], at[2]))
+    zx, zy = layout.Z_VECTOR
+    s = canvas.scale
+    canvas.point((x - zx * width / 2, y - zy * width / 2 - height / 2))
+    canvas.point((x + zx * width / 2, y + zy * width / 2 + height / 2))
+    left, top = x - zx * width / 2, y - zy * width / 2 + height / 2
+    canvas.elements.append(
+        '<image xlink:href="{}" width="{:.2f}" height="{:.2f}" preserveAspectRatio="none" '
+        'transform="matrix({:.4f} {:.4f} 0 1 {:.2f} {:.2f})"/>'.format(
+            escape(file), s, height * s, zx * width, -zy * width, left * s, -top * s))
+
+
+def undrawable(element):
+    """
+    Whether an architecture element is a TeX string that draws something, which can not be interpreted without TeX
+
+    Strings holding document structure, such as tikz.start or tikz.env_end, are not counted.
+    """
+    return isinstance(element, str) and bool(DRAWING_PATTERN.search(element)) and not STRUCTURE_PATTERN.search(element)
+
+
+def warn_undrawable(count):
+    if count:
+        warnings.warn('{} TeX string(s) in the architecture can not be drawn without TeX and were left out, build them '
+                      'from pycore.ir nodes or the functions in pycore.blocks instead'.format(count), stacklevel=3)
+
+
+def draw(arch, labels=True, scale=PX_PER_CM):
+    """
+    Render an architecture to a canvas
+
+    IR nodes are drawn with the geometry of layers/*.sty. String fragments can not be interpreted, they are left out
+    with a warning if they draw something, see undrawable.
+
+    Arguments:
+        arch {iterable} -- architecture elements
+
+    Keyword Arguments:
+        labels {bool} -- draw filter counts, z labels and captions (default: {True})
+        scale {float} -- px per cm (default: {96 dpi})
+
+    Returns:
+        canvas {Canvas} -- canvas with all elements
+    """
+    canvas = Canvas(scale)
+    result = layout.Layout()
+    skipped = 0
+    for element in execute.flatten(arch):
+        if not isinstance(element, ir.Node):
+            skipped += undrawable(element)
+            continue
+        kind = element.kind
+        if kind == 'image':
+            draw_image(canvas, element, result)
+            continue
+        if kind == 'text':
+            at, shift = _point(result, element.of), layout.vector(element.shift)
+            if at is not None and shift is not None:
+                canvas.text(layout._add(at, shift), element.text)
+            continue
+        if layout.place(element, result) is None:
+            draw_connection(canvas, element, result)
+        elif kind == 'upsample':
+            draw_upsample(canvas, element, result, labels)
+        elif kind in LOGOS:
+            draw_ball(canvas, result.shapes[element.name], kind, labels)
+        elif kind in STYLES:
+            draw_box(canvas, result.shapes[element.name], kind, labels)
+    warn_undrawable(skipped)
+    return canvas
+
+
+def to_svg(arch, labels=True, scale=PX_PER_CM):
+    """
+    Render an architecture to an SVG document without LaTeX
+
+    Arguments:
+        arch {iterable} -- architecture elements, see draw
+
+    Keyword Arguments:
+        labels {bool} -- draw filter counts, z labels and captions (default: {True})
+        scale {float} -- px per cm (default: {96 dpi})
+
+    Returns:
+        svg {str} -- SVG document
+    """
+    return draw(arch, labels, scale).to_svg()
+
+
+def write_svg(arch, file, labels=True, scale=PX_PER_CM):
+    with open(file, 'w') as f:
+        f.write(to_svg(arch, labels, scale))
@@ -8,9 +8,11 @@ def list_to_string(list):
     return s
 
 
-def start(path='../'):
+def start(path='../', precompiled=False):
     header = head(path)
     header += def_colors()
+    if precompiled:
+        header += end_of_dump()
     header += env_begin()
     return header
 
@@ -52,6 +54,13 @@ def def_colors():
 '''
 
 
+# everything before this marker can be loaded from a precompiled format, see execute.compile_tex
+def end_of_dump():
+    return r'''
+\csname endofdump\endcsname
+'''
+
+
 def env_begin():
     return r'''
 \newcommand{\copymidarrow}{\tikz \draw[-Stealth,line width=0.8mm,draw={rgb:blue,4;red,1;green,1;black,3}] (-0.3,0) -- ++ (0.3,0);}
@@ -217,7 +226,8 @@ def z_conv_relu(name, z_label='', n_filter='', offset=(0, 0, 0), to='0,0,0', wid
         if (len(n_filter) != len(width)):
             raise Exception("Size of n_filters does not match size of width")
         xlabel_string = list_to_string(n_filter)
-        width_string = list_to_string(width)
+        # depth is a single pgfmath length, a comma separated list would be split into separate keys
+        width_string = str(sum(width))
     else:
         xlabel_string = str(n_filter)
         width_string = str(log(n_filter, 4))
@@ -522,25 +532,25 @@ def skip(of, to, pos=1.25):
 
 
 # Add ball
-def add(name, to, offset=(1, 0, 0), opacity=0.4, caption=''):
+def add(name, to, offset=(1, 0, 0), opacity=0.4, caption='', anchor_to='-east', radius=2.5, logo='$+$'):
     return r'''
-        \pic[shift={''' + str(offset) + '''}] at (''' + to + '''-east)
+        \pic[shift={''' + str(offset) + '''}] at (''' + to + anchor_to + ''')
             {Ball={
                 name=''' + name + ''',
                 caption=''' + caption + ''',
                 fill=\\SumColor,
                 opacity=''' + str(opacity) + ''',
-                radius=2.5,
-                logo=$+$
+                radius=''' + str(radius) + ''',
+                logo=''' + logo + '''
                 }
             };
     '''
 
 
 # Multiply ball
-def multiply(name, to, offset=(1, 0, 0), opacity=0.6, caption='', ):
+def multiply(name, to, offset=(1, 0, 0), opacity=0.6, caption='', anchor_to='-east'):
     return r'''
-        \pic[shift={''' + str(offset) + '''}] at (''' + to + '''-east)
+        \pic[shift={''' + str(offset) + '''}] at (''' + to + anchor_to + ''')
             {Ball={
                 name=''' + name + ''',
                 caption=''' + caption + ''',
@@ -764,3 +774,102 @@ def legend():
         };
         \node [shift={(0,-1.3,0)}] at (legend_7-anchor) {\LARGE{Summation}};     
     '''
+
+
+# Functions of the original PlotNeuralNet API as used by the scripts in pyexamples, they build pycore.ir nodes so the
+# architectures can also be laid out and drawn without TeX, see pycore.svg and pycore.raster
+def _position(to):
+    # the original API wraps positions in (), the primitives above add them themselves
+    to = str(to).strip()
+    return to[1:-1] if to.startswith('(') and to.endswith(')') else to
+
+
+def to_head(projectpath):
+    from pycore import ir
+    return ir.Head(projectpath)
+
+
+def to_cor():
+    from pycore import ir
+    return ir.Colors()
+
+
+def to_begin():
+    from pycore import ir
+    return ir.Begin()
+
+
+def to_end():
+    from pycore import ir
+    return ir.End()
+
+
+def to_input(pathfile, to='(-3,0,0)', width=8, height=8, name='temp'):
+    from pycore import ir
+    return ir.Image(name, pathfile, to=_position(to), size=[width, height], x_shift=0)
+
+
+def to_Conv(name, s_filer=256, n_filer=64, offset='(0,0,0)', to='(0,0,0)', width=1, height=40, depth=40, caption=' '):
+    from pycore import ir
+    return ir.Conv(name, z_label=s_filer, n_filter=n_filer, offset=offset, to=_position(to), width=width,
+                   size=(height, depth), caption=caption)
+
+
+def to_ConvConvRelu(name, s_filer=256, n_filer=(64, 64), offset='(0,0,0)', to='(0,0,0)', width=(2, 2), height=40,
+                    depth=40, caption=' '):
+    from pycore import ir
+    return ir.ConvRelu(name, z_label=s_filer, n_filter=list(n_filer), offset=offset, to=_position(to),
+                       width=list(width), size=(height, depth), caption=caption)
+
+
+def to_Pool(name, offset='(0,0,0)', to='(0,0,0)', width=1, height=32, depth=32, opacity=0.5, caption=' '):
+    from pycore import ir
+    return ir.Pool(name, offset=offset, to=_position(to), width=width, size=(height, depth), opacity=opacity,
+                   caption=caption, anchor='')
+
+
+def to_UnPool(name, offset='(0,0,0)', to='(0,0,0)', width=1, height=32, depth=32, opacity=0.5, caption=' '):
+    from pycore import ir
+    return ir.Unpool(name, offset=offset, to='(' + _position(to) + ')', width=width, height=height, depth=depth,
+                     opacity=opacity, caption=caption)
+
+
+def to_ConvRes(name, s_filer=256, n_filer=64, offset='(0,0,0)', to='(0,0,0)', width=6, height=40, depth=40,
+               opacity=0.2, caption=' '):
+    from pycore import ir
+    return ir.ConvRes(name, z_label=s_filer, n_filter=n_filer, offset=offset, to='(' + _position(to) + ')',
+                      width=width, height=height, depth=depth, opacity=opacity, caption=caption)
+
+
+def to_ConvSoftMax(name, s_filer=40, offset='(0,0,0)', to='(0,0,0)', width=1, height=40, depth=40, caption=' '):
+    from pycore import ir
+    return ir.ConvSoftMax(name, z_label=s_filer, offset=offset, to='(' + _position(to) + ')', width=width,
+                          height=height, depth=depth, caption=caption)
+
+
+def to_SoftMax(name, s_filer=10, offset='(0,0,0)', to='(0,0,0)', width=1.5, height=3, depth=25, opacity=0.8,
+               caption=' '):
+    from pycore import ir
+    return ir.SoftMax(name, z_label=s_filer, offset=offset, to=_position(to), width=width, size=(height, depth),
+                      opacity=opacity, caption=caption, anchor_to='')
+
+
+def to_Sum(name, offset='(0,0,0)', to='(0,0,0)', radius=2.5, opacity=0.6, logo='$+$'):
+    from pycore import ir
+    return ir.Add(name, to=_position(to), offset=offset, opacity=opacity, anchor_to='', radius=radius,
+                  logo=logo if '$' in logo else '$' + logo + '$')
+
+
+def to_connection(of, to):
+    from pycore import ir
+    return ir.ShortConnection(of, to)
+
+
+def to_skip(of, to, pos=1.25):
+    from pycore import ir
+    return ir.Skip(of, to, pos=pos)
+
+
+def to_generate(arch, pathname='file.tex'):
+    from pycore import execute
+    execute.write_tex(arch, pathname)
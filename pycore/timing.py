@@ -0,0 +1,184 @@
+import re
+
+from pycore import execute, ir
+
+# probes write '<prefix><index>:<elapsed>' to the log, short enough never to be wrapped by TeX
+PREFIX = 'pnn-timing:'
+PROBE_PATTERN = re.compile(re.escape(PREFIX) + r'(\w+):(-?\d+)')
+# \pdfelapsedtime counts in 1/65536 s
+TICKS_PER_SECOND = 65536
+
+NAME_PATTERN = re.compile(r'name=([^,\s}]+)')
+STYLE_PATTERN = re.compile(r'\{\s*(\w+)=\{\s*name=')
+COORDINATE_PATTERN = re.compile(r'\(([A-Za-z_][\w.]*?)(?:-\w+)?\)')
+COMMAND_PATTERN = re.compile(r'\\(draw|path|node|coordinate|pic)\b')
+
+
+def timer_macros():
+    # \pnntimerreset / \pnntimer for pdfTeX, LuaTeX via os.clock, and a no-op elsewhere
+    return r'''
+\ifdefined\pdfelapsedtime
+    \gdef\pnntimerreset{\pdfresettimer}
+    \gdef\pnntimer{\the\pdfelapsedtime}
+\else\ifdefined\directlua
+    \gdef\pnntimerreset{\directlua{pnntimer = os.clock()}}
+    \gdef\pnntimer{\directlua{tex.sprint(math.floor((os.clock() - pnntimer) * 65536))}}
+\else
+    \gdef\pnntimerreset{}
+    \gdef\pnntimer{-1}
+\fi\fi
+'''
+
+
+def probe(index):
+    return '\\typeout{' + PREFIX + str(index) + ':\\pnntimer}\\pnntimerreset\n'
+
+
+def describe(element):
+    """
+    Label and kind of an architecture element for the timing report
+
+    Arguments:
+        element {str|Node} -- architecture element
+
+    Returns:
+        label {str} -- layer name, 'of -> to' for connections or the first line of other TeX
+        kind {str} -- tikz function, pic style or TeX command
+    """
+    if isinstance(element, ir.Node):
+        fields = element.fields()
+        if fields.get('name'):
+            return str(fields['name']).strip('()'), element.kind
+        if 'of' in fields and 'to' in fields:
+            return '{} -> {}'.format(fields['of'], fields['to']), element.kind
+        return element.kind, element.kind
+    text = str(element)
+    style = STYLE_PATTERN.search(text)
+    name = NAME_PATTERN.search(text)
+    if style and name:
+        return name.group(1), style.group(1)
+    command = COMMAND_PATTERN.search(text)
+    coordinates = COORDINATE_PATTERN.findall(text)
+    if command and len(coordinates) > 1:
+        return '{} -> {}'.format(coordinates[0], coordinates[-1]), command.group(1)
+    if command and coordinates:
+        return coordinates[0], command.group(1)
+    line = next((line.strip() for line in text.splitlines() if line.strip()), '')
+    return line[:60], command.group(1) if command else 'tex'
+
+
+def instrument(arch, labels):
+    """
+    Wrap every element drawn inside the tikzpicture with elapsed-time probes
+
+    The timer is reset before each element and its value is written to the log with \\typeout after it, so the log
+    tells how long TeX spent on every pic, connection and image. The document itself is unchanged otherwise.
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+        labels {list} -- receives (label, kind) per probe index, see describe
+
+    Yields:
+        fragment {str} -- TeX fragments with probes
+    """
+    inside = False
+    for element in execute.flatten(arch):
+        text = element if isinstance(element, str) else str(element)
+        if not inside:
+            yield text
+            if '\\begin{tikzpicture}' in text:
+                inside = True
+                yield timer_macros() + '\\pnntimerreset\n'
+            continue
+        if '\\end{tikzpicture}' in text:
+            # everything from the closing of the picture to the end of the run: bounding box, shipout, pdf writing
+            labels.append(('shipout', 'document'))
+            yield '\\AtEndDocument{' + probe(len(labels) - 1).strip() + '}\n'
+            yield text
+            inside = False
+            continue
+        labels.append(describe(element))
+        yield text
+        yield probe(len(labels) - 1)
+
+
+def parse_log(log, labels):
+    """
+    Read the probes back from a TeX log
+
+    Arguments:
+        log {str} -- content of the .log file
+        labels {list} -- labels filled by instrument
+
+    Returns:
+        timings {list} -- dicts with index, label, kind and seconds, in document order
+    """
+    timings = []
+    for index, ticks in PROBE_PATTERN.findall(log):
+        index, ticks = int(index), int(ticks)
+        if index >= len(labels):
+            continue
+        label, kind = labels[index]
+        timings.append({
+            'index': index,
+            'label': label,
+            'kind': kind,
+            'seconds': ticks / TICKS_PER_SECOND if ticks >= 0 else None,
+        })
+    return timings
+
+
+def rank(timings):
+    """
+    Total time per label, costliest first
+
+    Arguments:
+        timings {list} -- result of parse_log
+
+    Returns:
+        ranking {list} -- dicts with label, kind, calls and seconds
+    """
+    totals = {}
+    for timing in timings:
+        total = totals.setdefault(timing['label'], {'label': timing['label'], 'kind': timing['kind'], 'calls': 0,
+                                                    'seconds': 0.0})
+        total['calls'] += 1
+        total['seconds'] += timing['seconds'] or 0.0
+    return sorted(totals.values(), key=lambda total: -total['seconds'])
+
+
+def report(timings, top=20):
+    ranking = rank(timings)
+    total = sum(r['seconds'] for r in ranking) or 1.0
+    lines = ['{:>9} {:>6}  {:<16} {}'.format('time [s]', 'share', 'kind', 'element')]
+    for r in ranking[:top]:
+        lines.append('{:>9.4f} {:>5.1f}%  {:<16} {}'.format(r['seconds'], 100 * r['seconds'] / total, r['kind'],
+                                                            r['label']))
+    if len(ranking) > top:
+        rest = sum(r['seconds'] for r in ranking[top:])
+        lines.append('{:>9.4f} {:>5.1f}%  {:<16} {} more elements'.format(rest, 100 * rest / total, '',
+                                                                          len(ranking) - top))
+    return '\n'.join(lines)
+
+
+def compile_timed(arch, file, output_dir=None, engine='pdflatex', folder=None):
+    """
+    Write an architecture with probes, compile it and read the timings from the log
+
+    Arguments:
+        arch {iterable} -- architecture elements
+        file {str} -- path of the instrumented .tex file
+
+    Keyword Arguments:
+        output_dir {str} -- folder for the pdf, defaults to the folder of the .tex file (default: {None})
+        engine {str} -- TeX engine executable, pdflatex and lualatex report timings (default: {'pdflatex'})
+        folder {str} -- folder relative paths are resolved against (default: {None})
+
+    Returns:
+        result {CompileResult} -- outcome of the compile, the log is the engine's .log
+        timings {list} -- per element timings, see parse_log, also for a failed run up to the failing element
+    """
+    labels = []
+    execute.write_fragments(instrument(arch, labels), file)
+    result = execute.compile_tex(file, output_dir=output_dir, engine=engine, folder=folder, keep_log=True)
+    return result, parse_log(result.log, labels)
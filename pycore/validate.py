@@ -0,0 +1,298 @@
+import argparse
+import difflib
+import re
+import sys
+from collections import namedtuple
+
+from pycore import execute, layout, timing
+
+# anchors every pic style defines as '<name>-<anchor>'
+PIC_ANCHORS = {style: frozenset(anchors) for style, anchors in layout.STYLE_ANCHORS.items()}
+PIC_ANCHORS['Ball'] = frozenset(layout.BALL_ANCHORS)
+# helper coordinates the styles leave behind without a prefix, e.g. (a) .. (h) of the box corners
+PIC_LOCALS = {
+    'Box': ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'a1', 'b1', 'cap'),
+    'RightBandedBox': ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'a1', 'b1', 'cap', 'art', 'brt', 'hrt'),
+    'LeftBandedBox': ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'a1', 'b1', 'cap', 'art', 'brt', 'hrt'),
+    'BandedBox': ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'a1', 'b1', 'cap', 'art', 'crt', 'drt'),
+    'SolidBox': ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'a1', 'b1'),
+    'Ball': ('caption-node',),
+}
+
+BRACES_PATTERN = re.compile(r'\{[^{}]*\}')
+MASK = '\0'
+STRUCTURE_PATTERN = re.compile(r'[{};]')
+PIC_PATTERN = re.compile(r'\{\s*(\w+)=\{\s*name=([^,\s}]+)')
+COORDINATE_PATTERN = re.compile(r'\bcoordinate\s*(?:\[[^\]]*\])?\s*\(([^()]*)\)')
+NODE_PATTERN = re.compile(r'\bnode\s*(?:\[[^\]]*\])?\s*\(([^()]*)\)')
+NODE_AT_PATTERN = re.compile(r'\\node\s*(?:\[[^\]]*\])?\s*at\s*\([^()]*\)\s*\(([^()]*)\)')
+REFERENCE_PATTERN = re.compile(r'\(([^()]*)\)')
+PERPENDICULAR_PATTERN = re.compile(r'\|-|-\|')
+
+# a problem found in an architecture, index and label identify the element, line is set for .tex sources
+Problem = namedtuple('Problem', ['index', 'label', 'message', 'line'], defaults=(None,))
+
+
+class ValidationError(ValueError):
+    """
+    Raised by check with every problem found, not just the first one
+    """
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__('\n'.join(format_problem(p) for p in problems))
+
+
+def format_problem(problem, file=None):
+    where = '{}:{}'.format(file, problem.line) if file else (
+        'line {}'.format(problem.line) if problem.line else 'element {}'.format(problem.index))
+    return '{}: {} ({})'.format(where, problem.message, problem.label)
+
+
+def _mask_braces(text):
+    # blank out option values, pic bodies and node contents, which may contain parentheses that are not positions;
+    # the masked text keeps its length, so positions in it are positions in the original
+    while True:
+        masked = BRACES_PATTERN.sub(lambda match: MASK * len(match.group(0)), text)
+        if masked == text:
+            return text
+        text = masked
+
+
+def _split(text):
+    # statements of an element, split at top level semicolons
+    depth, begin = 0, 0
+    for match in STRUCTURE_PATTERN.finditer(text):
+        char = match.group(0)
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif depth <= 0:
+            yield text[begin:match.end()]
+            begin = match.end()
+    if text[begin:].strip():
+        yield text[begin:]
+
+
+def _statement(text):
+    """
+    Names a statement defines and positions it refers to, in the order TikZ sees them
+
+    Returns:
+        events {list} -- (name, kind, style) for definitions, (name, None, None) for references
+    """
+    masked = _mask_braces(text)
+    found = []
+    for pattern, kind in ((COORDINATE_PATTERN, 'coordinate'), (NODE_PATTERN, 'node'), (NODE_AT_PATTERN, 'node')):
+        for match in pattern.finditer(masked):
+            if match.group(1).strip():
+                found.append((match.start(1), 1, match.group(1).strip(), kind, None))
+    # a pic is placed relative to earlier names and defines its anchors once it is drawn
+    for match in PIC_PATTERN.finditer(text):
+        found.append((len(text), 1, match.group(2).strip(), 'pic', match.group(1)))
+    defined_at = {position for position, _, _, _, _ in found}
+    for match in REFERENCE_PATTERN.finditer(masked):
+        if match.start(1) in defined_at:
+            continue
+        for part in PERPENDICULAR_PATTERN.split(match.group(1)):
+            part = part.strip()
+            # numbers, 3d coordinates and polar coordinates
+            if not part or ',' in part or ':' in part or layout.number(part) is not None:
+                continue
+            found.append((match.start(1), 0, part, None, None))
+    return [event[2:] for event in sorted(found)]
+
+
+class Index:
+    """
+    Names, kinds and anchors of everything an architecture defines
+    """
+
+    def __init__(self):
+        self.names = {}
+        # helper coordinates of the pic styles, valid references but never suggested for a typo
+        self.locals = set()
+
+    def define(self, name, kind, style, index):
+        self.names[name] = (kind, style, index)
+        self.locals.discard(name)
+        if kind == 'pic':
+            for local in PIC_LOCALS.get(style, ()):
+                if local not in self.names:
+                    self.names[local] = ('coordinate', None, index)
+                    self.locals.add(local)
+
+    def check(self, reference, later):
+        """
+        Check a single position
+
+        Arguments:
+            reference {str} -- position inside parentheses, e.g. 'conv1-east' or 'image_0.south east'
+            later {dict} -- names defined further down, to tell a misplaced element from a typo
+
+        Returns:
+            message {str} -- description of the problem or None
+        """
+        if reference in self.names:
+            kind, style, _ = self.names[reference]
+            if kind == 'pic':
+                return "pic '{}' has no position of its own, use one of its anchors, e.g. '{}-east'".format(
+                    reference, reference)
+            return None
+        if '.' in reference:
+            name, anchor = (part.strip() for part in reference.split('.', 1))
+            if name not in self.names:
+                return self._unknown(name, later)
+            if self.names[name][0] == 'pic':
+                return "pic anchors are written with a dash, '{}-{}'".format(name, anchor)
+            return None
+        if '-' not in reference:
+            return self._unknown(reference, later)
+        name, anchor = reference.rsplit('-', 1)
+        if name not in self.names:
+            return self._unknown(reference if reference in later else name, later)
+        kind, style, _ = self.names[name]
+        if kind != 'pic':
+            return "{} '{}' has no anchor '-{}', node anchors are written as '{}.{}'".format(
+                kind, name, anchor, name, anchor)
+        if anchor not in PIC_ANCHORS.get(style, ()):
+            close = difflib.get_close_matches(anchor, PIC_ANCHORS.get(style, ()), 1)
+            return "{} '{}' has no anchor '-{}'{}".format(
+                style, name, anchor, ", did you mean '-{}'?".format(close[0]) if close else '')
+        return None
+
+    def _unknown(self, name, later):
+        if name in later:
+            return "'{}' is used before it is defined by element {}".format(name, later[name])
+        # short layer names such as c0 and c1 only share half of their characters
+        close = difflib.get_close_matches(name, [n for n in self.names if n not in self.locals], 1, 0.5)
+        return "unknown name '{}'{}".format(name, ", did you mean '{}'?".format(close[0]) if close else '')
+
+
+def _validate(elements):
+    # elements are (index, label, text, line)
+    parsed = []
+    later = {}
+    for index, label, text, line in elements:
+        events = [event for statement in _split(text) for event in _statement(statement)]
+        parsed.append((index, label, events, line))
+        for name, kind, _ in events:
+            if kind:
+                later.setdefault(name, index)
+    problems = []
+    names = Index()
+    seen = {}
+    for index, label, events, line in parsed:
+        for name, kind, style in events:
+            if not kind:
+                message = names.check(name, later)
+                problem = Problem(index, label, message, line)
+                # a wrong name is usually referred to several times by the same element
+                if message and (not problems or problems[-1] != problem):
+                    problems.append(problem)
+                continue
+            if kind != 'coordinate':
+                if name in seen:
+                    problems.append(Problem(index, label, "'{}' is defined twice, first by element {}".format(
+                        name, seen[name]), line))
+                seen.setdefault(name, index)
+            names.define(name, kind, style, index)
+            if later.get(name) == index:
+                del later[name]
+    return problems
+
+
+def validate(arch):
+    """
+    Check every name and anchor an architecture refers to without running TeX
+
+    Builds an index of the pics, nodes and coordinates in drawing order and checks each position against it: unknown
+    names, names used before they are defined, anchors a style does not define and names defined twice are reported.
+
+    Arguments:
+        arch {iterable} -- architecture elements, see execute.flatten
+
+    Returns:
+        problems {list} -- all problems found, empty if the architecture is fine
+    """
+    def elements():
+        inside = False
+        for index, element in enumerate(execute.flatten(arch)):
+            text = element if isinstance(element, str) else str(element)
+            if not inside:
+                if '\\begin{tikzpicture}' not in text:
+                    continue
+                inside = True
+                text = text.split('\\begin{tikzpicture}', 1)[1]
+            yield index, timing.describe(element)[0], text, None
+
+    return _validate(elements())
+
+
+def check(arch):
+    """
+    Raise if an architecture refers to names or anchors that do not exist
+
+    Arguments:
+        arch {list} -- architecture elements, iterated once
+
+    Raises:
+        ValidationError: listing all problems
+    """
+    problems = validate(arch)
+    if problems:
+        raise ValidationError(problems)
+
+
+def statements(source):
+    """
+    Split the tikzpicture of a .tex source into statements at top level semicolons
+
+    Yields:
+        statement {tuple} -- (text, line number of the first line)
+    """
+    start = source.find('\\begin{tikzpicture}')
+    if start < 0:
+        return
+    end = source.find('\\end{tikzpicture}', start)
+    end = end if end >= 0 else len(source)
+    line = source.count('\n', 0, start) + 1
+    for text in _split(source[start:end]):
+        leading = len(text) - len(text.lstrip())
+        yield text, line + text.count('\n', 0, leading)
+        line += text.count('\n')
+
+
+def validate_source(source):
+    """
+    Validate the picture of a .tex file, see validate
+
+    Arguments:
+        source {str} -- content of the .tex file
+
+    Returns:
+        problems {list} -- all problems with the line of the statement they occur in
+    """
+    # comments may contain anything
+    source = re.sub(r'(?<!\\)%[^\n]*', '', source)
+    return _validate((index, text.strip().split('\n', 1)[0][:60], text, line)
+                     for index, (text, line) in enumerate(statements(source)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check names and anchors of PlotNeuralNet .tex files.')
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args(argv)
+    failed = 0
+    for file in args.files:
+        with open(file, errors='replace') as f:
+            problems = validate_source(f.read())
+        for problem in problems:
+            print(format_problem(problem, file))
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
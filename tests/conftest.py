@@ -0,0 +1,45 @@
+import importlib.util
+import os
+import stat
+
+import pytest
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pyexamples')
+
+
+@pytest.fixture
+def example():
+    # arch list of a script in pyexamples
+    def load(name):
+        spec = importlib.util.spec_from_file_location(name, os.path.join(EXAMPLES, name + '.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.arch
+    return load
+
+
+# shell script standing in for a TeX engine, writes <stem><extension> into the -output-directory
+FAKE_ENGINE = '''#!/bin/sh
+[ "$1" = --version ] && {{ echo "fake $(basename "$0") 1.0"; exit; }}
+for a; do f=$a; done
+{fail}
+for a; do case $a in -output-directory=*) d=${{a#-output-directory=}};; esac; done
+echo "$0" > "$d/$(basename "$f" .tex){extension}"
+'''
+# fails like pdflatex on documents containing BIG
+CAPACITY = 'grep -q BIG "$f" && { echo "! TeX capacity exceeded, sorry"; exit 1; }'
+
+
+@pytest.fixture
+def fake_engines(tmp_path, monkeypatch):
+    # pdflatex running out of memory on BIG, lualatex and latex writing a .dvi, first on the PATH
+    if os.name == 'nt':
+        pytest.skip('fake engines are shell scripts')
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    for name, extension, fail in (('pdflatex', '.pdf', CAPACITY), ('lualatex', '.pdf', ''), ('latex', '.dvi', '')):
+        path = bin_dir / name
+        path.write_text(FAKE_ENGINE.format(fail=fail, extension=extension))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(bin_dir, os.pathsep, os.environ['PATH']))
+    return tmp_path
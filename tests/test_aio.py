@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from pycore import aio
+
+
+def compile_tex(engine, file):
+    return asyncio.run(aio.Compiler(engine=engine).compile_tex(str(file)))
+
+
+def test_latex_writes_dvi(fake_engines):
+    (fake_engines / 'small.tex').write_text('small')
+    result = compile_tex('latex', fake_engines / 'small.tex')
+    assert result.ok and result.pdf.endswith('small.dvi')
+
+
+def test_auto_falls_back_to_lualatex(fake_engines):
+    (fake_engines / 'big.tex').write_text('BIG')
+    assert not compile_tex('pdflatex', fake_engines / 'big.tex').ok
+    result = compile_tex('auto', fake_engines / 'big.tex')
+    assert result.ok
+    with open(result.pdf) as f:
+        assert f.read().strip().endswith('lualatex')
+
+
+def test_svg_engine_is_rejected(fake_engines):
+    (fake_engines / 'small.tex').write_text('small')
+    with pytest.raises(ValueError):
+        compile_tex('latex+dvisvgm', fake_engines / 'small.tex')
@@ -0,0 +1,89 @@
+import os
+import shutil
+import stat
+
+import pytest
+
+from pycore import batch, execute, tikz
+
+
+def figure(name):
+    return [tikz.start(), tikz.conv(name, to='(0,0,0)'), tikz.env_end()]
+
+
+def test_gallery_source_prefixes_every_picture():
+    source = execute.build_architecture(batch.gallery_source([figure('conv1'), figure('conv1')]))
+    assert source.count(r'\begin{document}') == 1
+    assert source.count(r'\documentclass') == 1
+    assert source.count(r'\begin{tikzpicture}[name prefix=pnn0-]') == 1
+    assert source.count(r'\begin{tikzpicture}[name prefix=pnn1-]') == 1
+    assert source.count('name=conv1,') == 2
+    assert source.rstrip().endswith(r'\end{document}')
+
+
+def test_gallery_source_rejects_other_preambles():
+    other = [tikz.start(path='../../')] + figure('conv2')[1:]
+    with pytest.raises(ValueError, match='figure 1'):
+        execute.build_architecture(batch.gallery_source([figure('conv1'), other]))
+
+
+@pytest.mark.parametrize('arch', [['text'], [r'\documentclass{article}\begin{document}\end{document}'],
+                                  [tikz.start()]])
+def test_gallery_source_rejects_figures_without_picture(arch):
+    with pytest.raises(ValueError, match='figure 1 has no tikzpicture'):
+        execute.build_architecture(batch.gallery_source([figure('conv1'), arch]))
+
+
+def test_together_compiles_one_gallery_per_folder(fake_engines, monkeypatch):
+    def split_pages(pdf, targets):
+        for target in targets:
+            shutil.copyfile(pdf, target)
+
+    monkeypatch.setattr(batch, 'split_pages', split_pages)
+    files = []
+    for folder, name in (('a', 'one'), ('a', 'two'), ('b', 'three')):
+        path = fake_engines / folder / (name + '.tex')
+        path.parent.mkdir(exist_ok=True)
+        execute.write_fragments(figure(name), str(path))
+        files.append(str(path))
+    results = list(batch.together(files))
+    assert [result.file for result in results] == files
+    assert all(result.ok for result in results)
+    assert sorted(p.name for p in (fake_engines / 'a').glob('*.pdf')) == ['one.pdf', 'two.pdf']
+    assert [p.name for p in (fake_engines / 'b').glob('*.pdf')] == ['three.pdf']
+
+
+def test_together_honours_precompiled(tmp_path, monkeypatch):
+    calls = []
+
+    def compile_gallery(figures, output_dir, folder='.', engine='pdflatex', cache=None, precompiled=False):
+        calls.append(precompiled)
+        return [execute.CompileResult(name, None, True, 0.0, '') for name in figures]
+
+    monkeypatch.setattr(batch, 'compile_gallery', compile_gallery)
+    execute.write_fragments(figure('conv1'), str(tmp_path / 'one.tex'))
+    assert batch.main([str(tmp_path), '--together', '--precompiled']) == 0
+    assert calls == [True]
+
+
+def test_split_pages_checks_the_page_count(tmp_path, monkeypatch):
+    # pdfseparate stand-in writing a single page
+    if os.name == 'nt':
+        pytest.skip('the fake pdfseparate is a shell script')
+    script = tmp_path / 'pdfseparate'
+    script.write_text('#!/bin/sh\necho page > "$(dirname "$2")/1.pdf"\n')
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(tmp_path, os.pathsep, os.environ['PATH']))
+    monkeypatch.setattr(batch, 'PdfReader', None)
+    targets = [str(tmp_path / 'one.pdf'), str(tmp_path / 'two.pdf')]
+    with pytest.raises(ValueError, match='has 1 pages for 2 figures'):
+        batch.split_pages(str(tmp_path / 'gallery.pdf'), targets)
+
+    class Reader:
+        def __init__(self, pdf):
+            self.pages = ['page'] * 3
+
+    monkeypatch.setattr(batch, 'PdfReader', Reader)
+    with pytest.raises(ValueError, match='has 3 pages for 2 figures'):
+        batch.split_pages(str(tmp_path / 'gallery.pdf'), targets)
+    assert not os.path.exists(targets[0])
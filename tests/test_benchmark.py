@@ -0,0 +1,37 @@
+from pycore import benchmark, execute
+
+LOG = '''
+Here is how much of TeX's memory you used:
+ 2371 strings out of 478287
+ 50041 words of memory out of 5000000
+ 1129 multiletter control sequences out of 15000+600000
+'''
+
+
+def test_tex_memory():
+    memory = benchmark.tex_memory(LOG)
+    assert memory['words of memory'] == (50041, 5000000)
+    assert memory['multiletter control sequences'] == (1129, 615000)
+    assert memory['strings'] == (2371, 478287)
+
+
+def test_synthetic_architectures_grow_with_the_layer_count():
+    assert execute.build_architecture(benchmark.tikz_arch(25)).count(r'\pic') == 25
+    small = execute.build_architecture(benchmark.blocks_arch(10))
+    large = execute.build_architecture(benchmark.blocks_arch(25))
+    assert small.count(r'\pic') >= 10 and large.count(r'\pic') >= 25
+    assert small.count(r'\begin{document}') == 1
+
+
+def test_measure_without_compiling(tmp_path):
+    result = benchmark.measure('tikz', 5, str(tmp_path), compile=False)
+    assert result['tex_bytes'] == (tmp_path / 'tikz_5.tex').stat().st_size
+    assert result['compiled'] is None and result['error'] is None
+    assert result['generate_seconds'] > 0
+
+
+def test_compare_ratios():
+    baseline = [{'kind': 'tikz', 'layers': 10, 'tex_bytes': 100, 'compile_seconds': None}]
+    results = [{'kind': 'tikz', 'layers': 10, 'tex_bytes': 150, 'compile_seconds': 1.0},
+               {'kind': 'tikz', 'layers': 100, 'tex_bytes': 1000}]
+    assert list(benchmark.compare(results, baseline)) == [('tikz', 10, 'tex_bytes', 100, 150, 1.5)]
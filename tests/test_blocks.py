@@ -0,0 +1,60 @@
+from pycore import blocks, execute, ir, validate
+
+
+def test_conc_draws_its_connection():
+    tex = execute.build_architecture(blocks.conc('cat1', 'conv1'))
+    assert 'name=cat1,' in tex
+    assert '(conv1-east) -- node [fillwhite] {\\midarrow}(cat1-west)' in tex
+    assert r'\draw' not in execute.build_architecture(blocks.conc('cat1', 'conv1', conn=False))
+
+
+def test_res_builds_every_layer():
+    tex = execute.build_architecture(blocks.res(4, 'res', 'conv1', 'out'))
+    for name in ('res_0', 'res_1', 'res_2', 'out'):
+        assert 'name={},'.format(name) in tex
+    assert '(res_2-east) -- node [fillwhite] {\\midarrow}(out-west)' in tex
+    assert tex.count('[connection') == 4
+    assert '(res_1-southeast)' in tex and '(res_2-north)' in tex
+
+
+def test_block_unconv_sizes_its_convolutions():
+    tex = execute.build_architecture(blocks.block_unconv('b1', 'conv1', 'out', size=(20, 30, 2)))
+    for name in ('unpool_b1', 'ccr_res_b1', 'ccr_b1', 'ccr_res_c_b1', 'out'):
+        assert 'name={},'.format(name) in tex
+    assert tex.count('height=20') == 5
+    assert tex.count('depth=30') == 5
+
+
+def test_original_api():
+    namespace = {}
+    exec('from pycore.blocks import *', namespace)
+    assert {'to_head', 'to_ConvConvRelu', 'to_generate', 'block_2ConvPool', 'multi_conv_relu'} <= set(namespace)
+    pool = blocks.to_Pool('pool1', to='(conv1-east)')
+    assert pool.kind == 'pool' and pool.to == 'conv1-east'
+    assert 'logo=$\\times$' in str(blocks.to_Sum('sum1', to='(pool1-east)', logo='\\times'))
+
+
+def test_block_2ConvPool():
+    tex = execute.build_architecture(blocks.block_2ConvPool('b1', 'pool1', 'pool2', size=(32, 32, 3.5)))
+    assert 'name=ccr_b1,' in tex and 'name=pool2,' in tex
+    assert '(pool1-east) -- node [fillwhite] {\\midarrow}(ccr_b1-west)' in tex
+    assert execute.build_architecture(blocks.block_Unconv('b2', 'pool2', 'out')) == \
+        execute.build_architecture(blocks.block_unconv('b2', 'pool2', 'out', z_label=256, offset='(1,0,0)'))
+
+
+def test_builders_can_be_built_twice():
+    arch = [ir.Start(), ir.Conv('input', to='0,0,0'), blocks.multi_conv_relu(3, 'enc', 'input'),
+            blocks.conv('conv_1', 'enc_2'), ir.End()]
+    assert not validate.validate(arch)
+    tex = execute.build_architecture(arch)
+    assert 'name=enc_0,' in tex and 'name=enc_2,' in tex
+    assert execute.build_architecture(arch) == tex
+
+
+def test_builders_concatenate():
+    enc, neck = blocks.multi_conv_relu(3, 'enc', 'input'), blocks.bottleneck(3, 'neck', 'enc_2')
+    tex = execute.build_architecture([enc, neck])
+    assert execute.build_architecture(enc + neck) == tex
+    assert execute.build_architecture([] + enc + neck) == tex
+    assert execute.build_architecture(enc + list(neck)) == tex
+    assert execute.build_architecture(list(enc) + neck) == tex
@@ -0,0 +1,126 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pycore import cache, execute
+
+DOCUMENT = r'''
+\documentclass{article}
+\usepackage{import}
+\subimport{layers/}{init}
+\def\Photo{photo}
+\begin{document}
+\includegraphics{\Photo}
+\end{document}
+'''
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def test_key_follows_dependencies(tmp_path):
+    tex = write(str(tmp_path / 'file.tex'), DOCUMENT)
+    init = write(str(tmp_path / 'layers' / 'init.tex'), r'\usepackage{Box}')
+    box = write(str(tmp_path / 'layers' / 'Box.sty'), '% box')
+    photo = write(str(tmp_path / 'photo.png'), 'png')
+    assert cache.dependencies(tex) == sorted([init, box, photo])
+
+    store = cache.BuildCache(str(tmp_path / 'store'))
+    key = store.key(tex, engine='pnn-no-such-engine')
+    assert store.key(tex, engine='pnn-no-such-engine') == key
+    write(box, '% box, redrawn')
+    assert store.key(tex, engine='pnn-no-such-engine') != key
+    assert store.key(tex, engine='pnn-other-engine') != store.key(tex, engine='pnn-no-such-engine')
+
+
+def test_get_put_and_stats(tmp_path):
+    store = cache.BuildCache(str(tmp_path / 'store'))
+    pdf = write(str(tmp_path / 'file.pdf'), 'pdf')
+    assert store.get('ab' * 32) is None
+    stored = store.put('ab' * 32, pdf)
+    assert store.get('ab' * 32) == stored
+    with open(stored) as f:
+        assert f.read() == 'pdf'
+    stats = store.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (1, 1, 1, 3)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_counters_have_a_fixed_size(tmp_path):
+    store = cache.BuildCache(str(tmp_path / 'store'))
+    pdf = write(str(tmp_path / 'file.pdf'), 'pdf')
+    store.put('ab' * 32, pdf)
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda i: store.get('ab' * 32 if i % 2 else 'cd' * 32), range(200)))
+    assert store.counts() == {'hits': 100, 'misses': 100, 'bytes': 3}
+    assert os.path.getsize(os.path.join(store.root, cache.COUNTER_FILE)) == cache.COUNTER_FORMAT.size
+
+
+def test_evict_least_recently_used(tmp_path):
+    store = cache.BuildCache(str(tmp_path / 'store'), max_bytes=30)
+    pdf = write(str(tmp_path / 'file.pdf'), '0123456789')
+    keys = [str(i) * 64 for i in range(3)]
+    for age, key in enumerate(keys):
+        path = store.put(key, pdf)
+        os.utime(path, (1000 + age, 1000 + age))
+    # looking up the oldest entry makes it the most recently used one
+    store.get(keys[0])
+    store.put('3' * 64, pdf)
+    assert store.get(keys[1]) is None
+    assert store.get(keys[0]) and store.get(keys[2]) and store.get('3' * 64)
+    assert store.stats()['bytes'] == 30
+
+
+def test_store_is_walked_only_when_full(tmp_path, monkeypatch):
+    store = cache.BuildCache(str(tmp_path / 'store'), max_bytes=30)
+    pdf = write(str(tmp_path / 'file.pdf'), '0123456789')
+    store.put('0' * 64, pdf)
+    walks = []
+    entries = store.entries
+    monkeypatch.setattr(store, 'entries', lambda: walks.append(1) or entries())
+    store.put('1' * 64, pdf)
+    store.put('2' * 64, pdf)
+    assert not walks and store.counts()['bytes'] == 30
+    store.put('3' * 64, pdf)
+    assert len(walks) == 1 and store.counts()['bytes'] == 30
+
+
+def test_compile_tex_reuses_cached_pdf(fake_engines):
+    tex = write(str(fake_engines / 'file.tex'), DOCUMENT)
+    store = cache.BuildCache(str(fake_engines / 'store'))
+    first = execute.compile_tex(tex, output_dir=str(fake_engines / 'out'), cache=store)
+    second = execute.compile_tex(tex, output_dir=str(fake_engines / 'out'), cache=store)
+    assert first.ok and not first.cached
+    assert second.ok and second.cached
+    assert store.stats()['entries'] == 1
+    write(tex, DOCUMENT.replace('photo', 'picture'))
+    assert not execute.compile_tex(tex, cache=store).cached
+
+
+def test_cache_keeps_output_extension(fake_engines):
+    tex = write(str(fake_engines / 'file.tex'), DOCUMENT)
+    store = cache.BuildCache(str(fake_engines / 'store'))
+    first = execute.compile_tex(tex, output_dir=str(fake_engines / 'out'), engine='latex', cache=store)
+    second = execute.compile_tex(tex, output_dir=str(fake_engines / 'out'), engine='latex', cache=store)
+    assert first.ok and not first.cached
+    assert second.ok and second.cached and second.pdf.endswith('file.dvi')
+    key = store.key(tex, 'latex')
+    assert store.get(key, '.dvi').endswith(key + '.dvi') and store.get(key) is None
+    assert store.stats()['entries'] == 1
+
+
+def test_clear_keeps_formats_and_blocks(tmp_path):
+    store = cache.BuildCache(str(tmp_path / 'store'))
+    pdf = write(str(tmp_path / 'file.pdf'), 'pdf')
+    fmt = write(os.path.join(store.root, 'formats', 'ab', 'pnn.fmt'), 'fmt')
+    block = write(os.path.join(store.root, 'blocks', 'ab', 'ab.pdf'), 'block')
+    store.put('ab' * 32, pdf)
+    store.get('ab' * 32)
+    assert store.stats()['entries'] == 1
+    store.clear()
+    assert store.get('ab' * 32) is None
+    assert store.stats()['entries'] == 0 and store.counts() == {'hits': 0, 'misses': 1, 'bytes': 0}
+    assert os.path.exists(fmt) and os.path.exists(block)
@@ -0,0 +1,69 @@
+import re
+
+from pycore import compress, execute, ir, tikz
+
+DEFINITION_PATTERN = re.compile(r'\\long\\def\\(pnnm[A-Za-z]+)((?:#\d)*)\{')
+CALL_PATTERN = re.compile(r'\\(pnnm[A-Za-z]+)(?![A-Za-z])')
+
+
+def _group(text, start):
+    # content of the brace group opening at start and the index after it
+    depth = 0
+    for index in range(start, len(text)):
+        depth += {'{': 1, '}': -1}.get(text[index], 0)
+        if depth == 0:
+            return text[start + 1:index], index + 1
+    raise ValueError('unbalanced braces')
+
+
+def expand(source):
+    # what TeX sees once the macros are expanded
+    macros = {}
+    match = DEFINITION_PATTERN.search(source)
+    while match:
+        body, end = _group(source, match.end() - 1)
+        macros[match.group(1)] = match.group(2).count('#'), body
+        source = source[:match.start()] + source[end:].lstrip('\n')
+        match = DEFINITION_PATTERN.search(source)
+    result, position = [], 0
+    for match in CALL_PATTERN.finditer(source):
+        if match.start() < position:
+            continue
+        result.append(source[position:match.start()])
+        count, body = macros[match.group(1)]
+        position = match.end()
+        for number in range(count):
+            value, position = _group(source, position)
+            body = body.replace('#{}'.format(number + 1), value)
+        result.append(body)
+    result.append(source[position:])
+    return ''.join(result)
+
+
+def arch(layers=6):
+    yield tikz.start()
+    yield ir.ConvRelu('layer_0', to='(0,0,0)', n_filter=64, size=(32, 32))
+    for i in range(1, layers):
+        yield ir.ConvRelu('layer_{}'.format(i), offset='(1,0,0)', to='(layer_{}-east)'.format(i - 1), n_filter=64,
+                          size=(32, 32 - i))
+        yield ir.ShortConnection('layer_{}'.format(i - 1), 'layer_{}'.format(i))
+    yield tikz.env_end()
+
+
+def test_macro_names_are_letters():
+    assert [compress.macro_name(i) for i in (0, 1, 51, 52)] == ['pnnma', 'pnnmb', 'pnnmZ', 'pnnmaa']
+
+
+def test_compress_round_trip():
+    original = execute.build_architecture(arch())
+    compressed = ''.join(compress.compress(arch()))
+    assert len(compressed) < len(original)
+    assert compressed.count(r'\long\def') == 2
+    assert expand(compressed).split() == original.split()
+
+
+def test_unique_elements_are_kept():
+    original = execute.build_architecture(arch(2))
+    compressed = ''.join(compress.compress(arch(2)))
+    assert r'\long\def' not in compressed
+    assert compressed.split() == original.split()
@@ -0,0 +1,29 @@
+from pycore import draft, execute, ir, tikz
+
+
+def arch():
+    return [tikz.start(), ir.Conv('conv1', n_filter=(64, 64), caption='Conv', to='(0,0,0)', z_label='32'),
+            ir.Conv('conv2', to='(conv1-east)'), tikz.env_end()]
+
+
+def test_overrides_follow_the_picture():
+    source = ''.join(draft.simplify(arch()))
+    assert source.count('ball color/.style') == 1
+    assert source.index('ball color/.style') > source.index(r'\begin{tikzpicture}')
+    assert 'caption=Conv' in source
+    assert r'\setkeys{Gin}{draft}' not in ''.join(draft.simplify(arch(), images=False))
+
+
+def test_strip_labels_keeps_the_number_of_boxes():
+    text = draft.strip_labels(str(ir.Conv('conv1', n_filter=(64, 64), caption='Conv', z_label='32')))
+    assert 'caption={},' in text and 'zlabel={},' in text
+    assert 'xlabel={((,),)},' in text
+    assert 'name=conv1,' in text
+
+
+def test_write_tex_draft_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('PLOTNEURALNET_DRAFT', '1')
+    execute.write_tex(arch(), str(tmp_path / 'draft.tex'))
+    execute.write_tex(arch(), str(tmp_path / 'full.tex'), draft=False)
+    assert r'\setkeys{Gin}{draft}' in (tmp_path / 'draft.tex').read_text()
+    assert r'\setkeys{Gin}{draft}' not in (tmp_path / 'full.tex').read_text()
@@ -0,0 +1,41 @@
+import subprocess
+
+import pytest
+
+from pycore import batch, engines, execute, profiling
+
+
+def test_tex_to_pdf_returns_attempts(fake_engines):
+    (fake_engines / 'big.tex').write_text('BIG')
+    with profiling.Profiler() as profiler:
+        attempts = execute.tex_to_pdf('big.tex', str(fake_engines), engine='auto')
+    assert [(attempt.engine, attempt.ok) for attempt in attempts] == [('pdflatex', False), ('lualatex', True)]
+    stages = [event for event in profiler.events if event.category == 'engine']
+    assert [event.args['reason'] for event in stages] == [attempt.reason for attempt in attempts]
+
+
+def test_compile_tex_routes_auto(fake_engines):
+    (fake_engines / 'big.tex').write_text('BIG')
+    result = engines.compile_tex(str(fake_engines / 'big.tex'), 'auto')
+    assert result.ok
+    with open(result.pdf) as f:
+        assert f.read().strip().endswith('lualatex')
+
+
+def test_batch_compiles_with_auto(fake_engines):
+    (fake_engines / 'big.tex').write_text('BIG')
+    assert batch.main([str(fake_engines / 'big.tex'), '--engine', 'auto', '-j', '1']) == 0
+    with open(fake_engines / 'big.pdf') as f:
+        assert f.read().strip().endswith('lualatex')
+
+
+def test_compile_string_routes_engines(fake_engines, monkeypatch):
+    monkeypatch.delenv(engines.ENGINE_VARIABLE, raising=False)
+    assert execute.compile_string('small', str(fake_engines)).strip().endswith(b'pdflatex')
+    assert execute.compile_string('BIG', str(fake_engines), engine='auto').strip().endswith(b'lualatex')
+    assert execute.compile_string('small', str(fake_engines), engine='latex').strip().endswith(b'latex')
+    monkeypatch.setenv(engines.ENGINE_VARIABLE, 'pdflatex')
+    (fake_engines / 'bin' / 'lualatex').unlink()
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        execute.compile_string('BIG', str(fake_engines), engine=None, name='big')
+    assert error.value.cmd == 'pdflatex big'
@@ -0,0 +1,20 @@
+import pytest
+
+from pycore import batch, execute
+
+
+@pytest.mark.parametrize('kwargs', [{'method': 'dvisvgm', 'thumbnails': (320,)},
+                                    {'method': 'dvisvgm', 'engine': 'lualatex'},
+                                    {'method': 'inkscape'}])
+def test_compile_svg_rejects_dvisvgm_options(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        execute.compile_svg(str(tmp_path / 'file.tex'), **kwargs)
+
+
+@pytest.mark.parametrize('argv', [['--method', 'dvisvgm', '--thumbnails', '320'],
+                                  ['--method', 'dvisvgm', '--engine', 'lualatex', '--svg'],
+                                  ['--svg', '--precompiled']])
+def test_batch_rejects_dvisvgm_options(tmp_path, argv):
+    with pytest.raises(SystemExit) as e:
+        batch.main([str(tmp_path)] + argv)
+    assert e.value.code == 2
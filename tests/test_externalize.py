@@ -0,0 +1,64 @@
+import os
+import stat
+
+import pytest
+
+from pycore import blocks, externalize, tikz
+
+# pdflatex reporting the corner and every exported point of a block in its log like block_source asks it to
+LOGGING_ENGINE = '''#!/bin/sh
+for a; do case $a in -output-directory=*) d=${a#-output-directory=};; esac; f=$a; done
+stem=$(basename "$f" .tex)
+{ echo 'pnn-bbox:-1.5pt,2.0pt'; grep -o 'pnn-point:[0-9]*' "$f" | sed 's/$/:10.0pt,20.0pt/'; } > "$d/$stem.log"
+echo pdf > "$d/$stem.pdf"
+'''
+
+
+def arch():
+    return [tikz.start(), tikz.conv_relu('input', to='(0,0,0)'), blocks.multi_conv_relu(3, 'enc', 'input', conn=True),
+            tikz.conv_relu('out', to='(enc_2-east)', offset='(1,0,0)'), tikz.short_connection('enc_2', 'out'),
+            tikz.env_end()]
+
+
+def test_split_keeps_builder_groups_together():
+    head, parts, tail = externalize.split(arch())
+    assert r'\begin{tikzpicture}' in head
+    assert len(parts) == 3
+    assert 'name=enc_0,' in parts[1] and 'name=enc_2,' in parts[1]
+    assert 'name=out,' in parts[2] and '(enc_2-east)' in parts[2]
+    assert r'\end{document}' in tail
+    coordinates = ['\\coordinate (c{}) at (0,0);\n'.format(i) for i in range(5)]
+    assert len(externalize.split([tikz.start(), *coordinates, tikz.env_end()], chunk=2)[1]) == 3
+
+
+def test_group_passes_points_and_merges_node_anchors():
+    parts, imports = externalize.group(['\\coordinate (a) at (0,0);', '\\draw (a) -- (1,1);'])
+    assert len(parts) == 2 and imports == [{}, {'a': 0}]
+    parts, imports = externalize.group(['\\node (img) at (0,0) {};', '\\coordinate (c) at (1,1);',
+                                        '\\draw (img.north) -- (c);'])
+    assert len(parts) == 1 and imports == [{}]
+
+
+def test_build_reuses_unchanged_blocks(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        pytest.skip('the fake engine is a shell script')
+    engine = tmp_path / 'bin' / 'pdflatex'
+    engine.parent.mkdir()
+    engine.write_text(LOGGING_ENGINE)
+    engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(engine.parent, os.pathsep, os.environ['PATH']))
+    store = externalize.BlockStore(str(tmp_path / 'blocks'))
+    result, handled = externalize.build(arch(), str(tmp_path / 'file.tex'), store=store)
+    assert result.ok
+    assert [block.cached for block in handled] == [False, False, False]
+    assembled = (tmp_path / 'file.tex').read_text()
+    assert assembled.count(r'\includegraphics') == 3
+    assert 'at (-1.5pt,2.0pt)' in assembled
+    record = store.get(handled[0].key)
+    assert record['points'] == {'input-east': [10.0, 20.0]}
+
+    changed = arch()
+    changed[3] = tikz.conv_relu('out', to='(enc_2-east)', offset='(2,0,0)')
+    result, handled = externalize.build(changed, str(tmp_path / 'file.tex'), store=store)
+    assert result.ok
+    assert [block.cached for block in handled] == [True, True, False]
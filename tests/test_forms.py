@@ -0,0 +1,28 @@
+from pycore import execute, forms, ir, tikz
+
+
+def arch():
+    return [tikz.start(),
+            ir.Conv('conv1', to='0,0,0', caption='first'),
+            ir.Conv('conv2', to='conv1-east', offset='(1,0,0)', caption='second'),
+            ir.Conv('conv3', to='conv2-east', offset='(1,0,0)', size=[20, 20]),
+            ir.ShortConnection('conv1', 'conv2'),
+            tikz.env_end()]
+
+
+def test_equal_shapes_share_a_form():
+    source = ''.join(forms.forms(arch()))
+    assert source.count(r'\pnnsaveform{pnnma}') == 1
+    assert r'\pnnsaveform{pnnmb}' not in source
+    assert source.count('{pnnform=pnnma}') == 2
+    # labels and anchors are still drawn per layer
+    assert 'caption=first' in source and 'caption=second' in source
+    assert source.count(r'\pnnlabelsonly') == 3
+    assert 'name=conv3,' in source and 'height=20' in source
+    assert '(conv1-east) -- node' in source
+
+
+def test_unique_shapes_are_kept():
+    original = [tikz.start(), ir.Conv('conv1', to='0,0,0'), tikz.env_end()]
+    assert ''.join(forms.forms(original)) == execute.build_architecture(original)
+    assert ''.join(forms.forms(arch(), min_count=3)) == execute.build_architecture(arch())
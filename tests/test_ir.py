@@ -0,0 +1,35 @@
+import pytest
+
+from pycore import execute, ir, tikz
+
+
+def test_node_renders_its_primitive():
+    node = ir.Conv('conv1', n_filter=(64, 64), to='(0,0,0)', size=[32, 32])
+    assert str(node) == tikz.conv('conv1', n_filter=(64, 64), to='(0,0,0)', size=[32, 32])
+    assert node.kind == 'conv'
+    assert node.width == 2
+    assert not hasattr(node, '__dict__')
+    assert execute.build_architecture([ir.Start(), node, ir.End()]) == tikz.start() + str(node) + tikz.env_end()
+
+
+def test_dict_round_trip():
+    node = ir.ShortConnection('conv1', 'pool1', anchor_of='-north')
+    data = node.to_dict()
+    assert data['type'] == 'short_connection'
+    assert ir.from_dict(data) == node
+    with pytest.raises(ValueError):
+        ir.from_dict({'type': 'no_such_primitive'})
+
+
+def test_equal_nodes_share_a_hash():
+    first = ir.Pool('pool1', size=[32, 32])
+    second = ir.Pool('pool1', size=(32, 32))
+    assert first == second and hash(first) == hash(second)
+    assert first.replace(name='pool2') != first
+    assert first.replace(name='pool2').name == 'pool2' and first.name == 'pool1'
+    assert len({first, second, first.replace(opacity=0.1)}) == 2
+
+
+def test_node_types_cover_every_node():
+    assert ir.NODE_TYPES['conv_relu'] is ir.ConvRelu
+    assert list(ir.render(['%', ir.End()])) == ['%', tikz.env_end()]
@@ -0,0 +1,15 @@
+from pycore import ir, layout
+
+
+def test_simple_layout(example):
+    result = layout.layout(example('test_simple'))
+    assert result.points['conv1-west'] == (0, 0, 0)
+    assert result.points['pool1-west'] == result.points['conv1-east']
+    assert result.shapes['sum1'].style == 'Ball'
+    assert result.shapes['sum1'].size == (0.5, 0.5, 0.5)
+
+
+def test_z_conv_relu_list_widths():
+    result = layout.layout([ir.ZConvRelu('z1', n_filter=[64, 64], width=[2, 3], size=(40, 30))])
+    assert result.shapes['z1'].size == (30 * layout.SCALE, 40 * layout.SCALE, 5 * layout.SCALE)
+    assert 'depth=5,' in str(ir.ZConvRelu('z1', n_filter=[64, 64], width=[2, 3], size=(40, 30)))
@@ -0,0 +1,54 @@
+import os
+import stat
+
+import pytest
+
+from pycore import execute, preamble, tikz
+
+# pdflatex dumping a format for -ini runs, otherwise writing its arguments into the pdf
+DUMPING_ENGINE = '''#!/bin/sh
+[ "$1" = --version ] && { echo "dumping pdflatex"; exit; }
+for a; do
+    case $a in -jobname=*) job=${a#-jobname=};; -output-directory=*) d=${a#-output-directory=};; esac
+    f=$a
+done
+if [ -n "$job" ]; then echo format > "$d/$job.fmt"; else echo "$@ $TEXFORMATS" > "$d/$(basename "$f" .tex).pdf"; fi
+'''
+
+
+def test_split_at_the_marker():
+    source = tikz.start(precompiled=True) + tikz.env_end()
+    head = preamble.split(source)
+    assert head.lstrip().startswith(r'\documentclass')
+    assert r'\begin{document}' not in head
+    assert preamble.split(tikz.start() + tikz.env_end()) is None
+
+
+def test_format_name_depends_on_folder_and_preamble(tmp_path):
+    name = preamble.format_name('preamble', str(tmp_path), 'pnn-no-such-engine')
+    assert name.startswith('pnn-')
+    assert preamble.format_name('preamble', str(tmp_path), 'pnn-no-such-engine') == name
+    assert preamble.format_name('preamble', str(tmp_path / 'other'), 'pnn-no-such-engine') != name
+    assert preamble.format_name('other preamble', str(tmp_path), 'pnn-no-such-engine') != name
+
+
+def test_compile_loads_the_dumped_format(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        pytest.skip('the fake engine is a shell script')
+    engine = tmp_path / 'bin' / 'pdflatex'
+    engine.parent.mkdir()
+    engine.write_text(DUMPING_ENGINE)
+    engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(engine.parent, os.pathsep, os.environ['PATH']))
+    monkeypatch.setenv('PLOTNEURALNET_CACHE', str(tmp_path / 'cache'))
+    tex = tmp_path / 'file.tex'
+    tex.write_text(tikz.start(precompiled=True) + tikz.env_end())
+
+    result = execute.compile_tex(str(tex), precompiled=True)
+    name = preamble.format_name(preamble.split(tex.read_text()), str(tmp_path))
+    assert result.ok
+    assert os.path.isfile(os.path.join(preamble.format_dir(), name + '.fmt'))
+    with open(result.pdf) as f:
+        args = f.read()
+    assert '-fmt=' + name in args
+    assert preamble.format_dir() in args
@@ -0,0 +1,50 @@
+import sys
+
+import pytest
+
+from pycore import blocks, execute, profiling
+
+
+def test_block_built_before_profiler_is_timed():
+    arch = [blocks.sum('sum_1', 'conv_0')]
+    with profiling.Profiler() as profiler:
+        fragments = list(execute.iter_fragments(arch))
+    events = [event for event in profiler.events if event.category == 'block']
+    assert [event.name for event in events] == ['sum']
+    assert events[0].args['fragments'] == 2
+    assert len(fragments) == 2
+
+
+def test_block_iterated_without_profiler_is_not_timed():
+    arch = [blocks.sum('sum_1', 'conv_0')]
+    with profiling.Profiler() as profiler:
+        pass
+    list(execute.iter_fragments(arch))
+    assert not profiler.events
+
+
+def test_rss_fallback_is_in_bytes(monkeypatch):
+    if profiling.resource is None:
+        pytest.skip('resource is not available')
+
+    def fail(*args):
+        raise OSError('no /proc')
+
+    class Usage:
+        ru_maxrss = 100
+
+    monkeypatch.setattr(profiling, 'open', fail, raising=False)
+    monkeypatch.setattr(profiling.resource, 'getrusage', lambda who: Usage)
+    assert profiling._rss() == (100 if sys.platform == 'darwin' else 100 * 1024)
+
+
+def test_inner_stage_keeps_the_outer_peak():
+    with profiling.Profiler(memory=True) as profiler:
+        with profiling.stage('outer'):
+            data = bytearray(4 << 20)
+            del data
+            with profiling.stage('inner'):
+                pass
+    peaks = {event.name: event.py_peak for event in profiler.events}
+    assert peaks['outer'] >= 4 << 20
+    assert peaks['inner'] < 4 << 20
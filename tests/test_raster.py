@@ -0,0 +1,23 @@
+import warnings
+
+import pytest
+
+import pycore.tikz as tikz
+from pycore import raster
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('name', ['test_simple', 'resnet', 'unet'])
+def test_examples_are_drawn(example, name):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        image = raster.draw(example(name))
+    # more than the margin and the labels are painted
+    assert (image < 250).any(axis=2).mean() > 0.05
+
+
+def test_tex_strings_warn():
+    arch = [tikz.start(), tikz.conv('conv1'), tikz.env_end()]
+    with pytest.warns(UserWarning, match='1 TeX string'):
+        raster.draw(arch)
@@ -0,0 +1,96 @@
+import json
+import os
+import stat
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from pycore import execute, ir, server
+
+# pdflatex copying the source into the pdf, waiting for $PNN_GATE to exist and counting its runs in $PNN_RUNS
+GATED_ENGINE = '''#!/bin/sh
+for a; do case $a in -output-directory=*) d=${a#-output-directory=};; esac; f=$a; done
+[ -n "$PNN_GATE" ] && while [ ! -e "$PNN_GATE" ]; do sleep 0.01; done
+echo run >> "$PNN_RUNS"
+grep -q BROKEN "$f" && { echo '! broken figure'; exit 1; }
+cat "$f" > "$d/$(basename "$f" .tex).pdf"
+'''
+
+# as received, tuples arrive as lists
+SPEC = json.loads(json.dumps([ir.Start().to_dict(), ir.Conv('conv1', to='0,0,0').to_dict(), ir.End().to_dict()]))
+
+
+@pytest.fixture
+def renderer(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        pytest.skip('the fake engine is a shell script')
+    engine = tmp_path / 'bin' / 'pdflatex'
+    engine.parent.mkdir()
+    engine.write_text(GATED_ENGINE)
+    engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(engine.parent, os.pathsep, os.environ['PATH']))
+    monkeypatch.setenv('PNN_RUNS', str(tmp_path / 'runs'))
+    renderer = server.Renderer(str(tmp_path), jobs=1, queue=1)
+    yield renderer
+    (tmp_path / 'gate').touch()
+    renderer.close()
+
+
+def runs(tmp_path):
+    return len((tmp_path / 'runs').read_text().splitlines())
+
+
+def test_arch_source():
+    source = server.arch_source(SPEC[:2] + ['% plain TeX\n'] + SPEC[2:])
+    assert source.startswith(execute.build_architecture([ir.Start()]))
+    assert source.endswith('% plain TeX\n' + execute.build_architecture([ir.End()]))
+    assert 'name=conv1,' in source
+
+
+def test_identical_requests_share_a_compile(renderer, tmp_path, monkeypatch):
+    monkeypatch.setenv('PNN_GATE', str(tmp_path / 'gate'))
+    first = renderer.submit('figure', 'pdf')
+    assert renderer.submit('figure', 'pdf') is first
+    while renderer.metrics.snapshot()['running'] == 0:
+        pass
+    queued = renderer.submit('other figure', 'pdf')
+    with pytest.raises(server.QueueFull):
+        renderer.submit('third figure', 'pdf')
+    (tmp_path / 'gate').touch()
+    assert first.exception() is None and queued.exception() is None
+    assert runs(tmp_path) == 2
+    metrics = renderer.metrics.snapshot()
+    assert (metrics['requests'], metrics['deduplicated'], metrics['rejected'], metrics['done']) == (4, 1, 1, 2)
+
+
+def test_http_render(renderer, tmp_path):
+    handler = type('BoundHandler', (server.Handler,), {'renderer': renderer})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+
+    def post(path, body, content_type):
+        request = urllib.request.Request(url + path, data=body.encode(), headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers['Content-Type'], response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers['Content-Type'], e.read()
+
+    try:
+        status, content_type, body = post('/render?format=pdf', json.dumps({'arch': SPEC}), 'application/json')
+        assert (status, content_type) == (200, 'application/pdf')
+        assert body.decode() == server.arch_source(SPEC)
+        status, _, body = post('/render', 'BROKEN', 'text/plain')
+        assert status == 422 and '! broken figure' in json.loads(body)['log']
+        assert post('/render', '{"arch": [{"type": "nope"}]}', 'application/json')[0] == 400
+        assert post('/render?format=gif', 'figure', 'text/plain')[0] == 400
+        with urllib.request.urlopen(url + '/metrics') as response:
+            metrics = json.load(response)
+        assert (metrics['done'], metrics['failed']) == (1, 1)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
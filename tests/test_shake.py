@@ -0,0 +1,25 @@
+from pycore import ir, shake, tikz
+
+
+def test_usage():
+    body = str(ir.Conv('conv1', to='(0,0,0)')) + str(ir.Add('sum1', to='(conv1-east)'))
+    used = shake.usage(body)
+    assert used['styles'] == {'Box', 'Ball'}
+    assert used['colors'] == {'ConvColor', 'SumColor'}
+    assert used['libraries'] == set()
+    assert shake.usage(r'\node[canvas is zy plane at x=0] {};')['libraries'] == {'3d'}
+
+
+def test_shake_keeps_only_what_the_picture_uses():
+    arch = [tikz.start(), ir.Conv('conv1', to='(0,0,0)'), tikz.env_end()]
+    source = ''.join(shake.shake(arch))
+    preamble, body = source.split(r'\begin{document}')
+    assert r'\def\pnnstyles{Box}' in preamble
+    assert preamble.index(r'\def\pnnstyles') < preamble.index(r'\subimport{../layers/}{init}')
+    assert r'\def\ConvColor' in preamble and r'\def\PoolColor' not in preamble
+    assert r'\usetikzlibrary{positioning}' in preamble and '3d' not in preamble
+    assert body == ''.join(map(str, arch)).split(r'\begin{document}')[1]
+
+
+def test_shake_passes_documents_without_a_body_through():
+    assert list(shake.shake(['% nothing', ir.Conv('conv1')])) == ['% nothing', str(ir.Conv('conv1'))]
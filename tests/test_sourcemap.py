@@ -0,0 +1,69 @@
+import os
+import stat
+
+import pytest
+
+from pycore import ir, sourcemap, tikz
+
+# pdflatex stopping at the first \undefined like TeX does, with the error and its line in the log
+FAILING_ENGINE = '''#!/bin/sh
+for a; do case $a in -output-directory=*) d=${a#-output-directory=};; esac; f=$a; done
+line=$(grep -n 'undefined' "$f" | head -n 1 | cut -d: -f1)
+log="$d/$(basename "$f" .tex).log"
+printf '! Undefined control sequence.\\nl.%s \\\\undefined\\n! Emergency stop.\\n' "$line" > "$log"
+exit 1
+'''
+
+LOG = r'''
+! Undefined control sequence.
+<recently read> \foo
+l.12 \foo
+! Emergency stop.
+./file.tex:30: Missing number, treated as zero.
+'''
+
+
+def test_record_maps_lines_to_elements(tmp_path):
+    with sourcemap.sites():
+        conv = ir.Conv('conv1', to='(0,0,0)')
+    source_map = sourcemap.write([tikz.start(), conv, tikz.env_end()], str(tmp_path / 'file.tex'))
+    lines = (tmp_path / 'file.tex').read_text().splitlines()
+    entry = next(entry for entry in source_map.entries if entry.label == 'conv1')
+    assert lines[entry.first - 1].lstrip().startswith(r'\pic')
+    assert lines[entry.last - 1].strip() == '};'
+    assert source_map.locate(entry.first + 1) == entry
+    assert entry.site == (__file__, conv.site[1])
+    source_map.write_json(str(tmp_path / 'file.json'))
+    assert sourcemap.SourceMap.read_json(str(tmp_path / 'file.json')).entries == source_map.entries
+
+
+def test_sites_are_opt_in():
+    assert ir.Conv('conv1', to='(0,0,0)').site is None
+    with sourcemap.sites():
+        assert ir.Conv('conv1', to='(0,0,0)').site[0] == __file__
+    assert ir.Conv('conv1', to='(0,0,0)').site is None
+
+
+def test_parse_log():
+    errors = sourcemap.parse_log(LOG)
+    assert errors == [sourcemap.TexError('Undefined control sequence.', None, 12, r'\foo'),
+                      sourcemap.TexError('Missing number, treated as zero.', './file.tex', 30, '')]
+
+
+def test_build_names_the_failing_element(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        pytest.skip('the fake engine is a shell script')
+    engine = tmp_path / 'bin' / 'pdflatex'
+    engine.parent.mkdir()
+    engine.write_text(FAILING_ENGINE)
+    engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(engine.parent, os.pathsep, os.environ['PATH']))
+    with sourcemap.sites():
+        label = ir.Text(name='label', of='conv1-north', text='\\undefined')
+    arch = [tikz.start(), ir.Conv('conv1', to='(0,0,0)'), label, tikz.env_end()]
+    with pytest.raises(sourcemap.LatexError) as e:
+        sourcemap.build(arch, str(tmp_path / 'file.tex'))
+    (error, entry), = e.value.errors
+    assert error.message == 'Undefined control sequence.'
+    assert entry.kind == 'text' and entry.index == 2
+    assert 'created at {}:'.format(__file__) in str(e.value)
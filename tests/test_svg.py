@@ -0,0 +1,31 @@
+import warnings
+
+import pytest
+
+import pycore.tikz as tikz
+from pycore import benchmark, layout, svg
+
+
+@pytest.mark.parametrize('name, pics', [('test_simple', 6), ('alexnet', 8), ('unet', 30)])
+def test_examples_are_drawn(example, name, pics):
+    arch = example(name)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        document = svg.to_svg(arch)
+    assert len(layout.layout(arch).shapes) == pics
+    assert document.count('<polygon') >= pics
+
+
+def test_blocks_are_drawn():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        document = svg.to_svg(benchmark.blocks_arch(25))
+    shapes = len(layout.layout(benchmark.blocks_arch(25)).shapes)
+    assert shapes >= 25
+    assert document.count('<polygon') + document.count('<circle') >= shapes
+
+
+def test_tex_strings_warn():
+    arch = [tikz.start(), tikz.conv('conv1'), tikz.env_end()]
+    with pytest.warns(UserWarning, match='1 TeX string'):
+        svg.to_svg(arch)
@@ -0,0 +1,51 @@
+import os
+import stat
+
+import pytest
+
+from pycore import ir, tikz, timing
+
+# pdflatex printing every probe of the document with a quarter second, as \typeout would
+PROBING_ENGINE = '''#!/bin/sh
+for a; do case $a in -output-directory=*) d=${a#-output-directory=};; esac; f=$a; done
+stem=$(basename "$f" .tex)
+grep -o 'pnn-timing:[0-9]*' "$f" | sed 's/$/:16384/' > "$d/$stem.log"
+echo pdf > "$d/$stem.pdf"
+'''
+
+
+def arch():
+    return [tikz.start(), ir.Conv('conv1', to='(0,0,0)'), tikz.short_connection('conv1', 'pool1'), tikz.env_end()]
+
+
+def test_instrument_labels_every_element():
+    labels = []
+    source = ''.join(timing.instrument(arch(), labels))
+    assert labels == [('conv1', 'conv'), ('conv1 -> pool1', 'draw'), ('shipout', 'document')]
+    assert source.count(r'\typeout{pnn-timing:') == 3
+    assert source.index(r'\pnntimerreset') > source.index(r'\begin{tikzpicture}')
+
+
+def test_parse_log_and_rank():
+    labels = [('conv1', 'conv'), ('conv1', 'conv'), ('shipout', 'document')]
+    log = 'pnn-timing:0:65536\nnoise\npnn-timing:1:32768\npnn-timing:2:-1\npnn-timing:7:1\n'
+    timings = timing.parse_log(log, labels)
+    assert [t['seconds'] for t in timings] == [1.0, 0.5, None]
+    ranking = timing.rank(timings)
+    assert ranking[0] == {'label': 'conv1', 'kind': 'conv', 'calls': 2, 'seconds': 1.5}
+    assert 'conv1' in timing.report(timings, top=1).splitlines()[1]
+    assert timing.report(timings, top=1).endswith('1 more elements')
+
+
+def test_compile_timed(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        pytest.skip('the fake engine is a shell script')
+    engine = tmp_path / 'bin' / 'pdflatex'
+    engine.parent.mkdir()
+    engine.write_text(PROBING_ENGINE)
+    engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(engine.parent, os.pathsep, os.environ['PATH']))
+    result, timings = timing.compile_timed(arch(), str(tmp_path / 'file.tex'))
+    assert result.ok
+    assert [(t['label'], t['seconds']) for t in timings] == [
+        ('conv1', 0.25), ('conv1 -> pool1', 0.25), ('shipout', 0.25)]
@@ -0,0 +1,12 @@
+from pycore import ir, validate
+
+
+def test_typo_suggests_layer_not_pic_local():
+    arch = [ir.Start(), ir.Conv('c0', to='0,0,0'), ir.Conv('c2', offset='(1,0,0)', to='c1-east'), ir.End()]
+    problems = validate.validate(arch)
+    assert [problem.message for problem in problems] == ["unknown name 'c1', did you mean 'c0'?"]
+
+
+def test_pic_locals_are_valid_references():
+    arch = [ir.Start(), ir.Conv('c0', to='0,0,0'), ir.Coordinate('p', of='a', offset='(1,0,0)'), ir.End()]
+    assert validate.validate(arch) == []
@@ -2,13 +2,28 @@
 set -euo pipefail # makes the script stop if any command fails
 
 python "$1".py
-pdflatex "$1".tex
+# names and anchors are checked in milliseconds instead of failing late in pdflatex
+PYTHONPATH="$(dirname "$0")${PYTHONPATH:+:$PYTHONPATH}" python -m pycore.validate "$1".tex
+if [[ -n "${PLOTNEURALNET_ENGINE:-}" ]]; then
+    # pdflatex, lualatex, xelatex, tectonic, latex+dvisvgm or auto, see pycore/engines.py
+    PYTHONPATH="$(dirname "$0")${PYTHONPATH:+:$PYTHONPATH}" python -m pycore.engines "$1".tex \
+        --engine "$PLOTNEURALNET_ENGINE" ${PLOTNEURALNET_CACHE:+--cache}
+elif [[ -n "${PLOTNEURALNET_CACHE:-}" ]]; then
+    # reuse the pdf from the build cache if nothing changed
+    PYTHONPATH="$(dirname "$0")${PYTHONPATH:+:$PYTHONPATH}" python -m pycore.cache build "$1".tex
+else
+    pdflatex "$1".tex
+fi
 
 rm -f ./*.aux ./*.log
 # rm -f ./*.tex
 
+output="$1".pdf
+if [[ "${PLOTNEURALNET_ENGINE:-}" == "latex+dvisvgm" ]]; then
+    output="$1".svg
+fi
 if [[ "$OSTYPE" == "darwin"* ]]; then
-    open "$1".pdf
+    open "$output"
 else
-    xdg-open "$1".pdf
+    xdg-open "$output"
 fi